@@ -1,66 +1,195 @@
-from flask import Flask, send_from_directory
+from flask import Flask, g, request
 from flask_cors import CORS
 import os
 import jwt
+import time
 from datetime import datetime, timedelta
-from models.role import Role
-from models.user import User
-from models.country import Country
-from models.vacation import Vacation
-from models.like import Like
+from models.cache import CacheCoherency
+from models.query_stats import QueryStats
+from services.password_hasher import HashingBusyError
+from services.job_queue import JobQueue
+from services.metrics import RequestMetrics
+from services.logging_config import StructuredLogging, request_id_var
+from services.profiler import RequestProfiler
+from services.startup import Startup
+from constants import SQL_SERVER_TIMING, SCHEMA_CHECK, WARMUP
 from routes.user_routes import user_bp
 from routes.role_routes import role_bp
 from routes.country_routes import country_bp
 from routes.vacation_routes import vacation_bp
 from routes.auth_routes import auth_bp
 from routes.like_routes import like_bp
+from routes.image_routes import image_bp
+from routes.job_routes import job_bp
+from routes.export_routes import export_bp
+from routes.metrics_routes import metrics_bp
+from routes.profiler_routes import profiler_bp
 
-app = Flask(__name__)
-
-# Enable CORS for React frontend (development and production)
-CORS(app, supports_credentials=True, origins=[
-    "http://localhost:3000", 
-    "http://127.0.0.1:3000",
-    "https://omermalka26.github.io",
-    "https://*.onrender.com",
-    "https://*.railway.app",
-    "https://*.herokuapp.com"
-])
-
-# Serve static files (images)
-IMAGES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'images')
-
-# Use environment variable for secret key (with fallback for development)
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'your-super-secret-jwt-key-change-in-production')
-
-# Register the blueprints
-app.register_blueprint(user_bp)
-app.register_blueprint(role_bp)
-app.register_blueprint(country_bp)
-app.register_blueprint(vacation_bp)
-app.register_blueprint(auth_bp)
-app.register_blueprint(like_bp)
-
-# Serve images
-@app.route('/images/<filename>')
-def serve_image(filename):
-    return send_from_directory(IMAGES_FOLDER, filename)
-
-# Error handlers
-@app.errorhandler(404)
-def not_found(error):
-    return {'error': 'Resource not found'}, 404
-
-@app.errorhandler(500)
-def internal_error(error):
-    return {'error': 'Internal server error'}, 500
-
-# Create the database tables
-Role.create_table()
-User.create_table()
-Country.create_table()
-Vacation.create_table()
-Like.create_table()
+# Before anything logs: every record goes through one queue and writer thread per process
+StructuredLogging.configure()
+
+
+def create_app(schema_check=SCHEMA_CHECK, warmup=WARMUP):
+    """
+    Build the Flask app. Creates no tables (that is `python manage.py init` /
+    `migrate` at deploy time); it only checks the schema version and, with
+    `warmup`, primes the caches before the first request is served.
+
+    Safe to run once in a gunicorn --preload master: the connection pool closes
+    its idle connections before any fork, so workers inherit none.
+    """
+    app = Flask(__name__)
+
+    # Enable CORS for React frontend (development and production)
+    CORS(app, supports_credentials=True, origins=[
+        "http://localhost:3000", 
+        "http://127.0.0.1:3000",
+        "https://omermalka26.github.io",
+        "https://*.onrender.com",
+        "https://*.railway.app",
+        "https://*.herokuapp.com"
+    ])
+
+    # Use environment variable for secret key (with fallback for development)
+    app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'your-super-secret-jwt-key-change-in-production')
+
+    # Register the blueprints
+    app.register_blueprint(user_bp)
+    app.register_blueprint(role_bp)
+    app.register_blueprint(country_bp)
+    app.register_blueprint(vacation_bp)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(like_bp)
+    app.register_blueprint(image_bp)
+    app.register_blueprint(job_bp)
+    app.register_blueprint(export_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(profiler_bp)
+
+    # Request timing for /metrics; registered first so it also covers the other hooks
+    @app.before_request
+    def begin_request_metrics():
+        g.metrics_labels = RequestMetrics.labels(request)
+        g.metrics_started = time.perf_counter()
+        RequestMetrics.begin(g.metrics_labels)
+
+    @app.after_request
+    def record_request_metrics(response):
+        if 'metrics_labels' in g:
+            RequestMetrics.end(g.pop('metrics_labels'), response.status_code, time.perf_counter() - g.metrics_started)
+        return response
+
+    # Request id for the logs of this request (from the client's X-Request-ID, or a new one)
+    @app.before_request
+    def begin_request_id():
+        g.request_id = StructuredLogging.begin_request(request.headers.get('X-Request-ID'))
+
+    @app.after_request
+    def add_request_id(response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+        return response
+
+    # On-demand profiling (POST /profiler); a no-op unless a session is running
+    @app.before_request
+    def begin_profiling():
+        if request.blueprint != 'profiler':
+            RequestProfiler.begin(f'{request.method} {request.endpoint or "<unmatched>"}')
+
+    @app.after_request
+    def end_profiling(response):
+        RequestProfiler.end()
+        return response
+
+    # Per-request SQL query count and database time (logged, and sent as a Server-Timing header)
+    @app.before_request
+    def begin_query_stats():
+        QueryStats.begin_request()
+
+    @app.after_request
+    def record_query_stats(response):
+        stats = QueryStats.end_request()
+        if stats is None:
+            return response
+        method, path, status, request_id = request.method, request.path, response.status_code, g.get('request_id')
+
+        def log_query_stats(stats):
+            # Also runs after the request ended (streamed bodies), so bind its id again
+            token = request_id_var.set(request_id)
+            try:
+                app.logger.info('%s %s %s: %d queries, %d transactions, %.1f ms in the database',
+                                method, path, status, stats['queries'], stats['transactions'], stats['seconds'] * 1000,
+                                extra={'event': 'request', 'method': method, 'path': path,
+                                       'status': status, 'queries': stats['queries'],
+                                       'transactions': stats['transactions'], 'db_ms': round(stats['seconds'] * 1000, 3)})
+            finally:
+                request_id_var.reset(token)
+
+        if response.is_streamed:
+            # The body (an export's rows) is generated after this hook, once the headers are
+            # sent: log its queries when the stream ends, and send no Server-Timing header,
+            # which could only report the part before the stream
+            response.response = QueryStats.count_stream(response.response, stats, log_query_stats)
+            return response
+        log_query_stats(stats)
+        if SQL_SERVER_TIMING:
+            response.headers.add('Server-Timing', QueryStats.server_timing(stats))
+        return response
+
+    # Per-request snapshot of table versions used to validate in-process caches
+    @app.before_request
+    def begin_cache_coherency():
+        CacheCoherency.begin_request()
+
+    # Background job threads are per process; start them lazily so each (forked) worker gets its own
+    @app.before_request
+    def start_job_workers():
+        JobQueue.ensure_started()
+
+    @app.teardown_request
+    def end_cache_coherency(exception=None):
+        CacheCoherency.end_request()
+
+    @app.teardown_request
+    def end_profiling_aborted(exception=None):
+        # Only left over when the response was never produced
+        RequestProfiler.end()
+
+    @app.teardown_request
+    def end_query_stats(exception=None):
+        # Only left over when the response was never produced
+        QueryStats.end_request()
+
+    @app.teardown_request
+    def end_request_metrics(exception=None):
+        # Only left over when the response was never produced
+        if 'metrics_labels' in g:
+            RequestMetrics.end(g.pop('metrics_labels'), None, 0)
+
+    @app.teardown_request
+    def end_request_id(exception=None):
+        StructuredLogging.end_request()
+
+    # Error handlers
+    @app.errorhandler(404)
+    def not_found(error):
+        return {'error': 'Resource not found'}, 404
+
+    @app.errorhandler(HashingBusyError)
+    def hashing_busy(error):
+        return {'error': 'Server is busy, please try again.'}, 503
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        return {'error': 'Internal server error'}, 500
+
+    Startup.check_schema(schema_check)
+    if warmup:
+        Startup.warmup()
+    return app
+
+
+app = create_app()
 
 if __name__ == '__main__':
     # Get port from environment variable (for deployment) or use 5000
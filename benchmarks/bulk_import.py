@@ -0,0 +1,76 @@
+"""
+Bulk import benchmark.
+
+Writes a synthetic CSV catalog, imports it into a fresh temporary database
+with VacationImporter for each batch size and reports rows/sec.
+
+Usage:
+    python benchmarks/bulk_import.py [--rows 100000] [--pictures 500] [--batch-sizes 100 1000 10000]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEADER = 'country_id,vacation_description,vacation_start,vacation_end,price,picture_file_name\n'
+
+
+def write_catalog(path, rows, pictures):
+    with open(path, 'w') as f:
+        f.write(HEADER)
+        for i in range(rows):
+            f.write(f'{1 + i % 10},Synthetic vacation {i},2099-{1 + i % 12:02d}-01,2099-12-28,'
+                    f'{100 + i % 9000},picture-{i % pictures}.jpg\n')
+
+
+def run_batch_size(database_path, catalog, batch_size):
+    """Runs in a fresh process, so the models open their pool on this database."""
+    os.environ['DATABASE_PATH'] = database_path
+    import manage
+    from models.country import Country
+    from models.migration import Migration
+    from services.vacation_import import VacationImporter
+
+    manage.create_base_tables()
+    Migration.apply_all()
+    Country.insert_many(f'Country {i}' for i in range(1, 11))
+
+    started = time.monotonic()
+    with open(catalog, 'rb') as stream:
+        report = VacationImporter.run(stream, 'csv', batch_size)
+    elapsed = time.monotonic() - started
+    return {
+        'batch_size': batch_size,
+        'rows': report['rows'],
+        'inserted': report['inserted'],
+        'failed': report['failed'],
+        'seconds': round(elapsed, 2),
+        'rows_per_sec': round(report['rows'] / elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--pictures', type=int, default=500, help='Distinct picture names in the catalog')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        catalog = os.path.join(directory, 'catalog.csv')
+        write_catalog(catalog, args.rows, args.pictures)
+        results = []
+        for batch_size in args.batch_sizes:
+            database_path = os.path.join(directory, f'import-{batch_size}.db')
+            with multiprocessing.get_context('spawn').Pool(1) as pool:
+                results.append(pool.apply(run_batch_size, (database_path, catalog, batch_size)))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
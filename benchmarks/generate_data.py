@@ -0,0 +1,184 @@
+"""
+Synthetic data generator for benchmarks.
+
+Creates (or extends) a database with the full schema and fills it with a
+reproducible dataset: one admin, USERS regular users, VACATIONS vacations spread
+over COUNTRIES countries using the bundled pictures, and LIKES likes with
+created_at dates over the last year. The same --seed gives the same data
+(dates are relative to the day it runs).
+
+Every user's password is 'benchmark' (hashed once with PASSWORD_HASH_METHOD and
+shared, hashing 100k passwords individually would take hours). The admin is
+admin@bench.test, users are user<N>@bench.test.
+
+Usage:
+    python benchmarks/generate_data.py --database bench.db [--users 100000]
+        [--vacations 50000] [--likes 5000000] [--countries 50] [--seed 1]
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'benchmark'
+ADMIN_EMAIL = 'admin@bench.test'
+CHUNK_ROWS = 100_000
+BUNDLED_PICTURES = ('canada.jpg', 'china.jpg', 'france.jpg', 'india.jpg', 'israel.jpg',
+                    'italy.jpg', 'japan.jpg', 'mexico.jpg', 'nigeria.jpg')
+
+
+def create_schema():
+    import manage
+    from models.database import pool
+    from models.migration import Migration
+    from models.role import Role
+    manage.create_base_tables()
+    Migration.apply_all()
+    Role.insert_many(['User', 'Admin'])
+    pool.close_all()
+
+
+def chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def bulk_insert(connection, table, sql, rows):
+    """
+    Insert with the table's triggers dropped (they would bump table_versions and
+    likes_count once per row) and recreated afterwards; the derived values are
+    recomputed once at the end. Returns the number of rows inserted.
+    """
+    triggers = connection.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?",
+                                  (table,)).fetchall()
+    for name, _ in triggers:
+        connection.execute(f'DROP TRIGGER {name}')
+    inserted = 0
+    try:
+        for chunk in chunks(rows):
+            connection.executemany(sql, chunk)
+            connection.commit()
+            inserted += len(chunk)
+    finally:
+        for _, trigger_sql in triggers:
+            connection.execute(trigger_sql)
+        connection.execute('UPDATE table_versions SET version = version + ? WHERE table_name = ?', (inserted, table))
+        connection.commit()
+    return inserted
+
+
+def generate(database, users, vacations, likes, countries, seed):
+    from werkzeug.security import generate_password_hash
+    from constants import PASSWORD_HASH_METHOD, ADMIN_ROLE_ID, USER_ROLE_ID
+
+    rng = random.Random(seed)
+    create_schema()
+    connection = sqlite3.connect(database)
+    connection.execute('PRAGMA synchronous = OFF')
+    timings = {}
+
+    started = time.monotonic()
+    password_hash = generate_password_hash(PASSWORD, method=PASSWORD_HASH_METHOD)
+    # Keep user<N> numbering contiguous when extending, the load driver picks N at random
+    first_user = connection.execute("SELECT COUNT(*) FROM users WHERE email LIKE 'user%@bench.test'").fetchone()[0] + 1
+    bulk_insert(connection, 'users',
+                'INSERT OR IGNORE INTO users (first_name, last_name, email, password, role_id) VALUES (?, ?, ?, ?, ?)',
+                [('Bench', 'Admin', ADMIN_EMAIL, password_hash, ADMIN_ROLE_ID)] +
+                [('Bench', f'User {i}', f'user{i}@bench.test', password_hash, USER_ROLE_ID)
+                 for i in range(first_user, first_user + users)])
+    timings['users'] = time.monotonic() - started
+
+    started = time.monotonic()
+    bulk_insert(connection, 'countries', 'INSERT OR IGNORE INTO countries (country_name) VALUES (?)',
+                [(f'Country {i}',) for i in range(1, countries + 1)])
+    country_ids = [row[0] for row in connection.execute('SELECT country_id FROM countries')]
+    timings['countries'] = time.monotonic() - started
+
+    started = time.monotonic()
+    picture_variants = {
+        row[0]: row[1] for row in connection.execute(
+            'SELECT picture_file_name, MAX(picture_variants) FROM vacations '
+            'WHERE picture_variants IS NOT NULL GROUP BY picture_file_name')
+    }
+
+    def vacation_rows():
+        for i in range(vacations):
+            start = rng.randint(0, 3 * 365)
+            picture = rng.choice(BUNDLED_PICTURES)
+            yield (rng.choice(country_ids), f'Synthetic vacation {i}',
+                   time.strftime('%Y-%m-%d', time.gmtime(time.time() + start * 86400)),
+                   time.strftime('%Y-%m-%d', time.gmtime(time.time() + (start + rng.randint(1, 21)) * 86400)),
+                   rng.randint(100, 9999), picture, picture_variants.get(picture))
+
+    bulk_insert(connection, 'vacations',
+                '''INSERT INTO vacations (country_id, vacation_description, vacation_start, vacation_end,
+                                          price, picture_file_name, picture_variants)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)''', vacation_rows())
+    timings['vacations'] = time.monotonic() - started
+
+    started = time.monotonic()
+    user_ids = [row[0] for row in connection.execute('SELECT user_id FROM users ORDER BY user_id')]
+    vacation_ids = [row[0] for row in connection.execute('SELECT vacation_id FROM vacations')]
+    per_user = min(len(vacation_ids), max(1, round(likes / max(1, len(user_ids)))))
+    now = time.time()
+
+    def like_rows():
+        remaining = likes
+        for user_id in user_ids:
+            if remaining <= 0:
+                return
+            count = min(remaining, len(vacation_ids), rng.randint(0, 2 * per_user))
+            remaining -= count
+            for vacation_id in rng.sample(vacation_ids, count):
+                created_at = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now - rng.random() * 365 * 86400))
+                yield user_id, vacation_id, created_at
+
+    bulk_insert(connection, 'likes', 'INSERT OR IGNORE INTO likes (user_id, vacation_id, created_at) VALUES (?, ?, ?)',
+                like_rows())
+    # likes_count is trigger-maintained; recompute it once for the whole table
+    connection.execute('''UPDATE vacations SET likes_count =
+                              (SELECT COUNT(*) FROM likes WHERE likes.vacation_id = vacations.vacation_id)''')
+    connection.commit()
+    timings['likes'] = time.monotonic() - started
+
+    started = time.monotonic()
+    connection.execute('ANALYZE')
+    connection.commit()
+    timings['analyze'] = time.monotonic() - started
+
+    counts = {table: connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('users', 'countries', 'vacations', 'likes')}
+    connection.close()
+    return {'database': database, 'seed': seed, 'counts': counts,
+            'seconds': {step: round(seconds, 2) for step, seconds in timings.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default=os.environ.get('DATABASE_PATH', 'projectdb.db'))
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--vacations', type=int, default=50_000)
+    parser.add_argument('--likes', type=int, default=5_000_000)
+    parser.add_argument('--countries', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    # Before anything imports constants, so the models use this database
+    os.environ['DATABASE_PATH'] = args.database
+    print(json.dumps(generate(args.database, args.users, args.vacations, args.likes, args.countries, args.seed),
+                     indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""
+Endpoint load driver.
+
+Runs each scenario for a fixed time with CONCURRENCY client threads against a
+database filled by benchmarks/generate_data.py, and prints (or writes with
+--output) JSON with p50/p95/p99 latency and throughput per scenario, so runs
+can be diffed between commits.
+
+Targets:
+    testclient  the app in this process through Flask's test client (no network,
+                measures the application code only)
+    gunicorn    a real `gunicorn app:app` started on a free local port
+    url         an already running server (--url)
+
+Scenarios: login, vacations (GET /vacations first page), vacation
+(GET /vacations/<id>), likes (POST /likes and DELETE /likes/<id> on random
+vacations), upload (POST /vacations with a bundled picture, as admin). Upload
+adds vacations to the database; regenerate it when comparing upload runs.
+
+Usage:
+    python benchmarks/generate_data.py --database bench.db
+    python benchmarks/load.py --database bench.db --target gunicorn \
+        [--scenarios login vacations vacation likes upload] [--concurrency 8]
+        [--seconds 10] [--workers 4] [--output results.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = 'benchmark'
+ADMIN_EMAIL = 'admin@bench.test'
+UPLOAD_PICTURE = os.path.join(ROOT, 'images', 'italy.jpg')
+SCENARIOS = ('login', 'vacations', 'vacation', 'likes', 'upload')
+
+
+class TestClientTarget:
+    """Requests through Flask's test client, one client per thread."""
+
+    def __init__(self, database):
+        os.environ['DATABASE_PATH'] = database
+        from app import app
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, headers=None, body=None, content_type=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, headers=headers, data=body, content_type=content_type)
+        return response.status_code, response.get_data()
+
+    def close(self):
+        pass
+
+
+class HttpTarget:
+    """Requests over HTTP with one keep-alive connection per thread."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self._local = threading.local()
+
+    def request(self, method, path, headers=None, body=None, content_type=None):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        headers = dict(headers or {})
+        if content_type:
+            headers['Content-Type'] = content_type
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            return response.status, response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            self._local.connection = None
+            raise
+
+    def close(self):
+        pass
+
+
+class GunicornTarget(HttpTarget):
+    """Starts `gunicorn app:app` on a free port for the duration of the run."""
+
+    def __init__(self, database, workers):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        env = dict(os.environ, DATABASE_PATH=os.path.abspath(database))
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+             '--log-level', 'warning', 'app:app'],
+            cwd=ROOT, env=env)
+        super().__init__(f'http://127.0.0.1:{port}')
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                status, _ = self.request('GET', '/countries')
+                if status == 200:
+                    break
+            except OSError:
+                pass
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError('gunicorn did not start')
+            time.sleep(0.2)
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+def login(target, email):
+    status, body = target.request('POST', '/login', body=json.dumps({'email': email, 'password': PASSWORD}),
+                                  content_type='application/json')
+    if status != 200:
+        raise RuntimeError(f'Could not log in as {email}: {status} {body[:200]!r}')
+    return {'Authorization': f"Bearer {json.loads(body)['token']}"}
+
+
+def multipart(fields, file_field, file_name, file_bytes):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                 f'filename="{file_name}"\r\nContent-Type: image/jpeg\r\n\r\n'.encode() + file_bytes + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def build_scenarios(target, database, concurrency):
+    """Returns {name: function(rng, index) -> list of (status, expected statuses)}."""
+    with sqlite3.connect(database) as connection:
+        max_user = connection.execute("SELECT COUNT(*) FROM users WHERE email LIKE 'user%@bench.test'").fetchone()[0]
+        vacation_ids = [row[0] for row in connection.execute('SELECT vacation_id FROM vacations')]
+        country_id = connection.execute('SELECT MIN(country_id) FROM countries').fetchone()[0]
+    if not max_user or not vacation_ids:
+        raise RuntimeError('The database has no benchmark data; run benchmarks/generate_data.py first.')
+
+    admin = login(target, ADMIN_EMAIL)
+    # One user per client thread, so like/unlike pairs of different threads never collide
+    users = [login(target, f'user{i}@bench.test') for i in range(1, concurrency + 1)]
+    with open(UPLOAD_PICTURE, 'rb') as f:
+        picture = f.read()
+
+    def scenario_login(rng, index):
+        email = f'user{rng.randint(1, max_user)}@bench.test'
+        status, _ = target.request('POST', '/login', body=json.dumps({'email': email, 'password': PASSWORD}),
+                                   content_type='application/json')
+        return [(status, (200,))]
+
+    def scenario_vacations(rng, index):
+        status, _ = target.request('GET', '/vacations?limit=20')
+        return [(status, (200,))]
+
+    def scenario_vacation(rng, index):
+        status, _ = target.request('GET', f'/vacations/{rng.choice(vacation_ids)}', headers=users[index])
+        return [(status, (200,))]
+
+    def scenario_likes(rng, index):
+        vacation_id = rng.choice(vacation_ids)
+        liked, _ = target.request('POST', '/likes', headers=users[index],
+                                  body=json.dumps({'vacation_id': vacation_id}), content_type='application/json')
+        unliked, _ = target.request('DELETE', f'/likes/{vacation_id}', headers=users[index])
+        # 409 / 404: the generated data already had this like
+        return [(liked, (201, 409)), (unliked, (200, 404))]
+
+    def scenario_upload(rng, index):
+        body, content_type = multipart({'country_id': country_id, 'vacation_description': 'Benchmark upload',
+                                        'vacation_start': '2099-01-01', 'vacation_end': '2099-01-08',
+                                        'price': 1000}, 'image', 'benchmark.jpg', picture)
+        status, _ = target.request('POST', '/vacations', headers=admin, body=body, content_type=content_type)
+        return [(status, (201,))]
+
+    return {'login': scenario_login, 'vacations': scenario_vacations, 'vacation': scenario_vacation,
+            'likes': scenario_likes, 'upload': scenario_upload}
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000, 3)
+
+
+def run_scenario(scenario, concurrency, seconds, warmup, seed):
+    latencies = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    statuses = [{} for _ in range(concurrency)]
+    start = threading.Barrier(concurrency + 1)
+
+    def client(index):
+        rng = random.Random(seed * 1000 + index)
+        start.wait()
+        warm_until = time.monotonic() + warmup
+        deadline = warm_until + seconds
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            started = time.perf_counter()
+            try:
+                results = scenario(rng, index)
+            except (OSError, http.client.HTTPException):
+                results = [(None, ())]
+            elapsed = time.perf_counter() - started
+            if now < warm_until:
+                continue
+            for status, expected in results:
+                statuses[index][status] = statuses[index].get(status, 0) + 1
+                if status not in expected:
+                    errors[index] += 1
+            latencies[index].append(elapsed / len(results))
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    for thread in threads:
+        thread.join()
+
+    all_latencies = sorted(l for per_thread in latencies for l in per_thread)
+    status_counts = {}
+    for per_thread in statuses:
+        for status, count in per_thread.items():
+            status_counts[str(status)] = status_counts.get(str(status), 0) + count
+    requests = sum(status_counts.values())
+    return {
+        'requests': requests,
+        'errors': sum(errors),
+        'statuses': status_counts,
+        'throughput_rps': round(requests / seconds, 1),
+        'latency_ms': {
+            'p50': percentile(all_latencies, 50),
+            'p95': percentile(all_latencies, 95),
+            'p99': percentile(all_latencies, 99),
+            'mean': round(sum(all_latencies) / len(all_latencies) * 1000, 3) if all_latencies else None,
+            'max': round(all_latencies[-1] * 1000, 3) if all_latencies else None,
+        },
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default=os.environ.get('DATABASE_PATH', 'projectdb.db'))
+    parser.add_argument('--target', choices=['testclient', 'gunicorn', 'url'], default='testclient')
+    parser.add_argument('--url', help='Base URL of a running server (--target url)')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--concurrency', type=int, default=8, help='Client threads')
+    parser.add_argument('--seconds', type=float, default=10, help='Measured seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=1, help='Unmeasured seconds before each scenario')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write the JSON results to this file')
+    args = parser.parse_args()
+
+    database = os.path.abspath(args.database)
+    if args.target == 'testclient':
+        target = TestClientTarget(database)
+    elif args.target == 'gunicorn':
+        target = GunicornTarget(database, args.workers)
+    else:
+        if not args.url:
+            parser.error('--target url requires --url')
+        target = HttpTarget(args.url)
+
+    try:
+        scenarios = build_scenarios(target, database, args.concurrency)
+        results = {name: run_scenario(scenarios[name], args.concurrency, args.seconds, args.warmup, args.seed)
+                   for name in args.scenarios}
+    finally:
+        target.close()
+
+    with sqlite3.connect(database) as connection:
+        counts = {table: connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                  for table in ('users', 'vacations', 'likes')}
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'target': args.target,
+            'workers': args.workers if args.target == 'gunicorn' else None,
+            'concurrency': args.concurrency,
+            'seconds': args.seconds,
+            'dataset': counts,
+        },
+        'scenarios': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Login throughput benchmark for the password hashing pool.
+
+Issues concurrent password verifications (the CPU-heavy part of POST /login)
+through PasswordHasher for each pool mode and reports verifications/sec overall
+and per core.
+
+Usage:
+    PASSWORD_HASH_METHOD=scrypt:32768:8:1 python benchmarks/password_hashing.py \
+        [--pools inline thread process] [--clients 16] [--seconds 5]
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run_pool(pool, clients, seconds):
+    os.environ['PASSWORD_HASH_POOL'] = pool
+    import constants
+    from services import password_hasher
+    importlib.reload(constants)
+    importlib.reload(password_hasher)
+    hasher = password_hasher.PasswordHasher
+
+    stored = hasher.hash('correct horse battery staple')
+    hasher.verify(stored, 'warm up the pool')
+
+    done = [0] * clients
+    deadline = time.monotonic() + seconds
+
+    def client(index):
+        while time.monotonic() < deadline:
+            hasher.verify(stored, 'correct horse battery staple')
+            done[index] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    hasher.shutdown()
+
+    cores = os.cpu_count() or 1
+    per_sec = sum(done) / elapsed
+    return {
+        'pool': pool,
+        'method': constants.PASSWORD_HASH_METHOD,
+        'workers': constants.PASSWORD_HASH_WORKERS if pool != 'inline' else 1,
+        'clients': clients,
+        'logins_per_sec': round(per_sec, 1),
+        'logins_per_sec_per_core': round(per_sec / cores, 1),
+        'cores': cores,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pools', nargs='+', default=['inline', 'thread', 'process'],
+                        choices=['inline', 'thread', 'process'])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps([run_pool(pool, args.clients, args.seconds) for pool in args.pools], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Read/write concurrency benchmark for the SQLite storage profiles.
+
+Simulates several gunicorn workers: reader processes run the GET /vacations
+query while writer processes insert and delete likes (POST/DELETE /likes),
+each on its own pooled connection, against a fresh database per profile.
+
+Usage:
+    python benchmarks/sqlite_profiles.py [--profiles legacy balanced] [--readers 4]
+                                         [--writers 2] [--seconds 5]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import ConnectionPool, STORAGE_PROFILES
+
+VACATIONS = 500
+USERS = 2000
+
+LIST_SQL = '''
+    SELECT v.*, COALESCE(l.likes_count, 0) as likes_count
+    FROM vacations v
+    LEFT JOIN (
+        SELECT vacation_id, COUNT(*) as likes_count
+        FROM likes
+        GROUP BY vacation_id
+    ) l ON v.vacation_id = l.vacation_id
+    ORDER BY v.vacation_start ASC
+'''
+
+
+def seed(path, profile):
+    pool = ConnectionPool(path, profile=profile)
+    with pool.connection() as connection:
+        connection.executescript('''
+            CREATE TABLE users (user_id INTEGER PRIMARY KEY);
+            CREATE TABLE vacations (vacation_id INTEGER PRIMARY KEY, vacation_start TEXT, price NUMERIC);
+            CREATE TABLE likes (
+                user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                vacation_id INTEGER NOT NULL REFERENCES vacations(vacation_id) ON DELETE CASCADE,
+                PRIMARY KEY (user_id, vacation_id));
+        ''')
+        connection.executemany('INSERT INTO users VALUES (?)', [(i,) for i in range(1, USERS + 1)])
+        connection.executemany('INSERT INTO vacations VALUES (?, ?, ?)',
+                               [(i, f'2030-01-{i % 28 + 1:02d}', i) for i in range(1, VACATIONS + 1)])
+    pool.close_all()
+
+
+def reader(path, profile, seconds, results):
+    pool = ConnectionPool(path, profile=profile)
+    done = errors = 0
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            with pool.connection() as connection:
+                connection.execute(LIST_SQL).fetchall()
+            done += 1
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put(('read', done, errors, latencies))
+
+
+def writer(path, profile, seconds, results):
+    pool = ConnectionPool(path, profile=profile)
+    done = errors = 0
+    latencies = []
+    deadline = time.monotonic() + seconds
+    rng = random.Random(os.getpid())
+    while time.monotonic() < deadline:
+        user_id, vacation_id = rng.randint(1, USERS), rng.randint(1, VACATIONS)
+        started = time.perf_counter()
+        try:
+            with pool.connection() as connection:
+                cursor = connection.execute('DELETE FROM likes WHERE user_id = ? AND vacation_id = ?',
+                                            (user_id, vacation_id))
+                if cursor.rowcount == 0:
+                    connection.execute('INSERT INTO likes VALUES (?, ?)', (user_id, vacation_id))
+            done += 1
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put(('write', done, errors, latencies))
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000, 3)
+
+
+def run_profile(profile, readers, writers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        seed(path, profile)
+        results = multiprocessing.Queue()
+        processes = ([multiprocessing.Process(target=reader, args=(path, profile, seconds, results))
+                      for _ in range(readers)] +
+                     [multiprocessing.Process(target=writer, args=(path, profile, seconds, results))
+                      for _ in range(writers)])
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    summary = {'profile': profile}
+    for kind in ('read', 'write'):
+        rows = [r for r in collected if r[0] == kind]
+        latencies = [l for r in rows for l in r[3]]
+        summary[kind] = {
+            'ops_per_sec': round(sum(r[1] for r in rows) / seconds, 1),
+            'errors': sum(r[2] for r in rows),
+            'p50_ms': percentile(latencies, 50),
+            'p99_ms': percentile(latencies, 99),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=list(STORAGE_PROFILES), choices=list(STORAGE_PROFILES))
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(json.dumps([run_profile(p, args.readers, args.writers, args.seconds) for p in args.profiles], indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Startup benchmark.
+
+Measures, in fresh interpreters against a database filled by
+benchmarks/generate_data.py, how long importing the app (create_app(): schema
+check and warmup) takes and how fast the first requests after it are, with
+WARMUP off and on. With --gunicorn it also times `gunicorn app:app` from spawn
+until the first request succeeds, with and without --preload.
+
+Usage:
+    python benchmarks/generate_data.py --database bench.db
+    python benchmarks/startup.py --database bench.db [--runs 5] [--gunicorn] [--workers 4]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter per measurement; prints one JSON object
+CHILD = '''
+import json, time
+started = time.perf_counter()
+from app import app
+imported = time.perf_counter() - started
+client = app.test_client()
+# Pays the test client's and Flask's own one-time costs, so the numbers below are about the app's caches
+client.get('/startup-benchmark-probe')
+first = {}
+for path in ('/vacations', '/countries', '/vacations', '/countries'):
+    started = time.perf_counter()
+    status = client.get(path).status_code
+    first.setdefault(path, []).append(round((time.perf_counter() - started) * 1000, 3))
+    assert status == 200, (path, status)
+print(json.dumps({'import_seconds': imported, 'requests_ms': first}))
+'''
+
+
+def run_child(database, warmup):
+    env = dict(os.environ, DATABASE_PATH=database, WARMUP='1' if warmup else '0', LOG_LEVEL='WARNING')
+    output = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def gunicorn_ready_seconds(database, workers, preload, warmup):
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    env = dict(os.environ, DATABASE_PATH=database, WARMUP='1' if warmup else '0', LOG_LEVEL='WARNING')
+    command = [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+               '--log-level', 'warning'] + (['--preload'] if preload else []) + ['app:app']
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env)
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/countries', timeout=5) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                pass
+            if process.poll() is not None:
+                raise RuntimeError('gunicorn exited during startup')
+            time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def summarize(values):
+    return {'median': round(statistics.median(values), 4), 'min': round(min(values), 4),
+            'max': round(max(values), 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default=os.environ.get('DATABASE_PATH', 'projectdb.db'))
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per configuration')
+    parser.add_argument('--gunicorn', action='store_true', help='Also time gunicorn until it serves requests')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    args = parser.parse_args()
+    database = os.path.abspath(args.database)
+
+    results = {}
+    for warmup in (False, True):
+        runs = [run_child(database, warmup) for _ in range(args.runs)]
+        result = {'import_seconds': summarize([run['import_seconds'] for run in runs])}
+        for path in runs[0]['requests_ms']:
+            result[f'first GET {path} ms'] = summarize([run['requests_ms'][path][0] for run in runs])
+            result[f'second GET {path} ms'] = summarize([run['requests_ms'][path][1] for run in runs])
+        results['warmup' if warmup else 'no_warmup'] = result
+
+    if args.gunicorn:
+        for preload in (False, True):
+            for warmup in (False, True):
+                name = f"gunicorn{' --preload' if preload else ''}{' warmup' if warmup else ''}"
+                results[name] = {'ready_seconds': summarize(
+                    [gunicorn_ready_seconds(database, args.workers, preload, warmup) for _ in range(args.runs)])}
+
+    print(json.dumps({'database': database, 'runs': args.runs, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
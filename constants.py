@@ -1,3 +1,5 @@
+import os
+
 # System Role IDs
 USER_ROLE_ID = 1
 ADMIN_ROLE_ID = 2
@@ -8,8 +10,101 @@ ADMIN_ROLE_NAME = "Admin"
 
 # JWT Configuration
 JWT_EXPIRATION_HOURS = 24
+TOKEN_VERSION_REFRESH_SECONDS = float(os.environ.get('TOKEN_VERSION_REFRESH_SECONDS', 5))  # how often workers re-check revocations
 
 # Validation Constants
 MIN_PASSWORD_LENGTH = 4
 MAX_PRICE = 10000
 MIN_PRICE = 0
+
+# Pagination
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Likes
+LIKES_BATCH_MAX_OPERATIONS = int(os.environ.get('LIKES_BATCH_MAX_OPERATIONS', 500))  # per POST /likes/batch request
+
+# Database Configuration
+DATABASE_PATH = os.environ.get('DATABASE_PATH', 'projectdb.db')
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 8))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))  # seconds to wait for a free connection
+DB_POOL_HEALTHCHECK_INTERVAL = float(os.environ.get('DB_POOL_HEALTHCHECK_INTERVAL', 30))  # seconds idle before re-checking
+DB_STORAGE_PROFILE = os.environ.get('DB_STORAGE_PROFILE', 'balanced')  # legacy | balanced | performance
+SCHEMA_CHECK = os.environ.get('SCHEMA_CHECK', 'error')  # at worker boot, when migrations are pending: error | warn | off
+
+# Startup
+WARMUP = os.environ.get('WARMUP', '1') == '1'  # prime the in-process caches before the worker serves requests
+WARMUP_CATALOG_PAGES = int(os.environ.get('WARMUP_CATALOG_PAGES', 3))  # first pages of GET /vacations to cache
+
+# SQL Instrumentation
+SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '1') == '1'  # count and time every statement per request
+SQL_SERVER_TIMING = os.environ.get('SQL_SERVER_TIMING', '1') == '1'  # add a Server-Timing header with the request's DB time
+SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 100))  # log statements slower than this with their query plan
+SQL_REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD', 5))  # log statements run this often in one request (N+1)
+
+# Caching
+CATALOG_CACHE_TTL = float(os.environ.get('CATALOG_CACHE_TTL', 60))  # seconds
+CATALOG_CACHE_MAX_PAGES = int(os.environ.get('CATALOG_CACHE_MAX_PAGES', 256))
+CATALOG_CACHE_MAX_ROWS = int(os.environ.get('CATALOG_CACHE_MAX_ROWS', 10000))
+HTTP_CACHE_MAX_AGE = int(os.environ.get('HTTP_CACHE_MAX_AGE', 0))  # seconds browsers may reuse public responses without revalidating
+AUTH_PRINCIPAL_CACHE_TTL = float(os.environ.get('AUTH_PRINCIPAL_CACHE_TTL', 30))  # seconds
+AUTH_PRINCIPAL_CACHE_SIZE = int(os.environ.get('AUTH_PRINCIPAL_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+
+# Password Hashing
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # any werkzeug method, e.g. pbkdf2:sha256:600000
+PASSWORD_HASH_POOL = os.environ.get('PASSWORD_HASH_POOL', 'process')  # process | thread | inline
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))  # gunicorn worker processes (gunicorn reads it too)
+# Per gunicorn worker, so all workers' pools together use about one process per core
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY)))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 64))
+PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))  # seconds
+
+# Bulk Import
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))  # rows per insert transaction
+IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 1000))  # row errors listed in a report (all are counted)
+
+# Exports
+EXPORT_FETCH_SIZE = int(os.environ.get('EXPORT_FETCH_SIZE', 1000))  # rows fetched from SQLite at a time
+EXPORT_CHUNK_BYTES = int(os.environ.get('EXPORT_CHUNK_BYTES', 64 * 1024))  # response bytes written at a time
+
+# Images
+IMAGE_UPLOAD_EXTENSIONS = ('jpg', 'png', 'gif', 'webp')
+IMAGE_RELEASE_GRACE_SECONDS = float(os.environ.get('IMAGE_RELEASE_GRACE_SECONDS', 3600))  # keep unreferenced uploads this long before deleting
+IMAGE_VARIANT_WIDTHS = tuple(int(w) for w in os.environ.get('IMAGE_VARIANT_WIDTHS', '320,640,1280').split(','))
+IMAGE_JPEG_QUALITY = int(os.environ.get('IMAGE_JPEG_QUALITY', 82))
+IMAGE_WEBP_QUALITY = int(os.environ.get('IMAGE_WEBP_QUALITY', 80))
+IMAGE_MAX_PIXELS = int(os.environ.get('IMAGE_MAX_PIXELS', 40_000_000))  # reject decompression bombs
+IMAGE_CACHE_MAX_AGE = int(os.environ.get('IMAGE_CACHE_MAX_AGE', 3600))  # seconds, for pictures whose bytes may change
+IMAGE_IMMUTABLE_MAX_AGE = int(os.environ.get('IMAGE_IMMUTABLE_MAX_AGE', 31536000))  # seconds, for content-addressed pictures
+IMAGE_SENDFILE_MODE = os.environ.get('IMAGE_SENDFILE_MODE', '')  # '' (stream from Python) | x-sendfile | x-accel
+IMAGE_ACCEL_REDIRECT_PREFIX = os.environ.get('IMAGE_ACCEL_REDIRECT_PREFIX', '/_images/')  # nginx internal location aliased to images/
+IMAGE_METADATA_CACHE_TTL = float(os.environ.get('IMAGE_METADATA_CACHE_TTL', 300))  # seconds
+IMAGE_GC_GRACE_SECONDS = float(os.environ.get('IMAGE_GC_GRACE_SECONDS', 86400))  # never collect files younger than this
+IMAGE_GC_INTERVAL = float(os.environ.get('IMAGE_GC_INTERVAL', 86400))  # seconds between background runs, 0 disables
+IMAGE_GC_MODE = os.environ.get('IMAGE_GC_MODE', 'quarantine')  # mode of background runs: quarantine | delete
+
+# Background Jobs
+JOB_QUEUE_MODE = os.environ.get('JOB_QUEUE_MODE', 'thread')  # thread (run in each web worker) | external (manage.py worker)
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))  # threads per process
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))  # seconds between checks for jobs queued by other processes
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 300))  # a running job older than this is assumed dead and retried
+
+# Metrics
+METRICS_DIR = os.environ.get('METRICS_DIR', '')  # shared by all workers of one server; set by gunicorn.conf.py, '' = per process only
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 1))  # seconds between writes of a worker's totals
+METRICS_BUCKETS = tuple(float(b) for b in os.environ.get(
+    'METRICS_BUCKETS', '0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10').split(','))  # latency histogram bounds, seconds
+
+# Logging
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')  # json (one object per line) | text
+LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', '')  # keep this fraction of INFO/DEBUG events, e.g. 'request=0.1,auth=0.5'
+LOG_REQUEST_PAYLOADS = os.environ.get('LOG_REQUEST_PAYLOADS', '0') == '1'  # include request bodies in debug logs (may hold personal data)
+
+# Profiler
+PROFILER_SAMPLE_INTERVAL = float(os.environ.get('PROFILER_SAMPLE_INTERVAL', 0.005))  # seconds between stack samples
+PROFILER_POLL_INTERVAL = float(os.environ.get('PROFILER_POLL_INTERVAL', 1))  # seconds before workers notice a started/stopped session
+PROFILER_MAX_SECONDS = int(os.environ.get('PROFILER_MAX_SECONDS', 600))  # longest session that can be requested
+PROFILER_MAX_REQUESTS = int(os.environ.get('PROFILER_MAX_REQUESTS', 10000))  # largest request budget of a session
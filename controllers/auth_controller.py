@@ -1,17 +1,27 @@
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
 from models.user import User 
-from werkzeug.security import generate_password_hash, check_password_hash
+from models.token_version import TokenVersion
+from services.password_hasher import PasswordHasher, HashingBusyError
 import jwt
 from datetime import datetime, timedelta
+import logging
 import re
 from constants import USER_ROLE_ID, JWT_EXPIRATION_HOURS, MIN_PASSWORD_LENGTH
 
+logger = logging.getLogger(__name__)
+
 class AuthController:
     @staticmethod
-    def generate_token(user_id):
-        """Generate JWT token for user"""
+    def generate_token(user_id, role_id):
+        """
+        Generate JWT token for user.
+        Carries the role ('role_id') and the user's current token version ('tv'),
+        so requests can be authorized and checked for revocation without a DB lookup.
+        """
         payload = {
             'user_id': user_id,
+            'role_id': role_id,
+            'tv': TokenVersion.get(user_id),
             'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS),
             'iat': datetime.utcnow()
         }
@@ -50,13 +60,19 @@ class AuthController:
 
                 if result is None:
                     return jsonify({'error': 'Incorrect email or password.'}), 401
-                elif not check_password_hash(result['password_hash'], password):
+                elif not PasswordHasher.verify(result['password_hash'], password):
                     return jsonify({'error': 'Incorrect email or password.'}), 401
 
+                # Transparently upgrade hashes made with older method/cost settings, off the request
+                if PasswordHasher.needs_rehash(result['password_hash']):
+                    user_id, previous_hash = result['user_id'], result['password_hash']
+                    PasswordHasher.hash_in_background(
+                        password, lambda password_hash: User.update_password_hash(user_id, password_hash, previous_hash))
+
                 # Generate JWT token
-                token = AuthController.generate_token(result['user_id'])
+                token = AuthController.generate_token(result['user_id'], result['role_id'])
                 
-                print("user logged in")
+                logger.info('User logged in', extra={'event': 'auth', 'user_id': result['user_id']})
                 return jsonify({
                     'message': 'login successful',
                     'token': token,
@@ -69,8 +85,10 @@ class AuthController:
                     }
                 })
                 
+            except HashingBusyError:
+                return jsonify({'error': 'Server is busy, please try again.'}), 503
             except Exception as e:
-                print(f"Login error: {str(e)}")
+                logger.exception('Login failed')
                 return jsonify({'error': 'Internal server error'}), 500
 
     @staticmethod
@@ -101,33 +119,37 @@ class AuthController:
                 return jsonify({'error': f'Password must be at least {MIN_PASSWORD_LENGTH} characters long.'}), 400
             
             # Hash password before sending to model
-            password_hash = generate_password_hash(password)
+            password_hash = PasswordHasher.hash(password)
             result = User.insert(first_name, last_name, email, password_hash, role_id)
         
             if result is None:
                 return jsonify({'error': 'Email already exists'}), 400
             
             # Generate JWT token for newly registered user
-            token = AuthController.generate_token(result['user_id'])
+            token = AuthController.generate_token(result['user_id'], result['role_id'])
                 
-            print("user registered")
+            logger.info('User registered', extra={'event': 'auth', 'user_id': result['user_id']})
             return jsonify({
                 'message': 'sign up successful',
                 'token': token,
                 'user': result
             }), 201
                 
+        except HashingBusyError:
+            return jsonify({'error': 'Server is busy, please try again.'}), 503
         except Exception as e:
-            print(f"Registration error: {str(e)}")
+            logger.exception('Registration failed')
             return jsonify({'error': 'Internal server error'}), 500
 
     @staticmethod
     def logout_user():
         try:
-            # For JWT, logout is handled on the client side by removing the token
-            print("user logged out")
+            # Revoke every token issued to this user so far; the client also drops its copy
+            if g.user:
+                TokenVersion.bump(g.user['user_id'])
+            logger.info('User logged out', extra={'event': 'auth', 'user_id': g.user['user_id'] if g.user else None})
             return jsonify({'message': 'logout successful'})
         except Exception as e:
-            print(f"Logout error: {str(e)}")
+            logger.exception('Logout failed')
             return jsonify({'error': 'Internal server error'}), 500
         
\ No newline at end of file
@@ -44,4 +44,6 @@ class CountryController:
         result = Country.delete(country_id)
         if result is None:
             return jsonify({'error': 'Country not found'}), 404
+        if 'error' in result:
+            return jsonify(result), 409
         return jsonify(result)
\ No newline at end of file
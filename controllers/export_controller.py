@@ -0,0 +1,50 @@
+from datetime import datetime
+from flask import current_app, jsonify, request
+from models.like import Like
+from models.vacation import Vacation
+from services.export import Exporter, EXPORT_FORMATS
+from constants import EXPORT_FETCH_SIZE
+
+
+class ExportController:
+    @staticmethod
+    def stream(name, columns, query, **params):
+        """
+        Streamed CSV/JSON Lines download, in the requested `format` (default
+        csv), of the rows yielded by query(EXPORT_FETCH_SIZE, **params). Rows
+        are pulled from the database while the response is written, so nothing
+        is buffered on the worker.
+        """
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}."}), 400
+
+        rows = query(EXPORT_FETCH_SIZE, **params)
+        response = current_app.response_class(Exporter.encode(columns, rows, export_format),
+                                              mimetype=Exporter.content_type(export_format))
+        response.headers['Content-Disposition'] = f'attachment; filename="{Exporter.file_name(name, export_format)}"'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    @staticmethod
+    def export_vacations():
+        """GET /exports/vacations - every vacation with its country name and like count."""
+        return ExportController.stream('vacations', Vacation.EXPORT_COLUMNS, Vacation.iter_export)
+
+    @staticmethod
+    def export_likes_per_country():
+        """GET /exports/likes-per-country - vacations and likes per country."""
+        return ExportController.stream('likes-per-country', Like.PER_COUNTRY_COLUMNS, Like.iter_likes_per_country)
+
+    @staticmethod
+    def export_likes_per_day():
+        """GET /exports/likes-per-day?start_date=&end_date= - likes made on each UTC day."""
+        dates = {}
+        for field in ('start_date', 'end_date'):
+            if request.args.get(field):
+                try:
+                    datetime.strptime(request.args[field], '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({'error': f'{field} must be in YYYY-MM-DD format.'}), 400
+                dates[field] = request.args[field]
+        return ExportController.stream('likes-per-day', Like.PER_DAY_COLUMNS, Like.iter_likes_per_day, **dates)
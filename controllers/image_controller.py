@@ -0,0 +1,109 @@
+import io
+import mimetypes
+import os
+import stat
+from flask import abort, current_app, jsonify, request, send_file
+from werkzeug.security import safe_join
+from models.vacation import Vacation
+from services.image_processing import ImageProcessor
+from services.image_store import ImageStore, IMAGES_DIR
+from constants import (IMAGE_VARIANT_WIDTHS, IMAGE_CACHE_MAX_AGE, IMAGE_IMMUTABLE_MAX_AGE,
+                       IMAGE_SENDFILE_MODE, IMAGE_ACCEL_REDIRECT_PREFIX)
+
+
+class ImageController:
+    @staticmethod
+    def serve_image(filename):
+        """
+        GET /images/<filename>
+
+        Serves the best stored variant of a picture: `w` asks for a display width
+        (the smallest variant at least that wide is sent) and WebP is sent to
+        clients whose Accept header lists image/webp. Pictures without variants
+        are served as uploaded; while their variants are still being generated
+        a flat placeholder of the same aspect ratio is served instead.
+        Content-addressed pictures are cacheable forever.
+        """
+        requested_width = None
+        if request.args.get('w'):
+            try:
+                requested_width = int(request.args['w'])
+            except ValueError:
+                return jsonify({'error': 'w must be a positive integer.'}), 400
+            if requested_width <= 0:
+                return jsonify({'error': 'w must be a positive integer.'}), 400
+
+        metadata = Vacation.get_picture_variants(filename)
+        accepts_webp = 'image/webp' in request.headers.get('Accept', '')
+        if metadata and metadata.get('status') == 'pending':
+            return ImageController.serve_placeholder(metadata, requested_width, accepts_webp)
+
+        directory, variant = ImageProcessor.select_variant(filename, metadata, requested_width, accepts_webp)
+        # Content-addressed bytes never change, but before variants exist the original
+        # stands in for ?w= and WebP requests: don't pin that forever
+        immutable = ImageStore.is_content_addressed(filename) and \
+            bool(metadata or not (requested_width or accepts_webp))
+
+        response = ImageController.send_picture(directory, variant, immutable)
+        if metadata:
+            # The bytes depend on Accept, so shared caches must keep one copy per format
+            response.vary.add('Accept')
+        return response
+
+    @staticmethod
+    def send_picture(directory, name, immutable):
+        """
+        Send one stored file with validators (ETag, Last-Modified) and the
+        configured Cache-Control. Conditional requests get 304 and Range
+        requests 206. With IMAGE_SENDFILE_MODE set, only headers are produced
+        and the front proxy streams the file (and handles ranges) itself.
+        """
+        path = safe_join(directory, name)
+        try:
+            file_stat = os.stat(path) if path else None
+        except FileNotFoundError:
+            file_stat = None
+        if file_stat is None or not stat.S_ISREG(file_stat.st_mode):
+            abort(404)
+
+        # Content-addressed names identify their bytes on every server; otherwise mtime + size
+        etag = name if immutable else f'{file_stat.st_mtime_ns:x}-{file_stat.st_size:x}'
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+        if IMAGE_SENDFILE_MODE in ('x-sendfile', 'x-accel'):
+            response = current_app.response_class(mimetype=mimetype)
+            if IMAGE_SENDFILE_MODE == 'x-sendfile':
+                response.headers['X-Sendfile'] = path
+            else:
+                relative = os.path.relpath(path, IMAGES_DIR).replace(os.sep, '/')
+                response.headers['X-Accel-Redirect'] = IMAGE_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + relative
+            response.set_etag(etag)
+            response.last_modified = file_stat.st_mtime
+            response.make_conditional(request)
+        else:
+            response = send_file(path, mimetype=mimetype, conditional=True, etag=etag,
+                                 last_modified=file_stat.st_mtime)
+            response.accept_ranges = 'bytes'
+
+        if immutable:
+            response.headers['Cache-Control'] = f'public, max-age={IMAGE_IMMUTABLE_MAX_AGE}, immutable'
+        else:
+            response.headers['Cache-Control'] = f'public, max-age={IMAGE_CACHE_MAX_AGE}'
+        return response
+
+    @staticmethod
+    def serve_placeholder(metadata, requested_width, accepts_webp):
+        width = metadata['width']
+        # Snap to the widths variants will have, so only a handful of placeholders get encoded
+        widths = sorted(w for w in IMAGE_VARIANT_WIDTHS if 0 < w < width) + [width]
+        if requested_width:
+            width = next((w for w in widths if w >= requested_width), widths[-1])
+        height = max(1, round(metadata['height'] * width / metadata['width']))
+
+        image_format = 'webp' if accepts_webp else 'png'
+        data = ImageProcessor.placeholder(width, height, image_format)
+        response = send_file(io.BytesIO(data), mimetype=f'image/{image_format}')
+        # The real picture replaces it shortly, so it must never be cached
+        response.headers['Cache-Control'] = 'no-store'
+        response.vary.add('Accept')
+        return response
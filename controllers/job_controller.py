@@ -0,0 +1,28 @@
+from flask import jsonify, request
+from models.job import Job
+
+JOB_STATUSES = ('pending', 'running', 'done', 'failed')
+
+
+class JobController:
+    @staticmethod
+    def get_jobs():
+        """GET /jobs?status=&limit= - newest background jobs plus per-status counts."""
+        status = request.args.get('status')
+        if status and status not in JOB_STATUSES:
+            return jsonify({'error': f"status must be one of: {', '.join(JOB_STATUSES)}."}), 400
+        try:
+            limit = int(request.args.get('limit', 50))
+        except ValueError:
+            return jsonify({'error': 'limit must be a number.'}), 400
+        if not (1 <= limit <= 500):
+            return jsonify({'error': 'limit must be between 1 and 500.'}), 400
+
+        return jsonify({'jobs': Job.get_recent(status, limit), 'counts': Job.get_counts()})
+
+    @staticmethod
+    def get_job(job_id):
+        job = Job.get_by_id(job_id)
+        if job is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job)
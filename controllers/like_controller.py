@@ -1,6 +1,7 @@
 from flask import jsonify, request, g 
 from models.like import Like          
 from models.vacation import Vacation  
+from constants import LIKES_BATCH_MAX_OPERATIONS
 
 class LikeController:
     @staticmethod
@@ -48,4 +49,50 @@ class LikeController:
             else:
                 return jsonify(result), 500 
         
-        return jsonify(result), 200 
\ No newline at end of file
+        return jsonify(result), 200
+
+    @staticmethod
+    def batch_likes():
+        """
+        POST /likes/batch
+
+        Body: {"operations": [{"vacation_id": 1, "action": "like" | "unlike"}, ...]}
+        Applies all operations in one transaction. Operations are taken in
+        order, so for a vacation listed more than once the last one wins, and
+        repeating a like or unlike is not an error. Returns the resulting state
+        and like count of each vacation.
+        """
+        user_id = g.user['user_id']
+
+        data = request.get_json()
+        operations = data.get('operations') if isinstance(data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'error': 'Missing required field: operations (a non-empty list).'}), 400
+        if len(operations) > LIKES_BATCH_MAX_OPERATIONS:
+            return jsonify({'error': f'At most {LIKES_BATCH_MAX_OPERATIONS} operations per batch.'}), 400
+
+        desired = {}  # vacation_id -> liked, last operation wins
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict) or operation.get('action') not in ('like', 'unlike'):
+                return jsonify({'error': f"Operation {index}: action must be 'like' or 'unlike'."}), 400
+            try:
+                vacation_id = int(operation.get('vacation_id'))
+            except (ValueError, TypeError):
+                return jsonify({'error': f'Operation {index}: invalid vacation_id format.'}), 400
+            desired.pop(vacation_id, None)
+            desired[vacation_id] = operation['action'] == 'like'
+
+        like_ids = [vacation_id for vacation_id, liked in desired.items() if liked]
+        unlike_ids = [vacation_id for vacation_id, liked in desired.items() if not liked]
+        result = Like.apply_batch(user_id=user_id, like_ids=like_ids, unlike_ids=unlike_ids)
+        if 'error' in result:
+            return jsonify(result), 409
+
+        vacations = []
+        for vacation_id in desired:
+            state = result['vacations'].get(vacation_id)
+            if state is None:
+                vacations.append({'vacation_id': vacation_id, 'error': 'Vacation not found.'})
+            else:
+                vacations.append(dict(vacation_id=vacation_id, **state))
+        return jsonify({'vacations': vacations, 'liked': result['liked'], 'unliked': result['unliked']}), 200
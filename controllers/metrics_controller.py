@@ -0,0 +1,12 @@
+from flask import current_app
+from services.metrics import RequestMetrics
+
+
+class MetricsController:
+    @staticmethod
+    def get_metrics():
+        """GET /metrics - request counts, latency histograms and in-flight requests of every worker."""
+        response = current_app.response_class(RequestMetrics.render(), mimetype='text/plain')
+        response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
@@ -0,0 +1,79 @@
+from flask import current_app, jsonify, request
+from services.profiler import RequestProfiler, PROFILER_MODES, PROFILER_FORMATS
+from constants import PROFILER_MAX_SECONDS, PROFILER_MAX_REQUESTS
+
+
+class ProfilerController:
+    @staticmethod
+    def describe(session):
+        return dict(
+            session,
+            running=RequestProfiler.is_running(session),
+            profiled_requests=RequestProfiler.claimed(session),
+            format=PROFILER_FORMATS[session['mode']]
+        )
+
+    @staticmethod
+    def start_profiling():
+        """
+        POST /profiler - profile the next `requests` requests and/or the next
+        `seconds` seconds of traffic on every worker.
+        Body: {"mode": "sample" | "cprofile", "seconds": 60, "requests": 500}
+        """
+        data = request.get_json(silent=True) or {}
+        mode = data.get('mode', 'sample')
+        if mode not in PROFILER_MODES:
+            return jsonify({'error': f"mode must be one of: {', '.join(PROFILER_MODES)}."}), 400
+
+        seconds = data.get('seconds', 60)
+        if not isinstance(seconds, (int, float)) or isinstance(seconds, bool) or not (0 < seconds <= PROFILER_MAX_SECONDS):
+            return jsonify({'error': f'seconds must be a number between 0 and {PROFILER_MAX_SECONDS}.'}), 400
+        requests = data.get('requests')
+        if requests is not None and (not isinstance(requests, int) or isinstance(requests, bool)
+                                     or not (1 <= requests <= PROFILER_MAX_REQUESTS)):
+            return jsonify({'error': f'requests must be an integer between 1 and {PROFILER_MAX_REQUESTS}.'}), 400
+
+        session, error = RequestProfiler.start(mode, seconds, requests)
+        if error:
+            return jsonify({'error': error}), 409
+        return jsonify(ProfilerController.describe(session)), 201
+
+    @staticmethod
+    def get_profile():
+        """GET /profiler - the current or last session with per-route totals and hottest functions."""
+        session = RequestProfiler.load_session()
+        if session is None:
+            return jsonify({'error': 'No profiling session has been started.'}), 404
+        return jsonify(dict(ProfilerController.describe(session), routes=RequestProfiler.summary(session)))
+
+    @staticmethod
+    def stop_profiling():
+        """DELETE /profiler - end the running session early; its results stay downloadable."""
+        session = RequestProfiler.stop()
+        if session is None:
+            return jsonify({'error': 'No profiling session has been started.'}), 404
+        return jsonify(ProfilerController.describe(session))
+
+    @staticmethod
+    def download_profile():
+        """
+        GET /profiler/download?route= - the session's results as a file: collapsed
+        stacks for sample sessions, pstats for cprofile sessions. `route` (e.g.
+        "GET vacations.get_all_vacations") limits it to one route.
+        """
+        session = RequestProfiler.load_session()
+        if session is None:
+            return jsonify({'error': 'No profiling session has been started.'}), 404
+        route = request.args.get('route') or None
+
+        if session['mode'] == 'sample':
+            body = RequestProfiler.collapsed(session, route)
+            response = current_app.response_class(body, mimetype='text/plain')
+            file_name = f"profile-{session['id'][:8]}.folded"
+        else:
+            body = RequestProfiler.pstats_bytes(session, route)
+            response = current_app.response_class(body, mimetype='application/octet-stream')
+            file_name = f"profile-{session['id'][:8]}.pstats"
+        response.headers['Content-Disposition'] = f'attachment; filename="{file_name}"'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
@@ -48,6 +48,8 @@ class RoleController:
         result = Role.delete(role_id)
         if result is None:
             return jsonify({'error': 'Role not found'}), 404
+        if 'error' in result:
+            return jsonify(result), 409
         return jsonify(result)
     
     
\ No newline at end of file
@@ -1,7 +1,7 @@
 from flask import jsonify, request
 from models.user import User
 from models.role import Role
-from werkzeug.security import generate_password_hash
+from services.password_hasher import PasswordHasher
 from constants import USER_ROLE_ID, ADMIN_ROLE_ID
 
 class UserController:
@@ -19,7 +19,7 @@ class UserController:
                 return jsonify({'error': 'Cannot create admin user'}), 403
         
         # Hash password before sending to model
-        password_hash = generate_password_hash(data['password'])
+        password_hash = PasswordHasher.hash(data['password'])
         
         result = User.insert(
             first_name=data['first_name'],
@@ -57,7 +57,7 @@ class UserController:
         
         # Hash password if it's being updated
         if 'password' in data:
-            data['password'] = generate_password_hash(data['password'])
+            data['password'] = PasswordHasher.hash(data['password'])
             
         result = User.update(user_id, **data)
         if result is None:
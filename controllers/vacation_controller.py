@@ -1,9 +1,20 @@
-from flask import jsonify, request
+from flask import jsonify, request, g
 from models.vacation import Vacation
-from datetime import datetime, date # Needed for date validation
-from constants import MAX_PRICE, MIN_PRICE
-import os
-from werkzeug.utils import secure_filename
+from models.cache import (vacation_catalog_cache, image_metadata_cache, country_list_cache,
+                          user_principal_cache, verified_token_cache)
+from services.image_processing import ImageProcessor, ImageProcessingError
+from services.image_store import ImageStore, UnsupportedImageTypeError
+from services.image_jobs import queue_picture_processing, queue_picture_release
+from services.vacation_validation import VacationValidator, EDITABLE_FIELDS
+from services.vacation_import import VacationImporter, ImportFormatError
+from datetime import datetime # Needed for date validation
+from constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, IMPORT_BATCH_SIZE, LOG_REQUEST_PAYLOADS
+import base64
+import binascii
+import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class VacationController:
@@ -15,55 +26,16 @@ class VacationController:
         
         # Regular JSON request
         data = request.get_json()
-
-        # --- 1. Check for missing required fields ---
-        required_fields = [
-            'country_id', 'vacation_description', 'vacation_start',
-            'vacation_end', 'price', 'picture_file_name'
-        ]
-        for field in required_fields:
-            # Check if field is missing or if its value is None or an empty string
-            if field not in data or data[field] is None or (isinstance(data[field], str) and not data[field].strip()):
-                return jsonify({'error': f"Missing or empty required field: '{field}'"}), 400
-
-        # --- 2. Price validation ---
-        try:
-            # Convert price to float immediately for validation and consistency
-            price_val = float(data['price']) 
-            if not (MIN_PRICE <= price_val <= MAX_PRICE):
-                return jsonify({'error': f'Price must be a positive number and not exceed {MAX_PRICE}.'}), 400
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Price must be a valid number.'}), 400
-
-        # --- 3. Date format validation and conversion ---
-        vacation_start_str = data['vacation_start']
-        vacation_end_str = data['vacation_end']
-
-        try:
-            start_date_obj = datetime.strptime(vacation_start_str, '%Y-%m-%d').date()
-            end_date_obj = datetime.strptime(vacation_end_str, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({'error': 'Vacation dates must be in YYYY-MM-DD format.'}), 400
-
-        # --- 4. Check if end date is before start date ---
-        if end_date_obj < start_date_obj:
-            return jsonify({'error': 'Vacation end date cannot be before the start date.'}), 400
-
-        # --- 5. Check if start date is in the past (only for new vacations) ---
-        # For updates, we allow past dates since vacations might already have started
-        today = date.today()
-        if start_date_obj < today:
-            return jsonify({'error': 'Vacation start date cannot be in the past.'}), 400
+        if data is None:
+            return jsonify({'error': 'Request body must be JSON.'}), 400
+        values, error = VacationValidator.validate_new(data)
+        if error:
+            return jsonify({'error': error}), 400
 
         # --- If all validations pass, call the cleaner insert function in the model ---
-        # Pass the original string dates, as the model's SQL expects them that way
         result = Vacation.insert(
-            country_id=data['country_id'],
-            vacation_description=data['vacation_description'],
-            vacation_start=vacation_start_str,
-            vacation_end=vacation_end_str,
-            price=price_val,
-            picture_file_name=data['picture_file_name']
+            picture_variants=Vacation.get_picture_variants(values['picture_file_name']),
+            **values
         )
 
         # --- Handle the model's return (success or database-level error) ---
@@ -77,81 +49,182 @@ class VacationController:
     def insert_vacation_with_file():
         """Handle vacation creation with file upload"""
         try:
-            # Get form data
-            vacation_description = request.form.get('vacation_description')
-            country_id = request.form.get('country_id')
-            vacation_start = request.form.get('vacation_start')
-            vacation_end = request.form.get('vacation_end')
-            price = request.form.get('price')
-            
-            # Check required fields
-            if not all([vacation_description, country_id, vacation_start, vacation_end, price]):
-                return jsonify({'error': 'Missing required fields'}), 400
-            
+            # The picture is the uploaded file, so it is not a form field
+            values, error = VacationValidator.validate_new(request.form, fields=EDITABLE_FIELDS)
+            if error:
+                return jsonify({'error': error}), 400
+
             # Handle file upload
             if 'image' not in request.files:
                 return jsonify({'error': 'No image file provided'}), 400
-            
+
             file = request.files['image']
             if file.filename == '':
                 return jsonify({'error': 'No image file selected'}), 400
-            
-            # Secure the filename and save the file
-            filename = secure_filename(file.filename)
-            
-            # Ensure images directory exists
-            images_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'images')
-            os.makedirs(images_dir, exist_ok=True)
-            
-            # Save the file
-            file_path = os.path.join(images_dir, filename)
-            file.save(file_path)
-            
-            # Validate price
-            try:
-                price_val = float(price)
-                if not (MIN_PRICE <= price_val <= MAX_PRICE):
-                    return jsonify({'error': f'Price must be a positive number and not exceed {MAX_PRICE}.'}), 400
-            except (ValueError, TypeError):
-                return jsonify({'error': 'Price must be a valid number.'}), 400
-            
-            # Validate dates
-            try:
-                start_date_obj = datetime.strptime(vacation_start, '%Y-%m-%d').date()
-                end_date_obj = datetime.strptime(vacation_end, '%Y-%m-%d').date()
-            except ValueError:
-                return jsonify({'error': 'Vacation dates must be in YYYY-MM-DD format.'}), 400
-            
-            if end_date_obj < start_date_obj:
-                return jsonify({'error': 'Vacation end date cannot be before the start date.'}), 400
-            
-            today = date.today()
-            if start_date_obj < today:
-                return jsonify({'error': 'Vacation start date cannot be in the past.'}), 400
-            
+
+            # Only now that the form is valid, store the file
+            stored, error = VacationController.store_uploaded_image(file)
+            if error:
+                return jsonify({'error': error}), 400
+            filename, width, height = stored
+
             # Insert into database
-            result = Vacation.insert(
-                country_id=int(country_id),
-                vacation_description=vacation_description,
-                vacation_start=vacation_start,
-                vacation_end=vacation_end,
-                price=price_val,
-                picture_file_name=filename
-            )
+            values['picture_file_name'] = filename
+            result = Vacation.insert(**values)
             
             if 'error' in result:
+                queue_picture_release(filename)
                 return jsonify(result), 409
             else:
+                result['job_id'] = queue_picture_processing(filename, width, height)
                 return jsonify(result), 201
                 
         except Exception as e:
             return jsonify({'error': f'Error processing file upload: {str(e)}'}), 500
 
     
+    @staticmethod
+    def import_vacations():
+        """
+        POST /vacations/import
+
+        Bulk-creates vacations from CSV (header row with the POST /vacations
+        field names) or JSON Lines, sent either as the raw request body or as
+        the multipart file field `file`. The format comes from `format`, the
+        content type or the file name. `batch_size` sets the rows per insert
+        transaction. Invalid rows are skipped and reported with their line
+        number; valid rows are inserted regardless.
+        """
+        try:
+            batch_size = int(request.args.get('batch_size', IMPORT_BATCH_SIZE))
+        except ValueError:
+            return jsonify({'error': 'batch_size must be a positive integer.'}), 400
+        if batch_size < 1:
+            return jsonify({'error': 'batch_size must be a positive integer.'}), 400
+
+        if request.content_type and 'multipart/form-data' in request.content_type:
+            upload = request.files.get('file')
+            if upload is None or upload.filename == '':
+                return jsonify({'error': 'No import file provided'}), 400
+            stream, content_type, filename = upload.stream, upload.content_type, upload.filename
+        else:
+            # Read straight from the socket; the body is never held in memory
+            stream, content_type, filename = request.stream, request.content_type, None
+
+        try:
+            import_format = VacationImporter.detect_format(request.args.get('format'), content_type, filename)
+            report = VacationImporter.run(stream, import_format, batch_size)
+        except ImportFormatError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if 'error' in report:
+            return jsonify(report), 400
+        return jsonify(report)
+
+    @staticmethod
+    def store_uploaded_image(file):
+        """
+        Stream an uploaded picture into the content-addressed image store.
+        Returns ((filename, width, height), None) or (None, error message).
+        """
+        # Header-only check that this is an image, before it is stored; resizing happens in the background
+        try:
+            return ImageStore.save(file, ImageProcessor.identify), None
+        except UnsupportedImageTypeError as e:
+            return None, str(e)
+        except ImageProcessingError:
+            return None, 'Uploaded file is not a valid image.'
+
+    @staticmethod
+    def encode_cursor(vacation):
+        """Opaque keyset cursor pointing just after the given vacation."""
+        raw = json.dumps([vacation['vacation_start'], vacation['vacation_id']]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            vacation_start, vacation_id = json.loads(raw)
+            if not isinstance(vacation_start, str) or not isinstance(vacation_id, int):
+                return None
+            return vacation_start, vacation_id
+        except (binascii.Error, ValueError, TypeError):
+            return None
+
+    @staticmethod
+    def parse_catalog_filters(args):
+        """
+        Parse the GET /vacations filter query parameters.
+        Returns (filters, None) on success or (None, error message).
+        """
+        filters = {}
+        try:
+            if args.get('country_id'):
+                filters['country_id'] = int(args['country_id'])
+            if args.get('min_price'):
+                filters['min_price'] = float(args['min_price'])
+            if args.get('max_price'):
+                filters['max_price'] = float(args['max_price'])
+        except ValueError:
+            return None, 'country_id, min_price and max_price must be numbers.'
+
+        for field in ('start_date', 'end_date'):
+            if args.get(field):
+                try:
+                    datetime.strptime(args[field], '%Y-%m-%d')
+                except ValueError:
+                    return None, f'{field} must be in YYYY-MM-DD format.'
+                filters[field] = args[field]
+
+        if args.get('liked', '').lower() in ('1', 'true'):
+            if not g.user:
+                return None, 'You must be logged in to filter by liked vacations.'
+            filters['liked_by'] = g.user['user_id']
+
+        return filters, None
+
     @staticmethod
     def get_all_vacations():
-        vacations = Vacation.get_all()
-        return jsonify({'vacations': vacations})
+        """
+        GET /vacations
+
+        Keyset-paginated by default: returns up to `limit` vacations plus a
+        `next_cursor` to pass back as `cursor` for the following page (null on the
+        last page). Optional filters: country_id, min_price, max_price, start_date,
+        end_date, liked=true (requires a token). Pass all=true for the full,
+        unpaginated list.
+        """
+        filters, error = VacationController.parse_catalog_filters(request.args)
+        if error:
+            status = 401 if 'logged in' in error else 400
+            return jsonify({'error': error}), status
+
+        if request.args.get('all', '').lower() in ('1', 'true'):
+            vacations = Vacation.get_filtered(**filters)
+            return jsonify({'vacations': vacations})
+
+        try:
+            limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return jsonify({'error': 'limit must be a number.'}), 400
+        if not (1 <= limit <= MAX_PAGE_SIZE):
+            return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}.'}), 400
+
+        after = None
+        if request.args.get('cursor'):
+            after = VacationController.decode_cursor(request.args['cursor'])
+            if after is None:
+                return jsonify({'error': 'Invalid cursor.'}), 400
+
+        # Fetch one extra row to know whether another page exists
+        vacations = Vacation.get_filtered(limit=limit + 1, after=after, **filters)
+        next_cursor = None
+        if len(vacations) > limit:
+            vacations = vacations[:limit]
+            next_cursor = VacationController.encode_cursor(vacations[-1])
+
+        return jsonify({'vacations': vacations, 'next_cursor': next_cursor, 'limit': limit})
     
     @staticmethod
     def get_vacation(vacation_id):
@@ -168,49 +241,26 @@ class VacationController:
         
         # Regular JSON request
         data = request.get_json()
-        print(f"Update vacation {vacation_id} with data: {data}")  # Debug logging
-
-        
-        required_fields = [
-            'country_id',
-            'vacation_description',
-            'vacation_start',
-            'vacation_end',
-            'price'
-           
-        ]
+        # Field names only; values may be logged with LOG_REQUEST_PAYLOADS=1
+        logger.debug('Updating vacation %s', vacation_id,
+                     extra={'fields': sorted(data) if isinstance(data, dict) else None,
+                            **({'payload': dict(data)} if LOG_REQUEST_PAYLOADS else {})})
 
-        for field in required_fields:
-            if field not in data or data[field] is None or (isinstance(data[field], str) and not data[field].strip()):
-                return jsonify({'error': f"Missing or empty required field for update: '{field}'. All fields except 'picture_file_name' must be provided."}), 400
-
-      
-        try:
-            price_val = float(data['price'])
-            if not (MIN_PRICE <= price_val <= MAX_PRICE):
-                return jsonify({'error': f'Price must be a positive number and not exceed {MAX_PRICE}.'}), 400
-            data['price'] = price_val
-        except (ValueError, TypeError):
-            return jsonify({'error': 'Price must be a valid number.'}), 400
+        if data is None:
+            return jsonify({'error': 'Request body must be JSON.'}), 400
+        values, error = VacationValidator.validate_update(data)
+        if error:
+            return jsonify({'error': error}), 400
 
+        # Variant metadata follows the picture file, it is never set by clients
+        previous = None
+        if values.get('picture_file_name'):
+            values['picture_variants'] = Vacation.get_picture_variants(values['picture_file_name'])
+            previous = Vacation.get_by_id(vacation_id)
         
-        vacation_start_str = data['vacation_start']
-        vacation_end_str = data['vacation_end']
-
-        try:
-            start_date_obj = datetime.strptime(vacation_start_str, '%Y-%m-%d').date()
-            end_date_obj = datetime.strptime(vacation_end_str, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({'error': 'Vacation dates must be in YYYY-MM-DD format.'}), 400
-
-        
-        if end_date_obj < start_date_obj:
-            return jsonify({'error': 'Vacation end date cannot be before the start date.'}), 400
-
-        # For updates, we allow past dates since vacations might already have started
-        # No need to check if start date is in the past for updates
-        
-        result = Vacation.update(vacation_id, **data)
+        result = Vacation.update(vacation_id, **values)
+        if previous and 'error' not in result and previous['picture_file_name'] != values['picture_file_name']:
+            queue_picture_release(previous['picture_file_name'])
         
        
         if 'error' in result:
@@ -225,69 +275,40 @@ class VacationController:
     def update_vacation_with_file(vacation_id):
         """Handle vacation update with file upload"""
         try:
-            # Get form data
-            vacation_description = request.form.get('vacation_description')
-            country_id = request.form.get('country_id')
-            vacation_start = request.form.get('vacation_start')
-            vacation_end = request.form.get('vacation_end')
-            price = request.form.get('price')
-            
-            # Check required fields
-            if not all([vacation_description, country_id, vacation_start, vacation_end, price]):
-                return jsonify({'error': 'Missing required fields'}), 400
-            
+            # The picture is the uploaded file, so it is not a form field
+            values, error = VacationValidator.validate_update(request.form)
+            if error:
+                return jsonify({'error': error}), 400
+
             # Handle file upload
             if 'image' not in request.files:
                 return jsonify({'error': 'No image file provided'}), 400
-            
+
             file = request.files['image']
             if file.filename == '':
                 return jsonify({'error': 'No image file selected'}), 400
-            
-            # Secure the filename and save the file
-            filename = secure_filename(file.filename)
-            
-            # Ensure images directory exists
-            images_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'images')
-            os.makedirs(images_dir, exist_ok=True)
-            
-            # Save the file
-            file_path = os.path.join(images_dir, filename)
-            file.save(file_path)
-            
-            # Validate price
-            try:
-                price_val = float(price)
-                if not (MIN_PRICE <= price_val <= MAX_PRICE):
-                    return jsonify({'error': f'Price must be a positive number and not exceed {MAX_PRICE}.'}), 400
-            except (ValueError, TypeError):
-                return jsonify({'error': 'Price must be a valid number.'}), 400
-            
-            # Validate dates
-            try:
-                start_date_obj = datetime.strptime(vacation_start, '%Y-%m-%d').date()
-                end_date_obj = datetime.strptime(vacation_end, '%Y-%m-%d').date()
-            except ValueError:
-                return jsonify({'error': 'Vacation dates must be in YYYY-MM-DD format.'}), 400
-            
-            if end_date_obj < start_date_obj:
-                return jsonify({'error': 'Vacation end date cannot be before the start date.'}), 400
-            
+
+            # Only now that the form is valid, store the file
+            stored, error = VacationController.store_uploaded_image(file)
+            if error:
+                return jsonify({'error': error}), 400
+            filename, width, height = stored
+
             # Update in database with new filename
-            result = Vacation.update(vacation_id, 
-                country_id=int(country_id),
-                vacation_description=vacation_description,
-                vacation_start=vacation_start,
-                vacation_end=vacation_end,
-                price=price_val,
-                picture_file_name=filename
-            )
+            previous = Vacation.get_by_id(vacation_id)
+            values['picture_file_name'] = filename
+            values['picture_variants'] = None  # set by queue_picture_processing below
+            result = Vacation.update(vacation_id, **values)
             
             if 'error' in result:
+                queue_picture_release(filename)
                 if "Vacation not found" in result['error']:
                     return jsonify(result), 404
                 return jsonify(result), 409
             else:
+                result['job_id'] = queue_picture_processing(filename, width, height)
+                if previous and previous['picture_file_name'] != filename:
+                    queue_picture_release(previous['picture_file_name'])
                 return jsonify(result)
                 
         except Exception as e:
@@ -296,9 +317,12 @@ class VacationController:
     
     @staticmethod
     def delete_vacation(vacation_id):
+        vacation = Vacation.get_by_id(vacation_id)
         result = Vacation.delete(vacation_id)
         if result is None:
             return jsonify({'error': 'Vacation not found'}), 404
+        if vacation:
+            queue_picture_release(vacation['picture_file_name'])
         return jsonify(result)
 
     @staticmethod
@@ -306,4 +330,15 @@ class VacationController:
         from decorators.auth_decorator import g
         user_id = g.user['user_id']
         liked_vacations = Vacation.get_user_liked_vacations(user_id)
-        return jsonify({'liked_vacations': liked_vacations})
\ No newline at end of file
+        return jsonify({'liked_vacations': liked_vacations})
+
+    @staticmethod
+    def get_catalog_cache_stats():
+        """Hit/miss counters of this worker's in-process caches, for monitoring."""
+        return jsonify({
+            'catalog_cache': vacation_catalog_cache.stats(),
+            'image_metadata_cache': image_metadata_cache.stats(),
+            'country_list_cache': country_list_cache.stats(),
+            'user_principal_cache': user_principal_cache.stats(),
+            'verified_token_cache': verified_token_cache.stats()
+        })
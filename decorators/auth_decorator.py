@@ -1,80 +1,123 @@
 from functools import wraps
 from flask import request, jsonify, g
+import time
 import jwt
 from flask import current_app
 from models.user import User
+from models.cache import verified_token_cache
+from models.token_version import TokenVersion
 from constants import ADMIN_ROLE_ID
 
+
+class AuthError(Exception):
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def get_bearer_token():
+    """Return the token from 'Authorization: Bearer <token>', or None if no header was sent."""
+    if 'Authorization' not in request.headers:
+        return None
+    try:
+        return request.headers['Authorization'].split(" ")[1]  # Bearer <token>
+    except IndexError:
+        raise AuthError('Invalid token format')
+
+
+def decode_token(token):
+    """
+    Verify a JWT and return its payload.
+    Verified payloads are cached by token so repeat requests skip the HMAC check;
+    expiry is still enforced on every call.
+    """
+    payload = verified_token_cache.get(token)
+    if payload is None:
+        try:
+            # Required claims, so a signed token without them is rejected rather than a KeyError below
+            payload = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"],
+                                 options={'require': ['exp', 'user_id']})
+        except jwt.ExpiredSignatureError:
+            raise AuthError('Token has expired')
+        except jwt.InvalidTokenError:
+            raise AuthError('Invalid token')
+        verified_token_cache.put(token, payload, ttl=payload['exp'] - time.time())
+    elif payload['exp'] <= time.time():
+        verified_token_cache.pop(token)
+        raise AuthError('Token has expired')
+    return payload
+
+
+def authenticate():
+    """
+    Shared authentication pipeline: token -> verified payload -> revocation check.
+
+    Returns the principal {'user_id', 'role_id'} taken from the token's claims,
+    so authorization never reads the users table. The token's 'tv' claim must
+    match the user's current token version (bumped on logout, role/password
+    change and deletion). Tokens issued before role claims existed fall back to
+    the cached principal lookup.
+    """
+    token = get_bearer_token()
+    if not token:
+        raise AuthError('Token is missing')
+
+    payload = decode_token(token)
+    user_id = payload['user_id']
+    if payload.get('tv', 0) != TokenVersion.get(user_id):
+        raise AuthError('Token has been revoked')
+
+    if 'role_id' in payload:
+        return {'user_id': user_id, 'role_id': payload['role_id']}
+
+    current_user = User.get_principal(user_id)
+    if not current_user:
+        raise AuthError('Invalid token')
+    return {'user_id': user_id, 'role_id': current_user['role_id']}
+
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        # Check if token is in headers
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]  # Bearer <token>
-            except IndexError:
-                return jsonify({'error': 'Invalid token format'}), 401
-        
-        if not token:
-            return jsonify({'error': 'Token is missing'}), 401
-        
         try:
-            # Decode the token
-            data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
-            current_user = User.get_by_id(data['user_id'])
-            
-            if not current_user:
-                return jsonify({'error': 'Invalid token'}), 401
-                
-            g.user = current_user
-            
-        except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'error': 'Invalid token'}), 401
-        
+            g.user = authenticate()
+        except AuthError as e:
+            return jsonify({'error': e.message}), e.status
+
         return f(*args, **kwargs)
-    
+
     return decorated
 
 def admin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        # Check if token is in headers
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]  # Bearer <token>
-            except IndexError:
-                return jsonify({'error': 'Invalid token format'}), 401
-        
-        if not token:
-            return jsonify({'error': 'Token is missing'}), 401
-        
         try:
-            # Decode the token
-            data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
-            current_user = User.get_by_id(data['user_id'])
-            
-            if not current_user:
-                return jsonify({'error': 'Invalid token'}), 401
-            
-            # Check if user is admin
-            if current_user['role_id'] != ADMIN_ROLE_ID:
-                return jsonify({'error': 'Admin access required'}), 403
-                
-            g.user = current_user
-            
-        except jwt.ExpiredSignatureError:
-            return jsonify({'error': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'error': 'Invalid token'}), 401
-        
+            current_user = authenticate()
+        except AuthError as e:
+            return jsonify({'error': e.message}), e.status
+
+        # Check if user is admin
+        if current_user['role_id'] != ADMIN_ROLE_ID:
+            return jsonify({'error': 'Admin access required'}), 403
+
+        g.user = current_user
+        return f(*args, **kwargs)
+
+    return decorated
+
+def token_optional(f):
+    """
+    For public routes that personalise their response when a user is logged in.
+    Sets g.user to the authenticated user, or None when the token is missing or invalid.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            g.user = authenticate()
+        except AuthError:
+            g.user = None
+
         return f(*args, **kwargs)
-    
+
     return decorated
@@ -0,0 +1,49 @@
+from functools import wraps
+import hashlib
+from flask import request, g, make_response
+from models.cache import CacheCoherency
+from constants import HTTP_CACHE_MAX_AGE
+
+
+def versioned_etag(*tables, public=True, vary_by_user=False):
+    """
+    Strong ETag + conditional GET for responses derived only from `tables`.
+
+    The ETag is a hash of the request URL and the tables' table_versions
+    counters (plus the user id when `vary_by_user` is true, or returns true for
+    the current request). A matching If-None-Match is answered with 304 before
+    the view runs, so an unchanged resource costs one tiny version query.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            versions = CacheCoherency.current_versions()
+            personal = vary_by_user() if callable(vary_by_user) else vary_by_user
+            user = g.get('user') if personal else None
+
+            key = '|'.join([request.full_path] +
+                           [f'{table}={versions.get(table)}' for table in tables] +
+                           [f"user={user['user_id'] if user else ''}"])
+            etag = hashlib.sha1(key.encode()).hexdigest()[:24]
+
+            if public and not personal:
+                cache_control = f'public, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate'
+            else:
+                cache_control = 'private, no-cache'
+
+            if etag in request.if_none_match:
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            if personal:
+                response.vary.add('Authorization')
+            return response
+
+        return decorated
+
+    return decorator
@@ -0,0 +1,29 @@
+"""
+Gunicorn settings, loaded automatically when gunicorn starts in this directory.
+
+Gives each server one METRICS_DIR shared by all of its workers, so /metrics
+reports the whole server rather than the worker that answered the scrape.
+"""
+import glob
+import os
+import shutil
+import tempfile
+
+# Runs in the master before the app is imported (also with --preload), so
+# every worker inherits the same directory
+if not os.environ.get('METRICS_DIR'):
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='vacation-booking-metrics-')
+    _created_metrics_dir = True
+else:
+    _created_metrics_dir = False
+
+
+def on_starting(server):
+    # Totals from a previous run would be counted again
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+        os.remove(path)
+
+
+def on_exit(server):
+    if _created_metrics_dir:
+        shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
@@ -1,11 +1,17 @@
 from models.country import Country
-Country.insert("Israel")
-Country.insert("Italy")
-Country.insert("United States")
-Country.insert("Canada")
-Country.insert("Spain")
-Country.insert("China")
-Country.insert("France")
-Country.insert("United Kingdom")
-Country.insert("India")
-Country.insert("Japan")
+
+DEFAULT_COUNTRIES = [
+    "Israel",
+    "Italy",
+    "United States",
+    "Canada",
+    "Spain",
+    "China",
+    "France",
+    "United Kingdom",
+    "India",
+    "Japan",
+]
+
+if __name__ == '__main__':
+    Country.insert_many(DEFAULT_COUNTRIES)
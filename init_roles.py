@@ -1,3 +1,2 @@
 from models.role import Role
-Role.insert("User")
-Role.insert("Admin")
\ No newline at end of file
+Role.insert_many(["User", "Admin"])
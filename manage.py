@@ -0,0 +1,195 @@
+"""
+Deploy-time and maintenance commands.
+
+    python manage.py init       # new database: migrate, then add the roles and default countries
+    python manage.py migrate    # create base tables and apply pending migrations
+    python manage.py status     # show applied and pending migrations
+    python manage.py reconcile-likes   # recompute vacations.likes_count from likes
+    python manage.py generate-variants [--all]   # build resized/WebP picture variants
+    python manage.py worker     # run background jobs (JOB_QUEUE_MODE=external)
+    python manage.py prune-jobs [--days 7]   # delete old finished jobs
+    python manage.py gc-images [--delete | --quarantine] [--grace SECONDS] [--include-legacy] [--schedule]
+    python manage.py import-vacations FILE [--format csv|jsonl] [--batch-size 1000]   # bulk-create vacations
+"""
+import argparse
+import os
+import sys
+import time
+from models.role import Role
+from models.user import User
+from models.country import Country
+from models.vacation import Vacation
+from models.like import Like
+from models.migration import Migration
+from models.job import Job
+from services.image_processing import ImageProcessor, ImageProcessingError
+from services.image_store import ImageStore
+from services.job_queue import JobQueue
+from services.logging_config import StructuredLogging
+from services.image_gc import ImageGC
+from services.vacation_import import VacationImporter, ImportFormatError
+from services.image_jobs import schedule_image_gc  # also registers the image job handlers
+from init_countries import DEFAULT_COUNTRIES
+from constants import IMAGE_GC_GRACE_SECONDS, IMPORT_BATCH_SIZE, USER_ROLE_NAME, ADMIN_ROLE_NAME
+
+
+def create_base_tables():
+    Role.create_table()
+    User.create_table()
+    Country.create_table()
+    Vacation.create_table()
+    Like.create_table()
+
+
+def migrate(args):
+    create_base_tables()
+    applied = Migration.apply_all()
+    if applied:
+        print(f"Applied migrations: {', '.join(str(v) for v in applied)}")
+    else:
+        print('Database schema is up to date.')
+    print(f'Schema version: {Migration.get_current_version()}')
+
+
+def init(args):
+    migrate(args)
+    # Insertion order gives the roles USER_ROLE_ID and ADMIN_ROLE_ID
+    roles = Role.insert_many([USER_ROLE_NAME, ADMIN_ROLE_NAME])
+    countries = Country.insert_many(DEFAULT_COUNTRIES)
+    print(f'Added {roles} role(s) and {countries} country(ies).')
+
+
+def status(args):
+    applied = {m['version']: m['applied_at'] for m in Migration.get_applied()}
+    print(f'Schema version: {Migration.get_current_version()} '
+          f'(latest available: {Migration.get_latest_version()})')
+    for version, name, _ in Migration.get_available():
+        state = f'applied {applied[version]}' if version in applied else 'pending'
+        print(f'  {version:04d} {name}: {state}')
+
+
+def reconcile_likes(args):
+    corrected = Vacation.reconcile_likes_count()
+    print(f'Corrected likes_count on {corrected} vacation(s).')
+
+
+def generate_variants(args):
+    if args.all:
+        filenames = sorted({vacation['picture_file_name'] for vacation in Vacation.get_all()})
+    else:
+        filenames = Vacation.get_pictures_without_variants()
+
+    generated = 0
+    for filename in filenames:
+        if not os.path.isfile(ImageStore.path(filename)):
+            print(f'  {filename}: missing, skipped')
+            continue
+        try:
+            picture_variants = ImageProcessor.generate_variants(filename)
+        except ImageProcessingError as e:
+            print(f'  {filename}: {e}')
+            continue
+        Vacation.set_picture_variants(filename, picture_variants)
+        generated += 1
+        print(f"  {filename}: widths {', '.join(str(w) for w in picture_variants['widths'])}")
+    print(f'Generated variants for {generated} of {len(filenames)} picture(s).')
+
+
+def worker(args):
+    print('Running background jobs (Ctrl+C to stop)...')
+    try:
+        JobQueue.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def prune_jobs(args):
+    deleted = Job.delete_finished(args.days * 86400)
+    print(f'Deleted {deleted} finished job(s) older than {args.days} day(s).')
+
+
+def gc_images(args):
+    if args.schedule:
+        job_id = schedule_image_gc()
+        print(f'Queued image GC job {job_id}.' if job_id else 'An image GC job is already queued.')
+        return
+
+    mode = 'delete' if args.delete else 'quarantine' if args.quarantine else 'dry-run'
+    report = ImageGC.collect(args.grace, mode, include_legacy=args.include_legacy)
+    for path in report['files']:
+        print(f'  {path}')
+    verb = {'dry-run': 'Would reclaim', 'delete': 'Deleted', 'quarantine': 'Quarantined'}[mode]
+    print(f"{verb} {report['collected']} file(s), {report['reclaimed_bytes'] / 1024 / 1024:.2f} MB "
+          f"({report['scanned']} scanned, {report['referenced']} referenced picture(s), "
+          f"{report['skipped_recent']} unreferenced but within the {args.grace:g}s grace period).")
+    if report['pruned_batches']:
+        print(f"Deleted {report['pruned_batches']} quarantine batch(es) older than the grace period, "
+              f"{report['pruned_bytes'] / 1024 / 1024:.2f} MB.")
+
+
+def import_vacations(args):
+    started = time.monotonic()
+    try:
+        import_format = VacationImporter.detect_format(args.format, filename=args.file)
+        with open(args.file, 'rb') as stream:
+            report = VacationImporter.run(stream, import_format, args.batch_size)
+    except ImportFormatError as e:
+        sys.exit(f'Import failed: {e}')
+    elapsed = time.monotonic() - started
+
+    for error in report['errors']:
+        print(f"  line {error['line']}: {error['error']}")
+    if report['failed'] > len(report['errors']):
+        print(f"  ... and {report['failed'] - len(report['errors'])} more")
+    if 'error' in report:
+        print(report['error'])
+    print(f"Imported {report['inserted']} of {report['rows']} row(s) in {report['batches']} batch(es), "
+          f"{report['failed']} failed ({elapsed:.2f}s, {report['rows'] / elapsed if elapsed else 0:.0f} rows/s).")
+    if 'error' in report:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vacation booking backend management commands')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('init', help='Set up a new database: migrate, then add roles and default countries'
+                          ).set_defaults(func=init)
+    subparsers.add_parser('migrate', help='Create base tables and apply pending migrations').set_defaults(func=migrate)
+    subparsers.add_parser('status', help='Show migration status').set_defaults(func=status)
+    subparsers.add_parser('reconcile-likes',
+                          help='Backfill/repair vacations.likes_count from the likes table').set_defaults(func=reconcile_likes)
+    variants_parser = subparsers.add_parser('generate-variants',
+                                            help='Build resized/WebP variants for vacation pictures')
+    variants_parser.add_argument('--all', action='store_true',
+                                 help='Regenerate every picture, not only those without variants')
+    variants_parser.set_defaults(func=generate_variants)
+    subparsers.add_parser('worker', help='Run background jobs in the foreground').set_defaults(func=worker)
+    prune_parser = subparsers.add_parser('prune-jobs', help='Delete finished background jobs')
+    prune_parser.add_argument('--days', type=float, default=7, help='Keep jobs that finished within this many days')
+    prune_parser.set_defaults(func=prune_jobs)
+    gc_parser = subparsers.add_parser('gc-images', help='Find image files no vacation uses (dry run by default)')
+    gc_action = gc_parser.add_mutually_exclusive_group()
+    gc_action.add_argument('--delete', action='store_true', help='Delete orphaned files')
+    gc_action.add_argument('--quarantine', action='store_true', help='Move orphaned files to images/quarantine/')
+    gc_action.add_argument('--schedule', action='store_true',
+                           help='Queue the periodic background GC (IMAGE_GC_INTERVAL / IMAGE_GC_MODE)')
+    gc_parser.add_argument('--grace', type=float, default=IMAGE_GC_GRACE_SECONDS,
+                           help='Only collect files older than this many seconds')
+    gc_parser.add_argument('--include-legacy', action='store_true',
+                           help='Also consider plain files directly in images/ (includes the bundled pictures)')
+    gc_parser.set_defaults(func=gc_images)
+    import_parser = subparsers.add_parser('import-vacations', help='Bulk-create vacations from a CSV or JSON Lines file')
+    import_parser.add_argument('file', help='CSV with a header row, or JSON Lines (one object per line)')
+    import_parser.add_argument('--format', choices=['csv', 'jsonl'], help='Default: from the file extension')
+    import_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help='Rows per insert transaction')
+    import_parser.set_defaults(func=import_vacations)
+
+    args = parser.parse_args()
+    # Command output stays on stdout; logs (e.g. of jobs run by `worker`) go to stderr
+    StructuredLogging.configure()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+-- likes only had the (user_id, vacation_id) primary key, so the per-vacation
+-- like count and the ON DELETE CASCADE from vacations scanned the whole table.
+CREATE INDEX IF NOT EXISTS idx_likes_vacation_id ON likes (vacation_id);
@@ -0,0 +1,2 @@
+-- Vacation.get_all orders the catalog by vacation_start.
+CREATE INDEX IF NOT EXISTS idx_vacations_vacation_start ON vacations (vacation_start);
@@ -0,0 +1,3 @@
+-- Vacations of one country in start-date order: foreign key checks from countries
+-- and per-country listings. Also serves every lookup on country_id alone.
+CREATE INDEX IF NOT EXISTS idx_vacations_country_start ON vacations (country_id, vacation_start);
@@ -0,0 +1,27 @@
+-- Store each vacation's like count instead of aggregating the likes table on
+-- every read. The triggers keep it exact for every write path, including rows
+-- removed by ON DELETE CASCADE when a user or vacation is deleted.
+ALTER TABLE vacations ADD COLUMN likes_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE vacations
+SET likes_count = (SELECT COUNT(*) FROM likes WHERE likes.vacation_id = vacations.vacation_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_likes_after_insert
+AFTER INSERT ON likes
+BEGIN
+    UPDATE vacations SET likes_count = likes_count + 1 WHERE vacation_id = NEW.vacation_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_likes_after_delete
+AFTER DELETE ON likes
+BEGIN
+    UPDATE vacations SET likes_count = likes_count - 1 WHERE vacation_id = OLD.vacation_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_likes_after_update
+AFTER UPDATE OF vacation_id ON likes
+WHEN OLD.vacation_id != NEW.vacation_id
+BEGIN
+    UPDATE vacations SET likes_count = likes_count - 1 WHERE vacation_id = OLD.vacation_id;
+    UPDATE vacations SET likes_count = likes_count + 1 WHERE vacation_id = NEW.vacation_id;
+END;
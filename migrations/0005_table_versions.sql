@@ -0,0 +1,46 @@
+-- Per-table change counters so every worker can tell, with one cheap query,
+-- whether another process has written since its in-memory caches were filled.
+-- Triggers bump the counter for every row written, including cascades.
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO table_versions (table_name) VALUES ('roles'), ('users'), ('countries'), ('vacations'), ('likes');
+
+CREATE TRIGGER IF NOT EXISTS trg_roles_version_insert AFTER INSERT ON roles
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'roles'; END;
+CREATE TRIGGER IF NOT EXISTS trg_roles_version_update AFTER UPDATE ON roles
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'roles'; END;
+CREATE TRIGGER IF NOT EXISTS trg_roles_version_delete AFTER DELETE ON roles
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'roles'; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_version_insert AFTER INSERT ON users
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'users'; END;
+CREATE TRIGGER IF NOT EXISTS trg_users_version_update AFTER UPDATE ON users
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'users'; END;
+CREATE TRIGGER IF NOT EXISTS trg_users_version_delete AFTER DELETE ON users
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'users'; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_countries_version_insert AFTER INSERT ON countries
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'countries'; END;
+CREATE TRIGGER IF NOT EXISTS trg_countries_version_update AFTER UPDATE ON countries
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'countries'; END;
+CREATE TRIGGER IF NOT EXISTS trg_countries_version_delete AFTER DELETE ON countries
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'countries'; END;
+
+-- likes_count is excluded: the likes counter already covers like/unlike
+CREATE TRIGGER IF NOT EXISTS trg_vacations_version_insert AFTER INSERT ON vacations
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'vacations'; END;
+CREATE TRIGGER IF NOT EXISTS trg_vacations_version_update
+AFTER UPDATE OF country_id, vacation_description, vacation_start, vacation_end, price, picture_file_name ON vacations
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'vacations'; END;
+CREATE TRIGGER IF NOT EXISTS trg_vacations_version_delete AFTER DELETE ON vacations
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'vacations'; END;
+
+CREATE TRIGGER IF NOT EXISTS trg_likes_version_insert AFTER INSERT ON likes
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'likes'; END;
+CREATE TRIGGER IF NOT EXISTS trg_likes_version_update AFTER UPDATE ON likes
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'likes'; END;
+CREATE TRIGGER IF NOT EXISTS trg_likes_version_delete AFTER DELETE ON likes
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'likes'; END;
@@ -0,0 +1,17 @@
+-- Per-user token version embedded in every JWT ('tv' claim). Bumping it revokes
+-- all of that user's outstanding tokens (logout, role/password change, deletion).
+-- Rows are only created for users whose version moved, and deliberately have no
+-- foreign key so a deleted user's revocation survives the users row.
+CREATE TABLE IF NOT EXISTS user_token_versions (
+    user_id INTEGER PRIMARY KEY,
+    token_version INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO table_versions (table_name) VALUES ('user_token_versions');
+
+CREATE TRIGGER IF NOT EXISTS trg_user_token_versions_version_insert AFTER INSERT ON user_token_versions
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'user_token_versions'; END;
+CREATE TRIGGER IF NOT EXISTS trg_user_token_versions_version_update AFTER UPDATE ON user_token_versions
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'user_token_versions'; END;
+CREATE TRIGGER IF NOT EXISTS trg_user_token_versions_version_delete AFTER DELETE ON user_token_versions
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'user_token_versions'; END;
@@ -0,0 +1,14 @@
+-- Resized/re-encoded copies of each vacation picture (see services/image_processing.py).
+-- picture_variants is JSON: {"width", "height", "widths": [...], "formats": [...]}, or
+-- NULL until variants have been generated for picture_file_name.
+ALTER TABLE vacations ADD COLUMN picture_variants TEXT;
+
+-- /images/<filename> looks variants up by file name
+CREATE INDEX IF NOT EXISTS idx_vacations_picture_file_name ON vacations(picture_file_name);
+
+-- Variants are part of the vacation payload, so changing them must bump the counter too
+DROP TRIGGER IF EXISTS trg_vacations_version_update;
+CREATE TRIGGER trg_vacations_version_update
+AFTER UPDATE OF country_id, vacation_description, vacation_start, vacation_end, price,
+                picture_file_name, picture_variants ON vacations
+BEGIN UPDATE table_versions SET version = version + 1 WHERE table_name = 'vacations'; END;
@@ -0,0 +1,18 @@
+-- Background job queue (services/job_queue.py). Rows survive restarts: a job left
+-- 'running' by a dead worker is claimed again once its lease (run_after) expires.
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending | running | done | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after REAL NOT NULL,  -- pending: not before; running: lease expiry
+    claim_token TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status_run_after ON jobs(status, run_after);
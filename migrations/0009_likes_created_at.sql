@@ -0,0 +1,6 @@
+-- When each like was made (UTC 'YYYY-MM-DD HH:MM:SS'), for the per-day like
+-- activity export. Likes made before this migration have no date (NULL).
+ALTER TABLE likes ADD COLUMN created_at TEXT;
+
+-- The per-day export groups by the date part; this index returns it in order
+CREATE INDEX IF NOT EXISTS idx_likes_created_day ON likes (substr(created_at, 1, 10));
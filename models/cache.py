@@ -0,0 +1,286 @@
+import threading
+import time
+from collections import OrderedDict
+from constants import (CATALOG_CACHE_TTL, CATALOG_CACHE_MAX_PAGES, CATALOG_CACHE_MAX_ROWS,
+                       AUTH_PRINCIPAL_CACHE_TTL, AUTH_PRINCIPAL_CACHE_SIZE, AUTH_TOKEN_CACHE_SIZE,
+                       IMAGE_METADATA_CACHE_TTL)
+from models.table_version import TableVersion
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._stats = dict(hits=0, misses=0, evictions=0, invalidations=0)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def put(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def pop(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._stats['invalidations'] += 1
+
+    def invalidate(self, remote=False):
+        with self._lock:
+            self._entries.clear()
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                size=len(self._entries),
+                hit_ratio=round(self._stats['hits'] / lookups, 4) if lookups else None
+            )
+
+
+class CatalogCache:
+    """
+    In-process cache of vacation catalog reads.
+
+    Cached pages (the result of one Vacation.get_filtered call) only hold vacation
+    ids; the rows themselves live once in a shared map. That lets a like/unlike
+    patch a single likes_count in place instead of dropping every cached page,
+    while inserts/updates/deletes (which can change page membership) drop the
+    pages but keep unaffected rows.
+
+    Every mutation bumps a generation counter after its transaction commits.
+    Readers grab the generation before querying the database and their result
+    is only stored if no write happened in between, so a slow read can never
+    overwrite fresher data. Like count patches carry the absolute count and the
+    likes table version they were read at, so concurrent patches applied out of
+    order cannot move a count backwards.
+    """
+
+    def __init__(self, ttl=CATALOG_CACHE_TTL, max_pages=CATALOG_CACHE_MAX_PAGES,
+                 max_rows=CATALOG_CACHE_MAX_ROWS):
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()  # key -> (expires_at, [vacation_id])
+        self._rows = {}  # vacation_id -> [expires_at, row dict, likes version]
+        self._generation = 0
+        self._likes_version = 0  # highest likes version applied by a patch
+        self._stats = dict(hits=0, misses=0, evictions=0, invalidations=0, patches=0,
+                           remote_invalidations=0)
+
+    def generation(self):
+        return self._generation
+
+    def _row(self, vacation_id, now):
+        entry = self._rows.get(vacation_id)
+        if entry is None or entry[0] < now:
+            return None
+        return entry[1]
+
+    def get_page(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is not None and entry[0] >= now:
+                rows = [self._row(vacation_id, now) for vacation_id in entry[1]]
+                if all(row is not None for row in rows):
+                    self._pages.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return [dict(row) for row in rows]
+            self._stats['misses'] += 1
+            return None
+
+    def put_page(self, key, rows, generation):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if generation != self._generation:
+                return
+            if len(self._rows) + len(rows) > self.max_rows:
+                self._stats['evictions'] += len(self._pages) + len(self._rows)
+                self._pages.clear()
+                self._rows.clear()
+                if len(rows) > self.max_rows:
+                    return
+            for row in rows:
+                self._rows[row['vacation_id']] = [expires_at, dict(row), self._likes_version]
+            self._pages[key] = (expires_at, [row['vacation_id'] for row in rows])
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def get_row(self, vacation_id):
+        with self._lock:
+            row = self._row(vacation_id, time.monotonic())
+            if row is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            return dict(row)
+
+    def put_row(self, row, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            if len(self._rows) >= self.max_rows:
+                self._stats['evictions'] += len(self._pages) + len(self._rows)
+                self._pages.clear()
+                self._rows.clear()
+            self._rows[row['vacation_id']] = [time.monotonic() + self.ttl, dict(row), self._likes_version]
+
+    def set_likes_count(self, vacation_id, likes_count, likes_version):
+        """
+        A like/unlike committed: patch the one cached row, keep every page.
+        likes_count and likes_version must be read inside the write transaction.
+        """
+        with self._lock:
+            self._generation += 1
+            self._likes_version = max(self._likes_version, likes_version)
+            entry = self._rows.get(vacation_id)
+            if entry is not None and entry[2] < likes_version:
+                entry[1]['likes_count'] = likes_count
+                entry[2] = likes_version
+                self._stats['patches'] += 1
+
+    def invalidate_vacation(self, vacation_id):
+        """A vacation was inserted, updated or deleted: its row and all pages are stale."""
+        with self._lock:
+            self._generation += 1
+            self._rows.pop(vacation_id, None)
+            self._pages.clear()
+            self._stats['invalidations'] += 1
+
+    def invalidate(self, remote=False):
+        with self._lock:
+            self._generation += 1
+            self._rows.clear()
+            self._pages.clear()
+            self._stats['remote_invalidations' if remote else 'invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                pages=len(self._pages),
+                rows=len(self._rows),
+                hit_ratio=round(self._stats['hits'] / lookups, 4) if lookups else None
+            )
+
+
+class CacheCoherency:
+    """
+    Keeps per-process caches coherent across gunicorn workers.
+
+    Each registered cache declares the tables it is derived from and remembers
+    the table_versions counters it was last validated against. Before a cache is
+    read, validate() compares those with the database (one small query, taken
+    at most once per request) and drops the cache if another process wrote.
+
+    A worker's own writes are already applied to its caches (patch or
+    invalidate), so record_local_write() advances the remembered version
+    instead of forcing a full reload - but only when the counter moved by exactly
+    the rows this write touched, i.e. nobody else wrote in between.
+    """
+
+    _lock = threading.Lock()
+    _local = threading.local()
+    _caches = {}  # id(cache) -> (cache, tables, seen versions)
+
+    @staticmethod
+    def register(cache, tables):
+        with CacheCoherency._lock:
+            CacheCoherency._caches[id(cache)] = (cache, tuple(tables), {})
+
+    @staticmethod
+    def begin_request():
+        """Called before each request: the next validate() takes a fresh snapshot."""
+        CacheCoherency._local.in_request = True
+        CacheCoherency._local.snapshot = None
+
+    @staticmethod
+    def end_request():
+        CacheCoherency._local.in_request = False
+        CacheCoherency._local.snapshot = None
+
+    @staticmethod
+    def current_versions():
+        """table_versions snapshot, queried once per request (every call outside one)."""
+        local = CacheCoherency._local
+        snapshot = getattr(local, 'snapshot', None)
+        if snapshot is None:
+            snapshot = TableVersion.get_all()
+            if getattr(local, 'in_request', False):
+                local.snapshot = snapshot
+        return snapshot
+
+    @staticmethod
+    def validate(cache):
+        cache, tables, seen = CacheCoherency._caches[id(cache)]
+        versions = CacheCoherency.current_versions()
+        with CacheCoherency._lock:
+            current = {table: versions.get(table) for table in tables}
+            if current == seen:
+                return
+            stale = bool(seen)
+            seen.clear()
+            seen.update(current)
+        if stale:
+            cache.invalidate(remote=True)
+
+    @staticmethod
+    def record_local_write(cursor, table, rows):
+        """
+        Call inside the write transaction, after the statement that changed `rows`
+        rows of `table`. Returns the table's version as of this write.
+        """
+        version = TableVersion.get_in_transaction(cursor, table)
+        if rows <= 0:
+            return version
+        snapshot = getattr(CacheCoherency._local, 'snapshot', None)
+        if snapshot is not None and snapshot.get(table) == version - rows:
+            snapshot[table] = version
+        with CacheCoherency._lock:
+            for _, tables, seen in CacheCoherency._caches.values():
+                if table in tables and seen.get(table) == version - rows:
+                    seen[table] = version
+        return version
+
+
+vacation_catalog_cache = CatalogCache()
+CacheCoherency.register(vacation_catalog_cache, ('vacations', 'likes'))
+
+# picture_file_name -> picture_variants metadata, read by every /images/<filename> request
+image_metadata_cache = TTLCache(ttl=IMAGE_METADATA_CACHE_TTL, max_size=CATALOG_CACHE_MAX_ROWS)
+CacheCoherency.register(image_metadata_cache, ('vacations',))
+
+# The country list (GET /countries and the admin forms); tiny and rarely written
+country_list_cache = TTLCache(ttl=CATALOG_CACHE_TTL, max_size=1)
+CacheCoherency.register(country_list_cache, ('countries',))
+
+# Authentication caches. They are deliberately not validated against table_versions
+# so an authenticated request needs no database I/O at all; local user updates and
+# deletes evict immediately, other workers pick changes up within the TTL.
+user_principal_cache = TTLCache(ttl=AUTH_PRINCIPAL_CACHE_TTL, max_size=AUTH_PRINCIPAL_CACHE_SIZE)
+verified_token_cache = TTLCache(ttl=AUTH_PRINCIPAL_CACHE_TTL, max_size=AUTH_TOKEN_CACHE_SIZE)
@@ -1,9 +1,11 @@
 import sqlite3
+from models.database import get_connection
+from models.cache import country_list_cache, CacheCoherency
 
 class Country:
     @staticmethod
     def get_db_connection():
-        return sqlite3.connect("projectdb.db")
+        return get_connection()
 
     @staticmethod
     def create_table():
@@ -31,6 +33,7 @@ class Country:
                 country_id = cursor.lastrowid
                 connection.commit()
                 cursor.close()
+                country_list_cache.invalidate()
                 return {
                     'country_id': country_id,
                     'country_name': country_name
@@ -39,18 +42,39 @@ class Country:
                 cursor.close()
                 return None
     
+    @staticmethod
+    def insert_many(country_names):
+        """Insert countries in one transaction, skipping names that already exist. Returns the number added."""
+        with Country.get_db_connection() as connection:
+            cursor = connection.cursor()
+            sql = 'INSERT OR IGNORE INTO countries (country_name) VALUES (?)'
+            cursor.executemany(sql, ((name,) for name in country_names))
+            inserted = cursor.rowcount
+            connection.commit()
+            cursor.close()
+        if inserted:
+            country_list_cache.invalidate()
+        return inserted
+    
     @staticmethod
     def get_all():
+        CacheCoherency.validate(country_list_cache)
+        cached = country_list_cache.get('all')
+        if cached is not None:
+            return [dict(country) for country in cached]
+
         with Country.get_db_connection() as connection:
             cursor = connection.cursor()
             sql = 'SELECT * FROM countries'
             cursor.execute(sql)
             countries = cursor.fetchall()
             cursor.close()
-            return [dict(
+            countries = [dict(
                 country_id=country[0],
                 country_name=country[1]
             ) for country in countries]
+        country_list_cache.put('all', countries)
+        return [dict(country) for country in countries]
     
     @staticmethod
     def get_by_id(country_id):
@@ -92,6 +116,7 @@ class Country:
                 cursor.execute(sql, values)
                 connection.commit()
                 cursor.close()
+                country_list_cache.invalidate()
                 return {'message': f"Country {country_id} updated successfully"}
             except sqlite3.IntegrityError:
                 cursor.close()
@@ -107,7 +132,12 @@ class Country:
                 cursor.close()
                 return None
             
-            cursor.execute('DELETE FROM countries WHERE country_id = ?', (country_id,))
-            connection.commit()
+            try:
+                cursor.execute('DELETE FROM countries WHERE country_id = ?', (country_id,))
+                connection.commit()
+            except sqlite3.IntegrityError:
+                cursor.close()
+                return {'error': 'Country is still used by existing vacations'}
             cursor.close()
+            country_list_cache.invalidate()
             return {'message': f"Country {country_id} deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,259 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from constants import (DATABASE_PATH, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT,
+                       DB_POOL_HEALTHCHECK_INTERVAL, DB_STORAGE_PROFILE, SQL_INSTRUMENTATION)
+from models.query_stats import InstrumentedConnection
+
+
+# Named storage profiles applied to every new connection. Select one with the
+# DB_STORAGE_PROFILE environment variable.
+#   legacy      - SQLite defaults (rollback journal); writers block readers
+#   balanced    - WAL so readers never wait on writers, modest memory use
+#   performance - WAL with a larger page cache and memory map for big catalogs
+STORAGE_PROFILES = {
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+    },
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -16000,       # KiB (negative = size, not pages)
+        'temp_store': 'MEMORY',
+        'mmap_size': 64 * 1024 * 1024,
+    },
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 10000,
+        'cache_size': -64000,
+        'temp_store': 'MEMORY',
+        'mmap_size': 256 * 1024 * 1024,
+    },
+}
+
+# Order matters: journal_mode has to be switched before other settings take effect
+_PRAGMA_ORDER = ('busy_timeout', 'journal_mode', 'synchronous', 'cache_size', 'temp_store', 'mmap_size')
+
+
+def get_storage_profile(name):
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown DB_STORAGE_PROFILE '{name}'. "
+                         f"Expected one of: {', '.join(STORAGE_PROFILES)}")
+    return STORAGE_PROFILES[name]
+
+
+def initialize_connection(connection, profile):
+    """
+    Connection init hook: runs once per physical connection, before it enters the pool.
+    Foreign keys are enforced on every connection regardless of profile.
+    """
+    connection.execute('PRAGMA foreign_keys = ON')
+    for pragma in _PRAGMA_ORDER:
+        if pragma in profile:
+            connection.execute(f'PRAGMA {pragma} = {profile[pragma]}')
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Raised when no pooled connection became free within the wait timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections shared by every model in a worker.
+
+    - A thread that already holds a connection gets the same one back, so nested
+      model calls inside a single request share one connection.
+    - Idle connections are health checked before reuse once they have been idle
+      longer than the health check interval.
+    - At most `max_size` connections exist at once; callers wait up to `timeout`
+      seconds for a free one before a PoolTimeoutError is raised.
+    - The pool is per process: after a fork the child starts with an empty pool
+      instead of reusing connections inherited from the parent.
+    """
+
+    def __init__(self, database, max_size=DB_POOL_MAX_SIZE, timeout=DB_POOL_TIMEOUT,
+                 healthcheck_interval=DB_POOL_HEALTHCHECK_INTERVAL, profile=DB_STORAGE_PROFILE):
+        self.database = database
+        self.profile_name = profile
+        self.profile = get_storage_profile(profile)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._condition = threading.Condition(threading.Lock())
+        self._idle = deque()  # (connection, released_at)
+        self._size = 0
+        self._local = threading.local()
+
+    def _create_connection(self):
+        connection = sqlite3.connect(self.database, check_same_thread=False,
+                                     timeout=self.profile.get('busy_timeout', 5000) / 1000,
+                                     factory=InstrumentedConnection if SQL_INSTRUMENTATION else sqlite3.Connection)
+        try:
+            initialize_connection(connection, self.profile)
+        except sqlite3.Error:
+            connection.close()
+            raise
+        return connection
+
+    @staticmethod
+    def _is_healthy(connection):
+        try:
+            connection.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            while True:
+                if self._idle:
+                    connection, released_at = self._idle.pop()
+                    if time.monotonic() - released_at < self.healthcheck_interval:
+                        return connection
+                    if self._is_healthy(connection):
+                        return connection
+                    self._close_quietly(connection)
+                    self._size -= 1
+                    continue
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.timeout}s waiting for a database connection")
+                self._condition.wait(remaining)
+
+        # Connect outside the lock so slow opens don't block other threads
+        try:
+            return self._create_connection()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, connection):
+        if connection.in_transaction:
+            connection.rollback()
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def _discard(self, connection):
+        self._close_quietly(connection)
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def connection(self):
+        """Return a context manager yielding a pooled sqlite3.Connection."""
+        if self._pid != os.getpid():
+            self._reset()
+        return _PooledConnection(self)
+
+    def close_all(self):
+        """Close every idle connection, e.g. before shutting the worker down."""
+        with self._condition:
+            while self._idle:
+                connection, _ = self._idle.pop()
+                self._close_quietly(connection)
+                self._size -= 1
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+                'profile': self.profile_name
+            }
+
+
+class _PooledConnection:
+    """
+    Context manager that behaves like `with sqlite3.connect(...) as connection`
+    (commit on success, rollback on error) and hands the connection back to the
+    pool once the outermost block for the current thread exits.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __enter__(self):
+        local = self.pool._local
+        if getattr(local, 'depth', 0) == 0:
+            local.connection = self.pool._checkout()
+        local.depth = getattr(local, 'depth', 0) + 1
+        return local.connection
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        local = self.pool._local
+        connection = local.connection
+        local.depth -= 1
+        try:
+            if exc_type is None:
+                connection.commit()
+            else:
+                connection.rollback()
+        except sqlite3.Error:
+            if local.depth == 0:
+                local.connection = None
+                self.pool._discard(connection)
+            raise
+
+        if local.depth == 0:
+            local.connection = None
+            self.pool._release(connection)
+        return False
+
+
+pool = ConnectionPool(DATABASE_PATH)
+# A SQLite connection must not be used (or even closed) on both sides of a fork;
+# e.g. a gunicorn --preload master drops its idle connections before spawning workers
+os.register_at_fork(before=pool.close_all)
+
+
+def get_connection():
+    """Shared entry point used by every model's get_db_connection()."""
+    return pool.connection()
+
+
+def iter_rows(sql, params=(), fetch_size=1000):
+    """
+    Yield the rows of a query, fetch_size at a time, for results too large to
+    fetchall(). The pooled connection is held until the generator is exhausted
+    or closed, so consume it promptly (e.g. in a streamed response).
+    """
+    with get_connection() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(fetch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
@@ -0,0 +1,194 @@
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+from models.database import get_connection
+from constants import JOB_MAX_ATTEMPTS, JOB_LEASE_SECONDS
+
+
+class Job:
+    """
+    Rows of the jobs table (migration 0008).
+
+    A job is claimed with a conditional UPDATE, so any number of threads and
+    processes can poll the same table without running a job twice. Claiming
+    sets run_after to the lease expiry; a job whose worker died is simply
+    claimable again once the lease runs out.
+    """
+
+    COLUMNS = '''job_id, job_type, payload, status, attempts, result, error,
+                created_at, started_at, finished_at'''
+
+    @staticmethod
+    def get_db_connection():
+        return get_connection()
+
+    @staticmethod
+    def _timestamp(value):
+        return datetime.fromtimestamp(value, timezone.utc).isoformat() if value else None
+
+    @staticmethod
+    def row_to_dict(job):
+        return dict(
+            job_id=job[0],
+            job_type=job[1],
+            payload=json.loads(job[2]),
+            status=job[3],
+            attempts=job[4],
+            result=json.loads(job[5]) if job[5] else None,
+            error=job[6],
+            created_at=Job._timestamp(job[7]),
+            started_at=Job._timestamp(job[8]),
+            finished_at=Job._timestamp(job[9])
+        )
+
+    @staticmethod
+    def enqueue(job_type, payload, delay=0):
+        """Queue a job to run no earlier than `delay` seconds from now and return its id."""
+        now = time.time()
+        with Job.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('''INSERT INTO jobs (job_type, payload, run_after, created_at)
+                              VALUES (?, ?, ?, ?)''', (job_type, json.dumps(payload), now + delay, now))
+            job_id = cursor.lastrowid
+            connection.commit()
+            cursor.close()
+            return job_id
+
+    @staticmethod
+    def claim_next():
+        """
+        Atomically take the oldest runnable job (pending, or running with an
+        expired lease and attempts left; expired leases without attempts left
+        are marked failed). Returns (job_id, job_type, payload, claim_token, attempt)
+        or None; the claim token must be passed back to complete()/fail().
+        """
+        now = time.time()
+        claim_token = uuid.uuid4().hex
+        with Job.get_db_connection() as connection:
+            cursor = connection.cursor()
+            # A worker that died mid-job (e.g. killed while decoding a huge image) used up an
+            # attempt too; once they are all used, fail the job like Job.fail does. Checked
+            # with a read first, so idle polling never takes the write lock
+            cursor.execute('''SELECT 1 FROM jobs WHERE status = 'running' AND run_after <= ? AND attempts >= ?
+                              LIMIT 1''', (now, JOB_MAX_ATTEMPTS))
+            if cursor.fetchone():
+                cursor.execute('''
+                    UPDATE jobs
+                    SET status = 'failed', finished_at = ?,
+                        error = 'Lease expired after the last attempt (the worker died or hung)'
+                    WHERE status = 'running' AND run_after <= ? AND attempts >= ?
+                ''', (now, now, JOB_MAX_ATTEMPTS))
+                connection.commit()
+            job = None
+            while job is None:
+                cursor.execute('''SELECT job_id, job_type, payload, attempts FROM jobs
+                                  WHERE (status = 'pending' OR (status = 'running' AND attempts < ?))
+                                    AND run_after <= ?
+                                  ORDER BY run_after LIMIT 1''', (JOB_MAX_ATTEMPTS, now))
+                row = cursor.fetchone()
+                if row is None:
+                    break
+                # Re-check the condition in the UPDATE: another worker may have claimed it first
+                cursor.execute('''
+                    UPDATE jobs
+                    SET status = 'running', attempts = attempts + 1, claim_token = ?,
+                        started_at = ?, run_after = ?
+                    WHERE job_id = ? AND (status = 'pending' OR (status = 'running' AND attempts < ?))
+                      AND run_after <= ?
+                ''', (claim_token, now, now + JOB_LEASE_SECONDS, row[0], JOB_MAX_ATTEMPTS, now))
+                if cursor.rowcount:
+                    job = (row[0], row[1], json.loads(row[2]), claim_token, row[3] + 1)
+                connection.commit()
+            cursor.close()
+            return job
+
+    @staticmethod
+    def complete(job_id, claim_token, result=None):
+        # A worker whose lease expired (and whose job was re-claimed) must not overwrite it
+        with Job.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('''UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ?
+                              WHERE job_id = ? AND claim_token = ?''',
+                           (json.dumps(result) if result is not None else None, time.time(), job_id, claim_token))
+            connection.commit()
+            cursor.close()
+
+    @staticmethod
+    def fail(job_id, claim_token, error, retry=True):
+        """
+        Record a failed attempt. The job is retried with exponential backoff
+        until JOB_MAX_ATTEMPTS, then marked failed.
+        """
+        now = time.time()
+        with Job.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('''
+                UPDATE jobs
+                SET status = CASE WHEN ? AND attempts < ? THEN 'pending' ELSE 'failed' END,
+                    run_after = ? + (1 << attempts),
+                    finished_at = CASE WHEN ? AND attempts < ? THEN NULL ELSE ? END,
+                    error = ?
+                WHERE job_id = ? AND claim_token = ?
+            ''', (retry, JOB_MAX_ATTEMPTS, now, retry, JOB_MAX_ATTEMPTS, now, error, job_id, claim_token))
+            connection.commit()
+            cursor.close()
+
+    @staticmethod
+    def get_by_id(job_id):
+        with Job.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(f'SELECT {Job.COLUMNS} FROM jobs WHERE job_id = ?', (job_id,))
+            job = cursor.fetchone()
+            cursor.close()
+            return Job.row_to_dict(job) if job else None
+
+    @staticmethod
+    def get_recent(status=None, limit=50):
+        """Newest jobs first, optionally only those with the given status."""
+        sql = f'SELECT {Job.COLUMNS} FROM jobs'
+        params = []
+        if status:
+            sql += ' WHERE status = ?'
+            params.append(status)
+        sql += ' ORDER BY job_id DESC LIMIT ?'
+        params.append(limit)
+        with Job.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(sql, params)
+            jobs = cursor.fetchall()
+            cursor.close()
+            return [Job.row_to_dict(job) for job in jobs]
+
+    @staticmethod
+    def has_active(job_type, exclude_job_id=None):
+        """True if a job of this type (other than exclude_job_id) is pending or running."""
+        with Job.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('''SELECT 1 FROM jobs WHERE job_type = ? AND status IN ('pending', 'running')
+                              AND job_id IS NOT ? LIMIT 1''', (job_type, exclude_job_id))
+            active = cursor.fetchone() is not None
+            cursor.close()
+            return active
+
+    @staticmethod
+    def get_counts():
+        """{status: number of jobs}"""
+        with Job.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status')
+            counts = dict(cursor.fetchall())
+            cursor.close()
+            return counts
+
+    @staticmethod
+    def delete_finished(older_than_seconds):
+        """Delete done/failed jobs that finished more than older_than_seconds ago."""
+        with Job.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('''DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?''',
+                           (time.time() - older_than_seconds,))
+            deleted = cursor.rowcount
+            connection.commit()
+            cursor.close()
+            return deleted
@@ -1,9 +1,17 @@
+import logging
 import sqlite3
+from models.database import get_connection, iter_rows
+from models.cache import vacation_catalog_cache, CacheCoherency
+
+logger = logging.getLogger(__name__)
 
 class Like:
+    PER_COUNTRY_COLUMNS = ('country_id', 'country_name', 'vacations', 'likes')
+    PER_DAY_COLUMNS = ('day', 'likes')
+
     @staticmethod
     def get_db_connection():
-        return sqlite3.connect("projectdb.db")
+        return get_connection()
 
     @staticmethod
     def create_table():
@@ -24,9 +32,16 @@ class Like:
             ''')
             connection.commit()
             cursor.close()
-            print("Likes table ensured.")
+            logger.debug('Likes table ensured.')
 
 
+    @staticmethod
+    def get_likes_count_in_transaction(cursor, vacation_id: int) -> int:
+        """Trigger-maintained like count, read inside the caller's write transaction."""
+        cursor.execute('SELECT likes_count FROM vacations WHERE vacation_id = ?', (vacation_id,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
     @staticmethod
     def insert(user_id: int, vacation_id: int) -> dict | None:
         """
@@ -42,12 +57,14 @@ class Like:
         """
         with Like.get_db_connection() as connection:
             cursor = connection.cursor()
-            cursor.execute("PRAGMA foreign_keys = ON;")
             try:
-                sql = "INSERT INTO likes (user_id, vacation_id) VALUES (?, ?)"
+                sql = "INSERT INTO likes (user_id, vacation_id, created_at) VALUES (?, ?, datetime('now'))"
                 cursor.execute(sql, (user_id, vacation_id))
+                likes_count = Like.get_likes_count_in_transaction(cursor, vacation_id)
+                likes_version = CacheCoherency.record_local_write(cursor, 'likes', 1)
                 connection.commit()
                 cursor.close()
+                vacation_catalog_cache.set_likes_count(vacation_id, likes_count, likes_version)
                 return {'message': f"User {user_id} liked Vacation {vacation_id} successfully."}
             except sqlite3.IntegrityError as e:
                 cursor.close()
@@ -76,13 +93,124 @@ class Like:
         """
         with Like.get_db_connection() as connection:
             cursor = connection.cursor()
-            cursor.execute("PRAGMA foreign_keys = ON;")
             sql = "DELETE FROM likes WHERE user_id = ? AND vacation_id = ?"
             cursor.execute(sql, (user_id, vacation_id))
-            connection.commit()
             rows_affected = cursor.rowcount
+            likes_count = Like.get_likes_count_in_transaction(cursor, vacation_id)
+            likes_version = CacheCoherency.record_local_write(cursor, 'likes', rows_affected)
+            connection.commit()
             cursor.close()
             if rows_affected > 0:
+                vacation_catalog_cache.set_likes_count(vacation_id, likes_count, likes_version)
                 return {'message': f"User {user_id} unliked Vacation {vacation_id} successfully."}
             return {'error': 'Like not found.'}
-    
\ No newline at end of file
+
+    @staticmethod
+    def apply_batch(user_id: int, like_ids: list, unlike_ids: list) -> dict:
+        """
+        Likes and unlikes several vacations for one user in a single transaction.
+
+        Args:
+            user_id (int): The ID of the user.
+            like_ids (list): Vacation IDs that should end up liked.
+            unlike_ids (list): Vacation IDs that should end up not liked.
+                Must not overlap with like_ids.
+
+        Returns:
+            dict: 'vacations' maps every existing vacation ID to its 'liked',
+            'likes_count' and 'changed' state (IDs of vacations that do not
+            exist are left out); 'liked' and 'unliked' count the likes added
+            and removed.
+            dict: An error message if the transaction failed; nothing is changed.
+        """
+        vacation_ids = list(like_ids) + list(unlike_ids)
+        if not vacation_ids:
+            return {'vacations': {}, 'liked': 0, 'unliked': 0}
+        placeholders = ', '.join('?' * len(vacation_ids))
+        with Like.get_db_connection() as connection:
+            cursor = connection.cursor()
+            try:
+                # Take the write lock before reading, so no concurrent like, unlike or vacation
+                # delete can change these rows between the reads and the writes below
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute(f'SELECT vacation_id FROM vacations WHERE vacation_id IN ({placeholders})',
+                               vacation_ids)
+                existing = {row[0] for row in cursor.fetchall()}
+                cursor.execute(f'SELECT vacation_id FROM likes WHERE user_id = ? AND vacation_id IN ({placeholders})',
+                               [user_id] + vacation_ids)
+                liked_before = {row[0] for row in cursor.fetchall()}
+
+                to_like = [vacation_id for vacation_id in like_ids
+                           if vacation_id in existing and vacation_id not in liked_before]
+                to_unlike = [vacation_id for vacation_id in unlike_ids if vacation_id in liked_before]
+                inserted = deleted = 0
+                if to_like:
+                    cursor.executemany('''INSERT OR IGNORE INTO likes (user_id, vacation_id, created_at)
+                                          VALUES (?, ?, datetime('now'))''',
+                                       ((user_id, vacation_id) for vacation_id in to_like))
+                    inserted = cursor.rowcount
+                if to_unlike:
+                    sql = f"DELETE FROM likes WHERE user_id = ? AND vacation_id IN ({', '.join('?' * len(to_unlike))})"
+                    cursor.execute(sql, [user_id] + to_unlike)
+                    deleted = cursor.rowcount
+
+                cursor.execute(f'SELECT vacation_id, likes_count FROM vacations WHERE vacation_id IN ({placeholders})',
+                               vacation_ids)
+                likes_counts = dict(cursor.fetchall())
+                likes_version = CacheCoherency.record_local_write(cursor, 'likes', inserted + deleted)
+                connection.commit()
+                cursor.close()
+            except sqlite3.IntegrityError as e:
+                connection.rollback()
+                cursor.close()
+                if "FOREIGN KEY constraint failed" in str(e):
+                    return {'error': 'Invalid User ID or Vacation ID.'}
+                return {'error': f"Database error: {e}"}
+
+        changed = set(to_like) | set(to_unlike)
+        for vacation_id in changed:
+            vacation_catalog_cache.set_likes_count(vacation_id, likes_counts[vacation_id], likes_version)
+        liked_ids = set(like_ids)
+        vacations = {vacation_id: {'liked': vacation_id in liked_ids,
+                                   'likes_count': likes_counts[vacation_id],
+                                   'changed': vacation_id in changed}
+                     for vacation_id in vacation_ids if vacation_id in existing}
+        return {'vacations': vacations, 'liked': inserted, 'unliked': deleted}
+
+    @staticmethod
+    def iter_likes_per_country(fetch_size):
+        """Vacation and like totals of every country (PER_COUNTRY_COLUMNS), streamed by country_id."""
+        sql = '''
+            SELECT c.country_id, c.country_name, COUNT(v.vacation_id), COALESCE(SUM(v.likes_count), 0)
+            FROM countries c
+            LEFT JOIN vacations v ON v.country_id = c.country_id
+            GROUP BY c.country_id
+            ORDER BY c.country_id
+        '''
+        return iter_rows(sql, fetch_size=fetch_size)
+
+    @staticmethod
+    def iter_likes_per_day(fetch_size, start_date=None, end_date=None):
+        """
+        Number of likes made on each UTC day (PER_DAY_COLUMNS), streamed in date order.
+        Days without likes are left out, as are likes made before created_at existed.
+
+        Args:
+            start_date, end_date (str | None): 'YYYY-MM-DD', inclusive.
+        """
+        conditions = ['substr(created_at, 1, 10) IS NOT NULL']
+        params = []
+        if start_date is not None:
+            conditions.append('substr(created_at, 1, 10) >= ?')
+            params.append(start_date)
+        if end_date is not None:
+            conditions.append('substr(created_at, 1, 10) <= ?')
+            params.append(end_date)
+        sql = f'''
+            SELECT substr(created_at, 1, 10) AS day, COUNT(*)
+            FROM likes
+            WHERE {' AND '.join(conditions)}
+            GROUP BY day
+            ORDER BY day
+        '''
+        return iter_rows(sql, params, fetch_size=fetch_size)
@@ -0,0 +1,128 @@
+import os
+import re
+import sqlite3
+from models.database import get_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+MIGRATION_FILE_PATTERN = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+
+class Migration:
+    """
+    Versioned schema migrations.
+
+    Each file in migrations/ is named NNNN_description.sql and is applied once, in
+    order, inside its own transaction. Applied versions are recorded in the
+    schema_version table. Run them at deploy time with `python manage.py migrate`.
+    """
+
+    @staticmethod
+    def get_db_connection():
+        return get_connection()
+
+    @staticmethod
+    def create_table():
+        with Migration.get_db_connection() as connection:
+            cursor = connection.cursor()
+            sql = '''create table if not exists schema_version
+                    (version INTEGER PRIMARY KEY,
+                    name TEXT not null,
+                    applied_at TEXT not null default CURRENT_TIMESTAMP)
+                '''
+            cursor.execute(sql)
+            connection.commit()
+            cursor.close()
+
+    @staticmethod
+    def get_available():
+        """Return [(version, name, path)] for every migration file, ordered by version."""
+        migrations = []
+        for file_name in os.listdir(MIGRATIONS_DIR):
+            match = MIGRATION_FILE_PATTERN.match(file_name)
+            if match:
+                migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, file_name)))
+        migrations.sort()
+
+        versions = [m[0] for m in migrations]
+        if len(versions) != len(set(versions)):
+            raise ValueError('Duplicate migration version numbers in migrations/')
+        return migrations
+
+    @staticmethod
+    def get_latest_version():
+        available = Migration.get_available()
+        return available[-1][0] if available else 0
+
+    @staticmethod
+    def get_current_version():
+        """Highest applied version, or 0 when no migration has run yet."""
+        with Migration.get_db_connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT MAX(version) FROM schema_version')
+                version = cursor.fetchone()[0]
+            except sqlite3.OperationalError:
+                version = None  # schema_version table does not exist yet
+            cursor.close()
+            return version or 0
+
+    @staticmethod
+    def get_applied():
+        with Migration.get_db_connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT version, name, applied_at FROM schema_version ORDER BY version')
+                rows = cursor.fetchall()
+            except sqlite3.OperationalError:
+                rows = []
+            cursor.close()
+            return [dict(version=row[0], name=row[1], applied_at=row[2]) for row in rows]
+
+    @staticmethod
+    def split_statements(sql):
+        """Split a migration script into statements (trigger bodies stay intact)."""
+        statements = []
+        buffer = ''
+        for line in sql.splitlines(keepends=True):
+            buffer += line
+            if sqlite3.complete_statement(buffer):
+                if buffer.strip():
+                    statements.append(buffer.strip())
+                buffer = ''
+        if buffer.strip() and not all(l.strip().startswith('--') or not l.strip()
+                                      for l in buffer.splitlines()):
+            raise ValueError(f'Incomplete SQL statement in migration: {buffer.strip()[:80]}')
+        return statements
+
+    @staticmethod
+    def apply_all():
+        """
+        Apply every pending migration. Returns the list of versions applied.
+        Safe to run concurrently: each migration takes the write lock first and
+        skips itself if another process already applied it.
+        """
+        Migration.create_table()
+        applied = []
+        with Migration.get_db_connection() as connection:
+            for version, name, path in Migration.get_available():
+                with open(path, encoding='utf-8') as migration_file:
+                    statements = Migration.split_statements(migration_file.read())
+
+                cursor = connection.cursor()
+                try:
+                    cursor.execute('BEGIN IMMEDIATE')
+                    cursor.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,))
+                    if cursor.fetchone():
+                        connection.rollback()
+                        continue
+                    for statement in statements:
+                        cursor.execute(statement)
+                    cursor.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)', (version, name))
+                    connection.commit()
+                    applied.append(version)
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    cursor.close()
+        return applied
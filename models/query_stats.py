@@ -0,0 +1,245 @@
+import logging
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from constants import SQL_SLOW_QUERY_MS, SQL_REPEAT_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# Statements worth an EXPLAIN QUERY PLAN when they are slow
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """Collapse whitespace so the same statement written on several lines gets one key."""
+    return ' '.join(sql.split())
+
+
+class QueryStats:
+    """
+    Per-request SQL accounting fed by InstrumentedConnection.
+
+    Every statement executed on the request's thread between begin_request() and
+    end_request() is counted and timed (execute plus the fetches of its rows).
+    A statement slower than SQL_SLOW_QUERY_MS is logged with its query plan as
+    soon as it finishes; statements that ran SQL_REPEAT_THRESHOLD times or more
+    in one request (typically a query per row, i.e. N+1) are logged when the
+    request ends. Outside a request (background jobs, manage.py) only the slow
+    query log applies.
+    """
+
+    _local = threading.local()
+
+    @staticmethod
+    def begin_request():
+        QueryStats._local.request = dict(queries=0, transactions=0, seconds=0.0, statements={})
+        QueryStats._local.pending = None
+
+    @staticmethod
+    def end_request():
+        """Stop counting for this thread and return the request's totals (None outside a request)."""
+        QueryStats._finish_pending()
+        local = QueryStats._local
+        stats = getattr(local, 'request', None)
+        local.request = None
+        if stats is None:
+            return None
+        for sql, (count, seconds, parameters) in stats['statements'].items():
+            if count >= SQL_REPEAT_THRESHOLD:
+                logger.warning('Statement ran %d times in one request (%d distinct parameter sets, %.1f ms): %s',
+                               count, len(parameters), seconds * 1000, sql)
+        return stats
+
+    @staticmethod
+    def count_stream(chunks, stats, on_finish):
+        """
+        Wrap a streamed response body, whose statements run after end_request():
+        they are counted (repeats logged) separately, added to the request's
+        `stats`, and on_finish(stats) is called once the stream ends or is closed.
+        """
+        local = QueryStats._local
+        outer = getattr(local, 'request', None), getattr(local, 'pending', None)
+        QueryStats.begin_request()
+        try:
+            yield from chunks
+        finally:
+            body = QueryStats.end_request()
+            local.request, local.pending = outer
+            for key in ('queries', 'transactions', 'seconds'):
+                stats[key] += body[key]
+            on_finish(stats)
+
+    @staticmethod
+    def server_timing(stats):
+        """Server-Timing header value for a request's totals."""
+        return (f'db;dur={stats["seconds"] * 1000:.3f};'
+                f'desc="{stats["queries"]} queries, {stats["transactions"]} transactions"')
+
+    @staticmethod
+    def statement_started(cursor, sql, parameters, many=False):
+        QueryStats._finish_pending()
+        local = QueryStats._local
+        local.pending = [cursor, sql, None if many else parameters, 0.0]
+        stats = getattr(local, 'request', None)
+        if stats is not None:
+            stats['queries'] += 1
+            key = normalize_sql(sql)
+            entry = stats['statements'].get(key)
+            if entry is None:
+                entry = stats['statements'][key] = [0, 0.0, set()]
+            entry[0] += 1
+            if not many:
+                if isinstance(parameters, dict):
+                    parameters = tuple(sorted(parameters.items()))
+                try:
+                    entry[2].add(hash(tuple(parameters)))
+                except TypeError:
+                    pass
+
+    @staticmethod
+    def add_time(cursor, seconds):
+        """Account time spent executing or fetching the statement last run on `cursor`."""
+        local = QueryStats._local
+        pending = getattr(local, 'pending', None)
+        if pending is not None and pending[0] is cursor:
+            pending[3] += seconds
+        stats = getattr(local, 'request', None)
+        if stats is not None:
+            stats['seconds'] += seconds
+            if pending is not None and pending[0] is cursor:
+                stats['statements'][normalize_sql(pending[1])][1] += seconds
+
+    @staticmethod
+    def add_commit(seconds):
+        stats = getattr(QueryStats._local, 'request', None)
+        if stats is not None:
+            stats['transactions'] += 1
+            stats['seconds'] += seconds
+
+    @staticmethod
+    def finish(cursor):
+        """The statement last run on `cursor` is done (its rows were read or the cursor closed)."""
+        pending = getattr(QueryStats._local, 'pending', None)
+        if pending is not None and pending[0] is cursor:
+            QueryStats._finish_pending()
+
+    @staticmethod
+    def _finish_pending():
+        local = QueryStats._local
+        pending = getattr(local, 'pending', None)
+        local.pending = None
+        if pending is None:
+            return
+        cursor, sql, parameters, seconds = pending
+        if seconds * 1000 >= SQL_SLOW_QUERY_MS:
+            logger.warning('Slow query (%.1f ms): %s%s', seconds * 1000, normalize_sql(sql),
+                           QueryStats.explain(cursor.connection, sql, parameters))
+
+    @staticmethod
+    def explain(connection, sql, parameters):
+        """The statement's EXPLAIN QUERY PLAN as indented lines ('' when it cannot be explained)."""
+        if parameters is None or not sql.lstrip().upper().startswith(_EXPLAINABLE):
+            return ''
+        # A plain cursor, so the EXPLAIN itself is neither counted nor timed
+        cursor = sqlite3.Cursor(connection)
+        try:
+            sqlite3.Cursor.execute(cursor, 'EXPLAIN QUERY PLAN ' + sql, parameters)
+            rows = sqlite3.Cursor.fetchall(cursor)
+        except sqlite3.Error:
+            return ''
+        finally:
+            cursor.close()
+        depth = {0: 0}
+        lines = []
+        for node_id, parent_id, _, detail in rows:
+            depth[node_id] = depth.get(parent_id, 0) + 1
+            lines.append('\n' + '  ' * depth[node_id] + detail)
+        return ''.join(lines)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports every statement and the time spent on it to QueryStats."""
+
+    def execute(self, sql, parameters=(), /):
+        QueryStats.statement_started(self, sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            QueryStats.add_time(self, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        QueryStats.statement_started(self, sql, None, many=True)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            QueryStats.add_time(self, time.perf_counter() - started)
+            QueryStats.finish(self)
+
+    def executescript(self, sql_script, /):
+        QueryStats.statement_started(self, sql_script, None, many=True)
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            QueryStats.add_time(self, time.perf_counter() - started)
+            QueryStats.finish(self)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        QueryStats.add_time(self, time.perf_counter() - started)
+        if row is None:
+            QueryStats.finish(self)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        QueryStats.add_time(self, time.perf_counter() - started)
+        if not rows:
+            QueryStats.finish(self)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        QueryStats.add_time(self, time.perf_counter() - started)
+        QueryStats.finish(self)
+        return rows
+
+    def close(self):
+        QueryStats.finish(self)
+        super().close()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    sqlite3.Connection whose cursors are InstrumentedCursor. The shortcut
+    execute methods are routed through cursor() too (the C implementations
+    would bypass the subclass), and commits count as transactions.
+    """
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script, /):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        if not self.in_transaction:
+            return super().commit()
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            QueryStats.add_commit(time.perf_counter() - started)
@@ -1,9 +1,11 @@
 import sqlite3
+from models.database import get_connection
+from models.cache import user_principal_cache
 
 class Role:
     @staticmethod
     def get_db_connection():
-        return sqlite3.connect("projectdb.db")
+        return get_connection()
 
     @staticmethod
     def create_table():
@@ -34,6 +36,18 @@ class Role:
                 cursor.close()
                 return None
     
+    @staticmethod
+    def insert_many(role_names):
+        """Insert roles in one transaction, skipping names that already exist. Returns the number added."""
+        with Role.get_db_connection() as connection:
+            cursor = connection.cursor()
+            sql = 'INSERT OR IGNORE INTO roles (role_name) VALUES (?)'
+            cursor.executemany(sql, ((name,) for name in role_names))
+            inserted = cursor.rowcount
+            connection.commit()
+            cursor.close()
+            return inserted
+    
     @staticmethod
     def get_all():
         with Role.get_db_connection() as connection:
@@ -89,6 +103,7 @@ class Role:
                 cursor.execute(sql, values)
                 connection.commit()
                 cursor.close()
+                user_principal_cache.invalidate()
                 return {'message': f"Role {role_id} updated successfully"}
             except sqlite3.IntegrityError:
                 cursor.close()
@@ -104,7 +119,12 @@ class Role:
                 cursor.close()
                 return None
             
-            cursor.execute('DELETE FROM roles WHERE role_id = ?', (role_id,))
-            connection.commit()
+            try:
+                cursor.execute('DELETE FROM roles WHERE role_id = ?', (role_id,))
+                connection.commit()
+            except sqlite3.IntegrityError:
+                cursor.close()
+                return {'error': 'Role is still assigned to existing users'}
             cursor.close()
+            user_principal_cache.invalidate()
             return {'message': f"Role {role_id} deleted successfully"}
\ No newline at end of file
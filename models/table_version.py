@@ -0,0 +1,39 @@
+from models.database import get_connection
+
+
+class TableVersion:
+    """
+    Access to the table_versions change counters (migration 0005).
+    The counters are written by triggers, except for the few writes the
+    triggers deliberately skip (see bump_in_transaction).
+    """
+
+    @staticmethod
+    def get_db_connection():
+        return get_connection()
+
+    @staticmethod
+    def get_all():
+        """Return {table_name: version} for every tracked table."""
+        with TableVersion.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('SELECT table_name, version FROM table_versions')
+            versions = dict(cursor.fetchall())
+            cursor.close()
+            return versions
+
+    @staticmethod
+    def bump_in_transaction(cursor, table_name):
+        """
+        Advance a table's version inside the caller's write transaction, for a
+        write no trigger counts (e.g. likes_count repairs), so other workers
+        drop their cached copies.
+        """
+        cursor.execute('UPDATE table_versions SET version = version + 1 WHERE table_name = ?', (table_name,))
+
+    @staticmethod
+    def get_in_transaction(cursor, table_name):
+        """Current version of one table as seen by an open write transaction."""
+        cursor.execute('SELECT version FROM table_versions WHERE table_name = ?', (table_name,))
+        row = cursor.fetchone()
+        return row[0] if row else None
@@ -0,0 +1,86 @@
+import threading
+import time
+from models.database import get_connection
+from models.table_version import TableVersion
+from constants import TOKEN_VERSION_REFRESH_SECONDS
+
+
+class TokenVersion:
+    """
+    Per-user token versions used to revoke JWTs (migration 0006).
+
+    The whole table is small (only users whose version ever moved have a row),
+    so each worker keeps it in memory: loaded on first use, and re-read only when
+    the table's table_versions counter changed, checked at most every
+    TOKEN_VERSION_REFRESH_SECONDS. A worker's own bumps apply immediately.
+    """
+
+    _lock = threading.Lock()
+    _versions = None  # user_id -> token_version
+    _table_version = None
+    _checked_at = 0.0
+
+    @staticmethod
+    def get_db_connection():
+        return get_connection()
+
+    @staticmethod
+    def load():
+        """(Re)load the revocation table into memory."""
+        with TokenVersion.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('SELECT table_name, version FROM table_versions WHERE table_name = ?',
+                           ('user_token_versions',))
+            row = cursor.fetchone()
+            cursor.execute('SELECT user_id, token_version FROM user_token_versions')
+            versions = dict(cursor.fetchall())
+            cursor.close()
+        with TokenVersion._lock:
+            TokenVersion._versions = versions
+            TokenVersion._table_version = row[1] if row else None
+            TokenVersion._checked_at = time.monotonic()
+
+    @staticmethod
+    def _refresh_if_stale():
+        if TokenVersion._versions is None:
+            TokenVersion.load()
+            return
+        if time.monotonic() - TokenVersion._checked_at < TOKEN_VERSION_REFRESH_SECONDS:
+            return
+        TokenVersion._checked_at = time.monotonic()
+        if TableVersion.get_all().get('user_token_versions') != TokenVersion._table_version:
+            TokenVersion.load()
+
+    @staticmethod
+    def get(user_id):
+        """Current token version for a user (0 if never bumped)."""
+        TokenVersion._refresh_if_stale()
+        return TokenVersion._versions.get(user_id, 0)
+
+    @staticmethod
+    def bump_in_transaction(cursor, user_id):
+        """Increment a user's token version inside the caller's write transaction."""
+        cursor.execute('''INSERT INTO user_token_versions (user_id, token_version) VALUES (?, 1)
+                          ON CONFLICT(user_id) DO UPDATE SET token_version = token_version + 1''',
+                       (user_id,))
+        cursor.execute('SELECT token_version FROM user_token_versions WHERE user_id = ?', (user_id,))
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def remember(user_id, token_version):
+        """Apply a committed bump to this worker's in-memory table."""
+        with TokenVersion._lock:
+            if TokenVersion._versions is not None:
+                current = TokenVersion._versions.get(user_id, 0)
+                TokenVersion._versions[user_id] = max(current, token_version)
+
+    @staticmethod
+    def bump(user_id):
+        """Revoke every token issued to the user so far. Returns the new version."""
+        with TokenVersion.get_db_connection() as connection:
+            cursor = connection.cursor()
+            token_version = TokenVersion.bump_in_transaction(cursor, user_id)
+            connection.commit()
+            cursor.close()
+        TokenVersion.remember(user_id, token_version)
+        return token_version
@@ -1,9 +1,12 @@
 import sqlite3
+from models.database import get_connection
+from models.cache import vacation_catalog_cache, user_principal_cache, CacheCoherency
+from models.token_version import TokenVersion
 
 class User:
     @staticmethod
     def get_db_connection():
-        return sqlite3.connect("projectdb.db")
+        return get_connection()
 
     @staticmethod
     def create_table():
@@ -28,7 +31,6 @@ class User:
         """
         with User.get_db_connection() as connection:
             cursor = connection.cursor()
-            cursor.execute("PRAGMA foreign_keys = ON;")
             try:
                 sql = '''insert into users 
                         (first_name, last_name, email, password, role_id)
@@ -82,6 +84,19 @@ class User:
                 )
             return None
     
+    @staticmethod
+    def get_principal(user_id):
+        """
+        The authenticated user as used by the auth decorators (same shape as
+        get_by_id), served from the principal cache when possible.
+        """
+        user = user_principal_cache.get(user_id)
+        if user is None:
+            user = User.get_by_id(user_id)
+            if user is not None:
+                user_principal_cache.put(user_id, user)
+        return dict(user) if user is not None else None
+
     @staticmethod
     def get_by_email(email):
         with User.get_db_connection() as connection:
@@ -125,25 +140,65 @@ class User:
                 sql = f"UPDATE users SET {', '.join(update_fields)} WHERE user_id = ?"
                 values.append(user_id)
                 cursor.execute(sql, values)
+                CacheCoherency.record_local_write(cursor, 'users', cursor.rowcount)
+                # Tokens carry the role; a role or password change revokes them
+                token_version = None
+                if 'role_id' in kwargs or 'password' in kwargs:
+                    token_version = TokenVersion.bump_in_transaction(cursor, user_id)
                 connection.commit()
                 cursor.close()
+                user_principal_cache.pop(user_id)
+                if token_version is not None:
+                    TokenVersion.remember(user_id, token_version)
                 return {'message': f"User {user_id} updated successfully"}
             except sqlite3.IntegrityError:
                 cursor.close()
                 return None
 
+    @staticmethod
+    def update_password_hash(user_id, password_hash, previous_hash):
+        """
+        Replace a user's hash for the same password (rehash after a cost change).
+        Unlike a password change through update(), this does not revoke tokens.
+        Nothing changes if the stored hash is no longer previous_hash (the
+        password was changed meanwhile).
+        """
+        with User.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('UPDATE users SET password = ? WHERE user_id = ? AND password = ?',
+                           (password_hash, user_id, previous_hash))
+            CacheCoherency.record_local_write(cursor, 'users', cursor.rowcount)
+            connection.commit()
+            cursor.close()
+
     @staticmethod
     def delete(user_id):
         with User.get_db_connection() as connection:
             cursor = connection.cursor()
-            cursor.execute("PRAGMA foreign_keys = ON;")
+            # Take the write lock first, so the like counts read below cannot change before the delete
+            cursor.execute('BEGIN IMMEDIATE')
             cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
             user = cursor.fetchone()
             if user is None:
+                connection.rollback()
                 cursor.close()
                 return None
             
+            # The cascade removes this user's likes (one per vacation), and the likes
+            # triggers decrement each count; remember the results to patch cached counts
+            cursor.execute('''SELECT vacation_id, likes_count - 1 FROM vacations
+                              WHERE vacation_id IN (SELECT vacation_id FROM likes WHERE user_id = ?)''',
+                           (user_id,))
+            likes_counts = cursor.fetchall()
+
             cursor.execute('DELETE FROM users WHERE user_id = ?', (user_id,))
+            CacheCoherency.record_local_write(cursor, 'users', 1)
+            token_version = TokenVersion.bump_in_transaction(cursor, user_id)
+            likes_version = CacheCoherency.record_local_write(cursor, 'likes', len(likes_counts))
             connection.commit()
             cursor.close()
+            user_principal_cache.pop(user_id)
+            TokenVersion.remember(user_id, token_version)
+            for vacation_id, likes_count in likes_counts:
+                vacation_catalog_cache.set_likes_count(vacation_id, likes_count, likes_version)
             return {'message': f"User {user_id} deleted successfully"}
@@ -1,11 +1,22 @@
+import json
 import sqlite3
+from models.database import get_connection, iter_rows
+from models.cache import vacation_catalog_cache, image_metadata_cache, CacheCoherency
+from models.table_version import TableVersion
 from datetime import datetime, date
 
 
 class Vacation:
+    # likes_count is maintained by triggers on the likes table (migration 0004)
+    COLUMNS = '''vacation_id, country_id, vacation_description, vacation_start,
+                vacation_end, price, picture_file_name, likes_count, picture_variants'''
+
+    EXPORT_COLUMNS = ('vacation_id', 'country_id', 'country_name', 'vacation_description', 'vacation_start',
+                      'vacation_end', 'price', 'picture_file_name', 'likes_count')
+
     @staticmethod
     def get_db_connection():
-        return sqlite3.connect("projectdb.db")
+        return get_connection()
 
     @staticmethod
     def create_table():
@@ -29,24 +40,27 @@ class Vacation:
     
     @staticmethod
     def insert(country_id, vacation_description, vacation_start,
-                                 vacation_end, price, picture_file_name):
+                                 vacation_end, price, picture_file_name, picture_variants=None):
         """
         Inserts a new vacation record into the database.
         Assumes all input data has been validated by the controller.
         """
         with Vacation.get_db_connection() as connection:
             cursor = connection.cursor()
-            cursor.execute("PRAGMA foreign_keys = ON;")
             try:
                 sql = '''INSERT INTO vacations
                              (country_id, vacation_description, vacation_start,
-                                vacation_end, price, picture_file_name)
-                             VALUES(?, ?, ?, ?, ?, ?)'''
+                                vacation_end, price, picture_file_name, picture_variants)
+                             VALUES(?, ?, ?, ?, ?, ?, ?)'''
                 cursor.execute(sql, (country_id, vacation_description, vacation_start,
-                                   vacation_end, price, picture_file_name))
+                                   vacation_end, price, picture_file_name,
+                                   json.dumps(picture_variants) if picture_variants else None))
                 vacation_id = cursor.lastrowid
+                CacheCoherency.record_local_write(cursor, 'vacations', 1)
                 connection.commit()
                 cursor.close()
+                vacation_catalog_cache.invalidate_vacation(vacation_id)
+                image_metadata_cache.pop(picture_file_name)
                 return {'message': f"Vacation '{vacation_id}' inserted successfully", 'id': vacation_id}
             except sqlite3.IntegrityError as e:
                 cursor.close()
@@ -54,62 +68,158 @@ class Vacation:
             except Exception as e:
                 cursor.close()
                 return {'error': f"An unexpected database error occurred during insertion: {e}"}
+
+    @staticmethod
+    def insert_many(rows):
+        """
+        Inserts validated vacations (dicts with the insert() fields,
+        picture_variants optional) in one transaction with a single executemany.
+        Returns {'inserted': count} or {'error': ...}; on error nothing is inserted.
+        """
+        with Vacation.get_db_connection() as connection:
+            cursor = connection.cursor()
+            try:
+                sql = '''INSERT INTO vacations
+                             (country_id, vacation_description, vacation_start,
+                                vacation_end, price, picture_file_name, picture_variants)
+                             VALUES(?, ?, ?, ?, ?, ?, ?)'''
+                cursor.executemany(sql, ((row['country_id'], row['vacation_description'], row['vacation_start'],
+                                          row['vacation_end'], row['price'], row['picture_file_name'],
+                                          json.dumps(row['picture_variants']) if row.get('picture_variants') else None)
+                                         for row in rows))
+                inserted = cursor.rowcount
+                CacheCoherency.record_local_write(cursor, 'vacations', inserted)
+                connection.commit()
+                cursor.close()
+                if inserted:
+                    vacation_catalog_cache.invalidate()
+                return {'inserted': inserted}
+            except sqlite3.IntegrityError as e:
+                connection.rollback()
+                cursor.close()
+                return {'error': f"Database error: Could not insert vacations due to a constraint violation. Details: {e}"}
+            except Exception as e:
+                connection.rollback()
+                cursor.close()
+                return {'error': f"An unexpected database error occurred during insertion: {e}"}
+
+    @staticmethod
+    def row_to_dict(vacation):
+        return dict(
+            vacation_id=vacation[0],
+            country_id=vacation[1],
+            vacation_description=vacation[2],
+            vacation_start=vacation[3],
+            vacation_end=vacation[4],
+            price=vacation[5],
+            picture_file_name=vacation[6],
+            likes_count=vacation[7],
+            picture_variants=json.loads(vacation[8]) if vacation[8] else None
+        )
+
     @staticmethod
     def get_all():
+        return Vacation.get_filtered()
+
+    @staticmethod
+    def _cache_key(limit, after, country_id, min_price, max_price, start_date, end_date):
+        return (limit, after, country_id, min_price, max_price, start_date, end_date)
+
+    @staticmethod
+    def get_filtered(limit=None, after=None, country_id=None, min_price=None, max_price=None,
+                     start_date=None, end_date=None, liked_by=None):
+        """
+        Returns vacations matching the filters in (vacation_start, vacation_id) order.
+
+        Args:
+            limit (int | None): Maximum number of rows, or None for every match.
+            after (tuple | None): (vacation_start, vacation_id) of the last row already
+                returned. Keyset pagination: the index seeks straight to the next row
+                instead of skipping an OFFSET.
+            country_id, min_price, max_price: Exact country / inclusive price range.
+            start_date, end_date (str | None): 'YYYY-MM-DD'; vacations starting on or
+                after start_date and ending on or before end_date.
+            liked_by (int | None): Only vacations liked by this user.
+
+        Results without liked_by are served from the catalog cache when possible.
+        """
+        cache_key = None
+        if liked_by is None:
+            cache_key = Vacation._cache_key(limit, tuple(after) if after else None, country_id,
+                                            min_price, max_price, start_date, end_date)
+            CacheCoherency.validate(vacation_catalog_cache)
+            cached = vacation_catalog_cache.get_page(cache_key)
+            if cached is not None:
+                return cached
+        generation = vacation_catalog_cache.generation()
+
+        conditions = []
+        params = []
+        if after is not None:
+            conditions.append('(vacation_start, vacation_id) > (?, ?)')
+            params.extend(after)
+        if country_id is not None:
+            conditions.append('country_id = ?')
+            params.append(country_id)
+        if min_price is not None:
+            conditions.append('price >= ?')
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append('price <= ?')
+            params.append(max_price)
+        if start_date is not None:
+            conditions.append('vacation_start >= ?')
+            params.append(start_date)
+        if end_date is not None:
+            conditions.append('vacation_end <= ?')
+            params.append(end_date)
+        if liked_by is not None:
+            conditions.append('vacation_id IN (SELECT vacation_id FROM likes WHERE user_id = ?)')
+            params.append(liked_by)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        sql = f'''
+            SELECT {Vacation.COLUMNS}
+            FROM vacations
+            {where}
+            ORDER BY vacation_start ASC, vacation_id ASC
+        '''
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
         with Vacation.get_db_connection() as connection:
             cursor = connection.cursor()
-            sql = '''
-                SELECT v.*, COALESCE(l.likes_count, 0) as likes_count 
-                FROM vacations v 
-                LEFT JOIN (
-                    SELECT vacation_id, COUNT(*) as likes_count 
-                    FROM likes 
-                    GROUP BY vacation_id
-                ) l ON v.vacation_id = l.vacation_id 
-                ORDER BY v.vacation_start ASC
-            '''
-            cursor.execute(sql)
+            cursor.execute(sql, params)
             vacations = cursor.fetchall()
             cursor.close()
-            return [dict(
-                vacation_id=vacation[0],
-                country_id=vacation[1],
-                vacation_description=vacation[2],
-                vacation_start=vacation[3],
-                vacation_end=vacation[4],
-                price=vacation[5],
-                picture_file_name=vacation[6],
-                likes_count=vacation[7]
-            ) for vacation in vacations]
+            result = [Vacation.row_to_dict(vacation) for vacation in vacations]
+            if cache_key is not None:
+                vacation_catalog_cache.put_page(cache_key, result, generation)
+            return result
     
     @staticmethod
     def get_by_id(vacation_id):
+        CacheCoherency.validate(vacation_catalog_cache)
+        cached = vacation_catalog_cache.get_row(vacation_id)
+        if cached is not None:
+            return cached
+        generation = vacation_catalog_cache.generation()
+
         with Vacation.get_db_connection() as connection:
             cursor = connection.cursor()
-            sql = '''
-                SELECT v.*, COALESCE(l.likes_count, 0) as likes_count 
-                FROM vacations v 
-                LEFT JOIN (
-                    SELECT vacation_id, COUNT(*) as likes_count 
-                    FROM likes 
-                    GROUP BY vacation_id
-                ) l ON v.vacation_id = l.vacation_id 
-                WHERE v.vacation_id = ?
+            sql = f'''
+                SELECT {Vacation.COLUMNS}
+                FROM vacations
+                WHERE vacation_id = ?
             '''
             cursor.execute(sql, (vacation_id,))
             vacation = cursor.fetchone()
             cursor.close()
             if vacation:
-                return dict(
-                    vacation_id=vacation[0],
-                    country_id=vacation[1],
-                    vacation_description=vacation[2],
-                    vacation_start=vacation[3],
-                    vacation_end=vacation[4],
-                    price=vacation[5],
-                    picture_file_name=vacation[6],
-                    likes_count=vacation[7]
-                )
+                result = Vacation.row_to_dict(vacation)
+                vacation_catalog_cache.put_row(result, generation)
+                return result
             return None
     
     @staticmethod
@@ -122,6 +232,11 @@ class Vacation:
                     cursor.close()
                     return {'error': 'Vacation not found'}
 
+                # likes_count is owned by the likes triggers, never by clients
+                kwargs.pop('likes_count', None)
+                if kwargs.get('picture_variants'):
+                    kwargs['picture_variants'] = json.dumps(kwargs['picture_variants'])
+
                 update_fields = []
                 values = []
                 for key, value in kwargs.items():
@@ -135,8 +250,12 @@ class Vacation:
                 sql = f"UPDATE vacations SET {', '.join(update_fields)} WHERE vacation_id = ?"
                 values.append(vacation_id)
                 cursor.execute(sql, values)
+                CacheCoherency.record_local_write(cursor, 'vacations', cursor.rowcount)
                 connection.commit()
                 cursor.close()
+                vacation_catalog_cache.invalidate_vacation(vacation_id)
+                if 'picture_file_name' in kwargs:
+                    image_metadata_cache.pop(kwargs['picture_file_name'])
                 return {'message': f"Vacation {vacation_id} updated successfully"}
             except sqlite3.IntegrityError as e:
                 cursor.close()
@@ -149,18 +268,131 @@ class Vacation:
     def delete(vacation_id):
         with Vacation.get_db_connection() as connection:
             cursor = connection.cursor()
-            cursor.execute("PRAGMA foreign_keys = ON;")
-            cursor.execute('SELECT * FROM vacations WHERE vacation_id = ?', (vacation_id,))
+            cursor.execute('SELECT likes_count FROM vacations WHERE vacation_id = ?', (vacation_id,))
             vacation = cursor.fetchone()
             if vacation is None:
                 cursor.close()
                 return None
             
             cursor.execute('DELETE FROM vacations WHERE vacation_id = ?', (vacation_id,))
+            CacheCoherency.record_local_write(cursor, 'vacations', 1)
+            CacheCoherency.record_local_write(cursor, 'likes', vacation[0])  # cascaded likes
             connection.commit()
             cursor.close()
+            vacation_catalog_cache.invalidate_vacation(vacation_id)
             return {'message': f"Vacation {vacation_id} deleted successfully"}
 
+    @staticmethod
+    def iter_export(fetch_size):
+        """Every vacation with its country name and like count (EXPORT_COLUMNS), streamed by vacation_id."""
+        sql = '''
+            SELECT v.vacation_id, v.country_id, c.country_name, v.vacation_description, v.vacation_start,
+                   v.vacation_end, v.price, v.picture_file_name, v.likes_count
+            FROM vacations v
+            JOIN countries c ON c.country_id = v.country_id
+            ORDER BY v.vacation_id
+        '''
+        return iter_rows(sql, fetch_size=fetch_size)
+
+    @staticmethod
+    def get_picture_variants(picture_file_name):
+        """Variant metadata for an image file, or None if it has none (yet)."""
+        CacheCoherency.validate(image_metadata_cache)
+        cached = image_metadata_cache.get(picture_file_name)
+        if cached is not None:
+            return cached or None
+
+        with Vacation.get_db_connection() as connection:
+            cursor = connection.cursor()
+            sql = '''SELECT picture_variants FROM vacations
+                     WHERE picture_file_name = ? AND picture_variants IS NOT NULL
+                     LIMIT 1'''
+            cursor.execute(sql, (picture_file_name,))
+            row = cursor.fetchone()
+            cursor.close()
+        metadata = json.loads(row[0]) if row else None
+        image_metadata_cache.put(picture_file_name, metadata or {})
+        return metadata
+
+    @staticmethod
+    def get_picture_variants_many(picture_file_names):
+        """
+        Variant metadata of many image files in one query, bypassing the cache.
+        Returns {picture_file_name: metadata} for the names that have any.
+        """
+        picture_file_names = list(picture_file_names)
+        if not picture_file_names:
+            return {}
+        placeholders = ', '.join('?' * len(picture_file_names))
+        with Vacation.get_db_connection() as connection:
+            cursor = connection.cursor()
+            sql = f'''SELECT picture_file_name, MAX(picture_variants) FROM vacations
+                      WHERE picture_file_name IN ({placeholders}) AND picture_variants IS NOT NULL
+                      GROUP BY picture_file_name'''
+            cursor.execute(sql, picture_file_names)
+            rows = cursor.fetchall()
+            cursor.close()
+        return {name: json.loads(picture_variants) for name, picture_variants in rows}
+
+    @staticmethod
+    def prime_picture_variants(picture_file_names):
+        """Load the variant metadata of many pictures into the cache with one query (startup warmup)."""
+        picture_file_names = set(picture_file_names)
+        CacheCoherency.validate(image_metadata_cache)
+        found = Vacation.get_picture_variants_many(picture_file_names)
+        for picture_file_name in picture_file_names:
+            image_metadata_cache.put(picture_file_name, found.get(picture_file_name) or {})
+        return len(picture_file_names)
+
+    @staticmethod
+    def set_picture_variants(picture_file_name, picture_variants):
+        """Store variant metadata on every vacation using the file. Returns the rows updated."""
+        with Vacation.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('UPDATE vacations SET picture_variants = ? WHERE picture_file_name = ?',
+                           (json.dumps(picture_variants) if picture_variants else None, picture_file_name))
+            updated = cursor.rowcount
+            CacheCoherency.record_local_write(cursor, 'vacations', updated)
+            connection.commit()
+            cursor.close()
+        image_metadata_cache.pop(picture_file_name)
+        if updated:
+            vacation_catalog_cache.invalidate()
+        return updated
+
+    @staticmethod
+    def get_referenced_pictures():
+        """Set of every picture_file_name in use (one scan of its index)."""
+        with Vacation.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('SELECT DISTINCT picture_file_name FROM vacations')
+            names = {row[0] for row in cursor.fetchall()}
+            cursor.close()
+            return names
+
+    @staticmethod
+    def count_picture_references(picture_file_name):
+        """Number of vacations using an image file (its reference count)."""
+        with Vacation.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('SELECT COUNT(*) FROM vacations WHERE picture_file_name = ?', (picture_file_name,))
+            count = cursor.fetchone()[0]
+            cursor.close()
+            return count
+
+    @staticmethod
+    def get_pictures_without_variants():
+        """Distinct picture file names that have no (or only pending) variant metadata."""
+        with Vacation.get_db_connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute('''SELECT DISTINCT picture_file_name FROM vacations
+                              WHERE picture_variants IS NULL
+                                 OR json_extract(picture_variants, '$.status') = 'pending'
+                           ''')
+            names = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+            return names
+
     @staticmethod
     def get_user_liked_vacations(user_id):
         """Get list of vacation IDs that a user has liked"""
@@ -172,4 +404,28 @@ class Vacation:
             cursor.close()
             return [row[0] for row in liked_vacations]
 
-    
\ No newline at end of file
+    @staticmethod
+    def reconcile_likes_count():
+        """
+        Recompute likes_count from the likes table for any vacation whose stored
+        count has drifted (e.g. rows changed with triggers disabled).
+        Returns the number of vacations that were corrected.
+        """
+        with Vacation.get_db_connection() as connection:
+            cursor = connection.cursor()
+            sql = '''
+                UPDATE vacations
+                SET likes_count = (SELECT COUNT(*) FROM likes WHERE likes.vacation_id = vacations.vacation_id)
+                WHERE likes_count != (SELECT COUNT(*) FROM likes WHERE likes.vacation_id = vacations.vacation_id)
+            '''
+            cursor.execute(sql)
+            corrected = cursor.rowcount
+            if corrected:
+                # The version triggers ignore likes_count; without this, other workers would
+                # keep serving the drifted counts (and their ETags) until the cache TTL
+                TableVersion.bump_in_transaction(cursor, 'likes')
+            connection.commit()
+            cursor.close()
+            if corrected:
+                vacation_catalog_cache.invalidate()
+            return corrected
@@ -1,6 +1,7 @@
 from flask import Blueprint, g, jsonify
 from controllers.auth_controller import AuthController
-from decorators.auth_decorator import token_required
+from decorators.auth_decorator import token_required, token_optional
+from models.user import User
 
 auth_bp = Blueprint('auth_bp', __name__)
 
@@ -9,6 +10,7 @@ def login():
     return AuthController.login_user()
 
 @auth_bp.route('/logout', methods=['POST'])
+@token_optional
 def logout():
     return AuthController.logout_user()
 
@@ -19,4 +21,7 @@ def register():
 @auth_bp.route('/me', methods=['GET'])
 @token_required
 def get_current_user():
-    return jsonify(g.user)
\ No newline at end of file
+    user = User.get_principal(g.user['user_id'])
+    if user is None:
+        return jsonify({'error': 'User not found'}), 404
+    return jsonify(user)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify
 from controllers.country_controller import CountryController
 from decorators.auth_decorator import admin_required
+from decorators.http_cache_decorator import versioned_etag
 
 country_bp = Blueprint('countries', __name__)
 
@@ -10,11 +11,13 @@ def insert_country():
     return CountryController.insert_country()
 
 @country_bp.route('/countries', methods=['GET'])
+@versioned_etag('countries')
 def get_all_countries():
     # Public route - no authentication required
     return CountryController.get_all_countries()
 
 @country_bp.route('/countries/<int:country_id>', methods=['GET'])
+@versioned_etag('countries')
 def get_country(country_id):
     # Public route - no authentication required
     return CountryController.get_country(country_id)
@@ -0,0 +1,20 @@
+from flask import Blueprint
+from controllers.export_controller import ExportController
+from decorators.auth_decorator import admin_required
+
+export_bp = Blueprint('exports', __name__)
+
+@export_bp.route('/exports/vacations', methods=['GET'])
+@admin_required
+def export_vacations():
+    return ExportController.export_vacations()
+
+@export_bp.route('/exports/likes-per-country', methods=['GET'])
+@admin_required
+def export_likes_per_country():
+    return ExportController.export_likes_per_country()
+
+@export_bp.route('/exports/likes-per-day', methods=['GET'])
+@admin_required
+def export_likes_per_day():
+    return ExportController.export_likes_per_day()
@@ -0,0 +1,8 @@
+from flask import Blueprint
+from controllers.image_controller import ImageController
+
+image_bp = Blueprint('images', __name__)
+
+@image_bp.route('/images/<filename>', methods=['GET'])
+def serve_image(filename):
+    return ImageController.serve_image(filename)
@@ -0,0 +1,15 @@
+from flask import Blueprint
+from controllers.job_controller import JobController
+from decorators.auth_decorator import admin_required
+
+job_bp = Blueprint('jobs', __name__)
+
+@job_bp.route('/jobs', methods=['GET'])
+@admin_required
+def get_jobs():
+    return JobController.get_jobs()
+
+@job_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@admin_required
+def get_job(job_id):
+    return JobController.get_job(job_id)
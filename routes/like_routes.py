@@ -9,6 +9,11 @@ like_bp = Blueprint('like_bp', __name__)
 def add_like():
     return LikeController.insert_like()
 
+@like_bp.route('/likes/batch', methods=['POST'])
+@token_required
+def batch_likes():
+    return LikeController.batch_likes()
+
 @like_bp.route('/likes/<int:vacation_id>', methods=['DELETE'])
 @token_required
 def remove_like(vacation_id):
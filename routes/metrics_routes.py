@@ -0,0 +1,10 @@
+from flask import Blueprint
+from controllers.metrics_controller import MetricsController
+from decorators.auth_decorator import admin_required
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    return MetricsController.get_metrics()
@@ -0,0 +1,25 @@
+from flask import Blueprint
+from controllers.profiler_controller import ProfilerController
+from decorators.auth_decorator import admin_required
+
+profiler_bp = Blueprint('profiler', __name__)
+
+@profiler_bp.route('/profiler', methods=['POST'])
+@admin_required
+def start_profiling():
+    return ProfilerController.start_profiling()
+
+@profiler_bp.route('/profiler', methods=['GET'])
+@admin_required
+def get_profile():
+    return ProfilerController.get_profile()
+
+@profiler_bp.route('/profiler', methods=['DELETE'])
+@admin_required
+def stop_profiling():
+    return ProfilerController.stop_profiling()
+
+@profiler_bp.route('/profiler/download', methods=['GET'])
+@admin_required
+def download_profile():
+    return ProfilerController.download_profile()
@@ -1,6 +1,7 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from controllers.vacation_controller import VacationController
-from decorators.auth_decorator import token_required, admin_required
+from decorators.auth_decorator import token_required, admin_required, token_optional
+from decorators.http_cache_decorator import versioned_etag
 
 vacation_bp = Blueprint('vacations', __name__)
 
@@ -9,12 +10,20 @@ vacation_bp = Blueprint('vacations', __name__)
 def insert_vacation():
     return VacationController.insert_vacation()
 
+@vacation_bp.route('/vacations/import', methods=['POST'])
+@admin_required
+def import_vacations():
+    return VacationController.import_vacations()
+
 @vacation_bp.route('/vacations', methods=['GET'])
+@token_optional
+@versioned_etag('vacations', 'likes', vary_by_user=lambda: 'liked' in request.args)
 def get_all_vacations():
     return VacationController.get_all_vacations()
 
 @vacation_bp.route('/vacations/<int:vacation_id>', methods=['GET'])
 @token_required
+@versioned_etag('vacations', 'likes', public=False)
 def get_vacation(vacation_id):
     return VacationController.get_vacation(vacation_id)
 
@@ -31,4 +40,9 @@ def delete_vacation(vacation_id):
 @vacation_bp.route('/vacations/user-likes', methods=['GET'])
 @token_required
 def get_user_liked_vacations():
-    return VacationController.get_user_liked_vacations()
\ No newline at end of file
+    return VacationController.get_user_liked_vacations()
+
+@vacation_bp.route('/vacations/cache-stats', methods=['GET'])
+@admin_required
+def get_catalog_cache_stats():
+    return VacationController.get_catalog_cache_stats()
@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+from constants import EXPORT_CHUNK_BYTES
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+}
+
+
+class Exporter:
+    """
+    Encodes rows as CSV (with a header row) or JSON Lines for streamed
+    responses. Rows are consumed one at a time from any iterator, e.g. a
+    fetchmany-backed query, and written out in chunks of about
+    EXPORT_CHUNK_BYTES, so the worker's memory use does not depend on the
+    size of the export.
+    """
+
+    @staticmethod
+    def content_type(export_format):
+        return EXPORT_FORMATS[export_format][0]
+
+    @staticmethod
+    def file_name(name, export_format):
+        return f'{name}.{EXPORT_FORMATS[export_format][1]}'
+
+    @staticmethod
+    def encode(columns, rows, export_format):
+        """Yield the encoded export as bytes chunks."""
+        buffer = io.StringIO()
+        if export_format == 'csv':
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            write = writer.writerow
+        else:
+            def write(row):
+                buffer.write(json.dumps(dict(zip(columns, row))))
+                buffer.write('\n')
+
+        for row in rows:
+            write(row)
+            if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
@@ -0,0 +1,159 @@
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+from models.vacation import Vacation
+from services.image_store import ImageStore, IMAGES_DIR, VARIANTS_DIR, STORE_DIR
+
+QUARANTINE_DIR = os.path.join(IMAGES_DIR, 'quarantine')
+
+QUARANTINE_BATCH_FORMAT = '%Y%m%dT%H%M%S'
+
+# '<picture>.<width>.<ext>' written by ImageProcessor, plus its '.tmp' while being written
+VARIANT_NAME = re.compile(r'^(?P<owner>.+?\.[A-Za-z0-9]+)\.\d+\.(?:jpg|png|webp)(?P<temp>\.tmp)?$')
+GC_MODES = ('dry-run', 'delete', 'quarantine')
+
+
+class ImageGC:
+    """
+    Finds and removes image files no vacation references.
+
+    The referenced names come from one scan of the picture_file_name index,
+    taken before the directories are listed. A file is only collected when it
+    is unreferenced AND older than the grace period, and both its reference
+    count and its mtime (and that of its original, for a variant) are
+    re-checked right before removal, so uploads that are in flight are safe:
+    a new upload has a fresh mtime, and re-uploading stored content refreshes it.
+    Quarantine batches are deleted once they are older than the grace period.
+
+    Scanned: the content-addressed store (originals, variants, abandoned upload
+    temp files) and images/variants/. Plain files directly in images/ predate
+    the store and include the pictures shipped with the repository, so they
+    are only considered with include_legacy=True.
+    """
+
+    @staticmethod
+    def _owner(directory, name):
+        """The picture a file belongs to, or None for an abandoned temp file."""
+        if directory == STORE_DIR:
+            return None  # only '<random>.upload' temp files live at the store root
+        if directory == IMAGES_DIR or ImageStore.is_content_addressed(name):
+            return name
+        match = VARIANT_NAME.match(name)
+        if match is None or match.group('temp'):
+            return None
+        return match.group('owner')
+
+    @staticmethod
+    def _candidates(include_legacy):
+        """Yield (directory, name, stat) for every file the collector may look at."""
+        directories = [VARIANTS_DIR, STORE_DIR]
+        if os.path.isdir(STORE_DIR):
+            for first in os.scandir(STORE_DIR):
+                if first.is_dir():
+                    directories += [second.path for second in os.scandir(first.path) if second.is_dir()]
+        if include_legacy:
+            directories.append(IMAGES_DIR)
+
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for entry in os.scandir(directory):
+                if entry.is_file(follow_symlinks=False):
+                    yield directory, entry.name, entry.stat(follow_symlinks=False)
+
+    @staticmethod
+    def _touched_since(path, owner, cutoff):
+        """True if the file, or the original it belongs to, was (re-)uploaded after cutoff."""
+        paths = [path]
+        if owner is not None and ImageStore.is_content_addressed(owner):
+            paths.append(ImageStore.path(owner))
+        for candidate in paths:
+            try:
+                if os.stat(candidate).st_mtime > cutoff:
+                    return True
+            except FileNotFoundError:
+                pass
+        return False
+
+    @staticmethod
+    def _prune_quarantine(cutoff):
+        """Delete quarantine batches created before cutoff. Returns (batches, bytes freed)."""
+        if not os.path.isdir(QUARANTINE_DIR):
+            return 0, 0
+        batches = freed = 0
+        for entry in os.scandir(QUARANTINE_DIR):
+            try:
+                created = datetime.strptime(entry.name, QUARANTINE_BATCH_FORMAT).timestamp()
+            except ValueError:
+                continue  # not a batch written by collect()
+            if not entry.is_dir(follow_symlinks=False) or created > cutoff:
+                continue
+            for root, _, names in os.walk(entry.path):
+                for name in names:
+                    try:
+                        freed += os.stat(os.path.join(root, name)).st_size
+                    except FileNotFoundError:
+                        pass
+            shutil.rmtree(entry.path, ignore_errors=True)
+            batches += 1
+        return batches, freed
+
+    @staticmethod
+    def _quarantine(path, batch_dir):
+        target = os.path.join(batch_dir, os.path.relpath(path, IMAGES_DIR))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+
+    @staticmethod
+    def collect(grace_seconds, mode='dry-run', include_legacy=False):
+        """
+        Remove unreferenced image files older than grace_seconds.
+
+        mode: 'dry-run' (only report), 'delete', or 'quarantine' (move under
+        images/quarantine/<timestamp>/ for manual review). Both removing modes
+        also delete quarantine batches older than grace_seconds.
+        Returns a report dict with counts, reclaimed bytes and the affected paths.
+        """
+        if mode not in GC_MODES:
+            raise ValueError(f"mode must be one of: {', '.join(GC_MODES)}")
+
+        referenced = Vacation.get_referenced_pictures()
+        cutoff = time.time() - grace_seconds
+        batch_dir = os.path.join(QUARANTINE_DIR, datetime.now().strftime(QUARANTINE_BATCH_FORMAT))
+        report = dict(mode=mode, grace_seconds=grace_seconds, scanned=0, referenced=len(referenced),
+                      collected=0, reclaimed_bytes=0, skipped_recent=0, files=[],
+                      pruned_batches=0, pruned_bytes=0)
+        if mode != 'dry-run':
+            report['pruned_batches'], report['pruned_bytes'] = ImageGC._prune_quarantine(cutoff)
+
+        for directory, name, stat in ImageGC._candidates(include_legacy):
+            report['scanned'] += 1
+            owner = ImageGC._owner(directory, name)
+            if owner in referenced:
+                continue
+            if stat.st_mtime > cutoff:
+                report['skipped_recent'] += 1
+                continue
+            # Re-check: a vacation may have started using it since the snapshot
+            if owner is not None and Vacation.count_picture_references(owner):
+                continue
+
+            path = os.path.join(directory, name)
+            # Re-check: identical content may have been re-uploaded since the scan
+            if ImageGC._touched_since(path, owner, cutoff):
+                report['skipped_recent'] += 1
+                continue
+            try:
+                if mode == 'delete':
+                    os.remove(path)
+                elif mode == 'quarantine':
+                    ImageGC._quarantine(path, batch_dir)
+            except FileNotFoundError:
+                continue  # removed concurrently (e.g. by a release job)
+            report['collected'] += 1
+            report['reclaimed_bytes'] += stat.st_size
+            report['files'].append(os.path.relpath(path, IMAGES_DIR))
+
+        return report
@@ -0,0 +1,104 @@
+from models.job import Job
+from models.vacation import Vacation
+from services.image_gc import ImageGC
+from services.image_processing import ImageProcessor, ImageProcessingError
+from services.image_store import ImageStore
+from services.job_queue import JobQueue, PermanentJobError
+from constants import IMAGE_RELEASE_GRACE_SECONDS, IMAGE_GC_GRACE_SECONDS, IMAGE_GC_INTERVAL, IMAGE_GC_MODE
+
+PROCESS_PICTURE = 'process_picture'
+RELEASE_PICTURE = 'release_picture'
+GC_IMAGES = 'gc_images'
+
+
+def queue_picture_processing(filename, width, height):
+    """
+    Mark a freshly uploaded picture (already checked with ImageProcessor.identify)
+    as pending, so /images serves a placeholder, and queue its variant
+    generation. Returns the job id, or None when identical content was uploaded
+    before and its variants already exist or are being generated.
+    """
+    existing = Vacation.get_picture_variants(filename)
+    if existing is not None and ImageStore.is_content_addressed(filename):
+        Vacation.set_picture_variants(filename, existing)
+        return None
+    Vacation.set_picture_variants(filename, ImageProcessor.pending_metadata(width, height))
+    return JobQueue.enqueue(PROCESS_PICTURE, {'filename': filename})
+
+
+def queue_picture_release(filename):
+    """
+    A vacation stopped using a stored picture: delete it once the grace period
+    has passed, if nothing references it by then. Pictures outside the
+    content-addressed store are left alone. Returns the job id or None.
+    """
+    if not ImageStore.is_content_addressed(filename):
+        return None
+    return JobQueue.enqueue(RELEASE_PICTURE, {'filename': filename}, delay=IMAGE_RELEASE_GRACE_SECONDS)
+
+
+def schedule_image_gc(delay=0, exclude_job_id=None):
+    """
+    Queue a background image GC run unless one (other than exclude_job_id,
+    the run that is scheduling its successor) is already queued. Returns the
+    job id or None.
+    """
+    if Job.has_active(GC_IMAGES, exclude_job_id):
+        return None
+    return JobQueue.enqueue(GC_IMAGES, {}, delay)
+
+
+@JobQueue.handler(PROCESS_PICTURE)
+def process_picture(payload):
+    """Decode and resize an uploaded picture, then publish its variant metadata."""
+    filename = payload['filename']
+    # Variants of a previous upload under the same name are no longer referenced
+    ImageProcessor.remove_variants(filename)
+    try:
+        picture_variants = ImageProcessor.generate_variants(filename)
+    except ImageProcessingError as e:
+        # Serve the original as uploaded instead of a placeholder forever
+        Vacation.set_picture_variants(filename, None)
+        raise PermanentJobError(str(e))
+    Vacation.set_picture_variants(filename, picture_variants)
+    return {'widths': picture_variants['widths'], 'formats': picture_variants['formats']}
+
+
+@JobQueue.handler(RELEASE_PICTURE)
+def release_picture(payload):
+    """Delete a stored picture and its variants if its reference count is zero."""
+    filename = payload['filename']
+    references = Vacation.count_picture_references(filename)
+    if references:
+        return {'deleted': False, 'references': references}
+
+    age = ImageStore.age(filename)
+    if age is not None and age < IMAGE_RELEASE_GRACE_SECONDS:
+        # Uploaded again meanwhile; that upload may not have saved its vacation yet
+        JobQueue.enqueue(RELEASE_PICTURE, payload, delay=IMAGE_RELEASE_GRACE_SECONDS - age)
+        return {'deleted': False, 'rescheduled': True}
+    # delete() checks the age again right before removing: an identical upload may land meanwhile
+    bytes_freed = ImageStore.delete(filename, min_age=IMAGE_RELEASE_GRACE_SECONDS)
+    if bytes_freed is None:
+        JobQueue.enqueue(RELEASE_PICTURE, payload, delay=IMAGE_RELEASE_GRACE_SECONDS)
+        return {'deleted': False, 'rescheduled': True}
+    return {'deleted': True, 'bytes_freed': bytes_freed}
+
+
+@JobQueue.handler(GC_IMAGES)
+def gc_images(payload):
+    """
+    Periodic sweep for orphaned image files; re-queues itself every
+    IMAGE_GC_INTERVAL seconds. A failed run only schedules the next interval
+    once it will not be retried, so failures never fork a second chain.
+    """
+    try:
+        report = ImageGC.collect(IMAGE_GC_GRACE_SECONDS, IMAGE_GC_MODE)
+    except Exception:
+        if IMAGE_GC_INTERVAL > 0 and JobQueue.is_last_attempt():
+            schedule_image_gc(IMAGE_GC_INTERVAL, JobQueue.current_job_id())
+        raise
+    if IMAGE_GC_INTERVAL > 0:
+        schedule_image_gc(IMAGE_GC_INTERVAL, JobQueue.current_job_id())
+    report['files'] = report['files'][:100]  # keep the stored job result small
+    return report
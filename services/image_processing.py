@@ -0,0 +1,149 @@
+import functools
+import io
+import os
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+from services.image_store import ImageStore
+from constants import IMAGE_VARIANT_WIDTHS, IMAGE_JPEG_QUALITY, IMAGE_WEBP_QUALITY, IMAGE_MAX_PIXELS
+
+Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+
+EXTENSIONS = {'jpeg': 'jpg', 'png': 'png', 'webp': 'webp'}
+# Decoded (Pillow) format of an upload -> extension it is stored under
+UPLOAD_FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+PLACEHOLDER_COLOR = (229, 231, 235)
+
+
+class ImageProcessingError(Exception):
+    """Raised when an uploaded file is not an image Pillow can decode."""
+
+
+class ImageProcessor:
+    """
+    Builds the resized / re-encoded copies of a vacation picture.
+
+    For every configured width smaller than the original, a copy is written in
+    the fallback format (JPEG, or PNG when the picture has transparency) and as
+    WebP; a full-width WebP is written too. The original file is left untouched
+    and doubles as the full-width fallback. Variants are named
+    '<filename>.<width>.<ext>' in ImageStore.variants_directory(), and the
+    returned metadata is what gets stored in vacations.picture_variants.
+    """
+
+    @staticmethod
+    def variant_file_name(filename, width, image_format):
+        return f'{filename}.{width}.{EXTENSIONS[image_format]}'
+
+    @staticmethod
+    def _save(image, path, image_format):
+        # Write next to the target and rename, so readers never see a partial file
+        temp_path = f'{path}.tmp'
+        if image_format == 'jpeg':
+            image.convert('RGB').save(temp_path, 'JPEG', quality=IMAGE_JPEG_QUALITY,
+                                      optimize=True, progressive=True)
+        elif image_format == 'png':
+            image.save(temp_path, 'PNG', optimize=True)
+        else:
+            image.save(temp_path, 'WEBP', quality=IMAGE_WEBP_QUALITY, method=4)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def identify(path):
+        """
+        Cheap upload check: reads only the image header (no pixel decoding).
+        Returns (extension, width, height), the extension following the decoded
+        format (None for formats uploads may not use); raises
+        ImageProcessingError for non-images.
+        """
+        try:
+            with Image.open(path) as image:
+                width, height = image.size
+                # Orientations 5-8 are rotated by 90 degrees, as generate_variants will apply
+                if image.getexif().get(ExifTags.Base.Orientation) in (5, 6, 7, 8):
+                    width, height = height, width
+                return UPLOAD_FORMAT_EXTENSIONS.get(image.format), width, height
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            raise ImageProcessingError(f'Could not read image {os.path.basename(path)}: {e}')
+
+    @staticmethod
+    def pending_metadata(width, height):
+        """picture_variants value while variants are being generated in the background."""
+        return {'status': 'pending', 'width': width, 'height': height}
+
+    @staticmethod
+    def remove_variants(filename):
+        """Delete every variant (and leftover temp file) of a picture."""
+        for path in ImageStore.variant_paths(filename):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def placeholder(width, height, image_format):
+        """A flat, tiny-to-encode stand-in image of the given size, built in memory."""
+        buffer = io.BytesIO()
+        image = Image.new('RGB', (width, height), PLACEHOLDER_COLOR)
+        if image_format == 'webp':
+            image.save(buffer, 'WEBP', quality=IMAGE_WEBP_QUALITY)
+        else:
+            image.save(buffer, 'PNG', optimize=True)
+        return buffer.getvalue()
+
+    @staticmethod
+    def generate_variants(filename):
+        """
+        Generate every variant of a stored picture.
+        Returns the metadata dict; raises ImageProcessingError for non-images.
+        """
+        try:
+            with Image.open(ImageStore.path(filename)) as source:
+                # Apply the EXIF orientation so variants are upright (EXIF is not copied)
+                image = ImageOps.exif_transpose(source)
+                image.load()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            raise ImageProcessingError(f'Could not read image {filename}: {e}')
+
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        fallback_format = 'png' if has_alpha else 'jpeg'
+
+        width, height = image.size
+        widths = sorted({w for w in IMAGE_VARIANT_WIDTHS if 0 < w < width}) + [width]
+
+        variants_dir = ImageStore.variants_directory(filename)
+        os.makedirs(variants_dir, exist_ok=True)
+        for variant_width in widths:
+            if variant_width == width:
+                resized = image
+            else:
+                size = (variant_width, max(1, round(height * variant_width / width)))
+                resized = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+                ImageProcessor._save(resized, os.path.join(
+                    variants_dir, ImageProcessor.variant_file_name(filename, variant_width, fallback_format)),
+                    fallback_format)
+            ImageProcessor._save(resized, os.path.join(
+                variants_dir, ImageProcessor.variant_file_name(filename, variant_width, 'webp')), 'webp')
+
+        return {'width': width, 'height': height, 'widths': widths, 'formats': [fallback_format, 'webp']}
+
+    @staticmethod
+    def select_variant(filename, metadata, requested_width=None, accepts_webp=False):
+        """
+        Pick the file to serve for a request: the smallest variant at least
+        requested_width wide (the largest one if none is), as WebP when the
+        client accepts it. Returns (directory, file name).
+        """
+        if not metadata:
+            return ImageStore.directory(filename), filename
+
+        widths = metadata['widths']
+        width = widths[-1]
+        if requested_width:
+            width = next((w for w in widths if w >= requested_width), widths[-1])
+
+        image_format = 'webp' if accepts_webp and 'webp' in metadata['formats'] else metadata['formats'][0]
+        if image_format != 'webp' and width == metadata['width']:
+            return ImageStore.directory(filename), filename
+        return ImageStore.variants_directory(filename), ImageProcessor.variant_file_name(filename, width, image_format)
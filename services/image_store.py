@@ -0,0 +1,140 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+from constants import IMAGE_UPLOAD_EXTENSIONS
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'images')
+VARIANTS_DIR = os.path.join(IMAGES_DIR, 'variants')
+STORE_DIR = os.path.join(IMAGES_DIR, 'store')
+
+CONTENT_ADDRESSED_NAME = re.compile(r'^([0-9a-f]{64})\.([a-z0-9]+)$')
+CHUNK_SIZE = 64 * 1024
+
+
+class UnsupportedImageTypeError(Exception):
+    """Raised when an upload decodes to a format outside IMAGE_UPLOAD_EXTENSIONS."""
+
+
+class ImageStore:
+    """
+    Content-addressed storage for uploaded pictures.
+
+    An upload is stored once as '<sha256>.<ext>' under images/store/ab/cd/
+    (the first two bytes of the hash, so no directory grows huge; the
+    extension follows the decoded format, not the client's file name), and
+    that name is what vacations.picture_file_name holds. Identical uploads
+    therefore share one file, two different files can never overwrite each
+    other, and a name's bytes never change, so they can be cached forever.
+    Variants are stored next to their original.
+
+    A file's reference count is the number of vacations whose
+    picture_file_name points at it. Pictures from before the store (plain
+    names directly in images/) keep working unchanged.
+    """
+
+    @staticmethod
+    def is_content_addressed(filename):
+        return CONTENT_ADDRESSED_NAME.match(filename) is not None
+
+    @staticmethod
+    def directory(filename):
+        """Directory holding the original file."""
+        match = CONTENT_ADDRESSED_NAME.match(filename)
+        if match is None:
+            return IMAGES_DIR
+        digest = match.group(1)
+        return os.path.join(STORE_DIR, digest[:2], digest[2:4])
+
+    @staticmethod
+    def path(filename):
+        return os.path.join(ImageStore.directory(filename), filename)
+
+    @staticmethod
+    def variants_directory(filename):
+        return ImageStore.directory(filename) if ImageStore.is_content_addressed(filename) else VARIANTS_DIR
+
+    @staticmethod
+    def save(file_storage, identify):
+        """
+        Stream an uploaded file into the store, hashing it as it is written.
+        identify(path) reads the written file's header and returns (extension,
+        width, height) (ImageProcessor.identify); its errors propagate and
+        nothing is stored. The same bytes therefore always get the same name,
+        whatever the client called the file. Raises UnsupportedImageTypeError
+        for formats outside IMAGE_UPLOAD_EXTENSIONS.
+        Returns (filename, width, height).
+        """
+        os.makedirs(STORE_DIR, exist_ok=True)
+        digest = hashlib.sha256()
+        # Temp file inside the store, so the final rename never crosses file systems
+        fd, temp_path = tempfile.mkstemp(dir=STORE_DIR, suffix='.upload')
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                while True:
+                    chunk = file_storage.stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+
+            extension, width, height = identify(temp_path)
+            if extension not in IMAGE_UPLOAD_EXTENSIONS:
+                raise UnsupportedImageTypeError(
+                    f"Unsupported image type. Allowed: {', '.join(IMAGE_UPLOAD_EXTENSIONS)}.")
+            filename = f'{digest.hexdigest()}.{extension}'
+            path = ImageStore.path(filename)
+            try:
+                # Already stored: keep the existing file, but refresh its mtime so a
+                # pending release or GC sees it as freshly uploaded
+                os.utime(path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(temp_path, 0o644)
+                os.replace(temp_path, path)
+                temp_path = None
+            return filename, width, height
+        finally:
+            if temp_path is not None:
+                os.remove(temp_path)
+
+    @staticmethod
+    def variant_paths(filename):
+        """Paths of every stored variant (and leftover temp file) of a picture."""
+        variants_directory = ImageStore.variants_directory(filename)
+        if not os.path.isdir(variants_directory):
+            return []
+        prefix = filename + '.'
+        return [os.path.join(variants_directory, name)
+                for name in os.listdir(variants_directory) if name.startswith(prefix)]
+
+    @staticmethod
+    def age(filename):
+        """Seconds since the file was stored (or last re-uploaded), None if it does not exist."""
+        try:
+            return time.time() - os.stat(ImageStore.path(filename)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def delete(filename, min_age=None):
+        """
+        Remove a stored original and all of its variants. Returns the bytes
+        freed, or None (nothing removed) when min_age is given and the original
+        was stored or re-uploaded less than min_age seconds ago: the caller's
+        earlier checks may predate an identical upload whose vacation is not
+        saved yet.
+        """
+        if min_age is not None:
+            age = ImageStore.age(filename)
+            if age is not None and age < min_age:
+                return None
+        freed = 0
+        for path in [ImageStore.path(filename)] + ImageStore.variant_paths(filename):
+            try:
+                freed += os.stat(path).st_size
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return freed
@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+import traceback
+from contextvars import ContextVar
+from models.job import Job
+from services.logging_config import request_id_var
+from constants import JOB_QUEUE_MODE, JOB_WORKERS, JOB_POLL_INTERVAL, JOB_MAX_ATTEMPTS
+
+logger = logging.getLogger(__name__)
+
+# (job_id, attempt) of the job the current thread is running
+_current_job = ContextVar('current_job', default=None)
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help (e.g. the input is invalid)."""
+
+
+class JobQueue:
+    """
+    Local background job queue backed by the jobs table.
+
+    Handlers are registered per job type with @JobQueue.handler('type') and get
+    the job's JSON payload; their return value is stored as the job's result.
+    With JOB_QUEUE_MODE=thread every web worker process runs JOB_WORKERS daemon
+    threads that claim jobs from the table (woken immediately for jobs queued
+    by this process, otherwise every JOB_POLL_INTERVAL seconds). With
+    JOB_QUEUE_MODE=external web workers only enqueue and
+    `python manage.py worker` runs the jobs.
+    """
+
+    _handlers = {}
+    _lock = threading.Lock()
+    _wakeup = threading.Event()
+    _pid = None
+
+    @staticmethod
+    def handler(job_type):
+        def register(function):
+            JobQueue._handlers[job_type] = function
+            return function
+        return register
+
+    @staticmethod
+    def enqueue(job_type, payload, delay=0):
+        """
+        Persist a job and wake this process's workers, if it runs any. Returns
+        the job id. Workers are never started here: one-shot commands
+        (manage.py) only queue jobs, for the web workers or `manage.py worker`.
+        """
+        job_id = Job.enqueue(job_type, payload, delay)
+        if not delay:
+            JobQueue._wakeup.set()
+        return job_id
+
+    @staticmethod
+    def ensure_started():
+        """Start this process's worker threads (thread mode only). Cheap to call per request."""
+        if JOB_QUEUE_MODE != 'thread' or JobQueue._pid == os.getpid():
+            return
+        with JobQueue._lock:
+            # Threads do not survive a fork, so a preloaded master's workers start their own
+            if JobQueue._pid == os.getpid():
+                return
+            for index in range(JOB_WORKERS):
+                threading.Thread(target=JobQueue.run_forever, name=f'job-worker-{index}', daemon=True).start()
+            JobQueue._pid = os.getpid()
+
+    @staticmethod
+    def run_once():
+        """Claim and run one job. Returns False when nothing was runnable."""
+        job = Job.claim_next()
+        if job is None:
+            return False
+        job_id, job_type, payload, claim_token, attempt = job
+
+        handler = JobQueue._handlers.get(job_type)
+        if handler is None:
+            logger.error('No handler registered for job type %r', job_type, extra={'job_id': job_id})
+            Job.fail(job_id, claim_token, f'No handler registered for job type {job_type!r}', retry=False)
+            return True
+        # Logs written while the job runs carry its id, as a request's carry the request id
+        token = request_id_var.set(f'job-{job_id}')
+        job_token = _current_job.set((job_id, attempt))
+        try:
+            result = handler(payload)
+        except PermanentJobError as e:
+            logger.warning('Job %s (%s) failed permanently: %s', job_id, job_type, e)
+            Job.fail(job_id, claim_token, str(e), retry=False)
+        except Exception:
+            logger.exception('Job %s (%s) failed', job_id, job_type)
+            Job.fail(job_id, claim_token, traceback.format_exc(limit=5))
+        else:
+            Job.complete(job_id, claim_token, result)
+        finally:
+            _current_job.reset(job_token)
+            request_id_var.reset(token)
+        return True
+
+    @staticmethod
+    def current_job_id():
+        """Id of the job being run on this thread (None outside a handler)."""
+        job = _current_job.get()
+        return job[0] if job else None
+
+    @staticmethod
+    def is_last_attempt():
+        """True when a failure of the running job will not be retried."""
+        job = _current_job.get()
+        return job is not None and job[1] >= JOB_MAX_ATTEMPTS
+
+    @staticmethod
+    def run_forever():
+        while True:
+            try:
+                if JobQueue.run_once():
+                    continue
+            except Exception:
+                logger.exception('Background job worker error')  # e.g. database busy; keep the worker alive
+            JobQueue._wakeup.wait(JOB_POLL_INTERVAL)
+            JobQueue._wakeup.clear()
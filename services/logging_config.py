@@ -0,0 +1,172 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from constants import LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATES
+
+# Id of the request (or background job) the current thread is working on
+request_id_var = ContextVar('request_id', default=None)
+
+_INCOMING_REQUEST_ID = re.compile(r'[A-Za-z0-9._:-]{1,64}')
+
+# LogRecord attributes that are not `extra=` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps every record with the current request id, however deep in the models it was logged."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get() or '-'
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of high-volume records: those logged with
+    extra={'event': name} where LOG_SAMPLE_RATES gives that event a rate
+    below 1. Warnings and errors are always kept.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(getattr(record, 'event', None), 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request id, pid and any extra fields."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'pid': record.process,
+        }
+        if getattr(record, 'request_id', '-') != '-':
+            entry['request_id'] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _ProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler whose listener thread is started lazily in each process, so
+    workers forked from a preloading master get their own writer thread.
+    """
+
+    def __init__(self, handler):
+        super().__init__(queue.SimpleQueue())
+        self.handler = handler
+        self._lock = threading.Lock()
+        self._pid = None
+        self._listener = None
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # A queue inherited over fork may hold the parent's records
+            self.queue = queue.SimpleQueue()
+            self._listener = logging.handlers.QueueListener(self.queue, self.handler, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+            atexit.register(self.stop)
+
+    def stop(self):
+        """Write out what is still queued (at exit)."""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+    def prepare(self, record):
+        # Render the message and traceback here, while the arguments and the
+        # exception are still those of the call; formatting and writing happen
+        # on the listener thread
+        record = logging.makeLogRecord(vars(record))
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+
+class StructuredLogging:
+    """
+    Process-wide logging setup: records from every logger go through a queue
+    to a single writer thread, so request threads never block on stderr.
+    Output is JSON lines (LOG_FORMAT=json) or readable text (LOG_FORMAT=text).
+    """
+
+    _configured = False
+
+    @staticmethod
+    def parse_sample_rates(value):
+        rates = {}
+        for item in filter(None, (part.strip() for part in value.split(','))):
+            event, _, rate = item.partition('=')
+            rates[event.strip()] = float(rate)
+        return rates
+
+    @staticmethod
+    def configure():
+        if StructuredLogging._configured:
+            return
+        StructuredLogging._configured = True
+
+        output = logging.StreamHandler(sys.stderr)
+        if LOG_FORMAT == 'json':
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter(
+                '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'))
+
+        handler = _ProcessQueueHandler(output)
+        handler.addFilter(SamplingFilter(StructuredLogging.parse_sample_rates(LOG_SAMPLE_RATES)))
+        handler.addFilter(RequestIdFilter())
+
+        root = logging.getLogger()
+        root.handlers = [handler]
+        root.setLevel(LOG_LEVEL)
+
+    @staticmethod
+    def begin_request(incoming=None):
+        """Use the caller's X-Request-ID when it looks sane, otherwise a new one. Returns the id."""
+        if not incoming or not _INCOMING_REQUEST_ID.fullmatch(incoming):
+            incoming = uuid.uuid4().hex
+        request_id_var.set(incoming)
+        return incoming
+
+    @staticmethod
+    def end_request():
+        request_id_var.set(None)
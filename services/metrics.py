@@ -0,0 +1,186 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from constants import METRICS_DIR, METRICS_FLUSH_INTERVAL, METRICS_BUCKETS
+
+UNMATCHED = '<unmatched>'  # requests that matched no route share one label set (no unbounded 404 paths)
+
+
+class RequestMetrics:
+    """
+    Per-route request metrics: a request counter by status, a latency
+    histogram and an in-flight gauge, labelled by blueprint, endpoint and method.
+
+    Every process counts in memory; nothing is shared or locked across
+    processes on the request path. With METRICS_DIR set (gunicorn.conf.py
+    sets it for each gunicorn master), a background thread writes this
+    process's totals to METRICS_DIR/<pid>.json every METRICS_FLUSH_INTERVAL
+    seconds and render() sums the files of every worker, so any worker can
+    answer a scrape. Counters of workers that have exited are kept (they
+    would otherwise go backwards); their in-flight gauges are dropped.
+    """
+
+    _lock = threading.Lock()
+    _requests = {}     # (blueprint, endpoint, method, status) -> count
+    _durations = {}    # (blueprint, endpoint, method) -> [bucket counts..., sum, count]
+    _in_progress = {}  # (blueprint, endpoint, method) -> requests being handled
+    _dirty = False
+    _pid = None
+
+    @staticmethod
+    def labels(request):
+        if request.url_rule is None:
+            return ('', UNMATCHED, request.method)
+        return (request.blueprint or '', request.endpoint, request.method)
+
+    @staticmethod
+    def begin(labels):
+        RequestMetrics._ensure_flusher()
+        with RequestMetrics._lock:
+            RequestMetrics._in_progress[labels] = RequestMetrics._in_progress.get(labels, 0) + 1
+            RequestMetrics._dirty = True
+
+    @staticmethod
+    def end(labels, status, seconds):
+        """Record a finished request started with begin(labels). status None: aborted by an exception."""
+        with RequestMetrics._lock:
+            RequestMetrics._in_progress[labels] -= 1
+            if status is not None:
+                key = labels + (str(status),)
+                RequestMetrics._requests[key] = RequestMetrics._requests.get(key, 0) + 1
+                histogram = RequestMetrics._durations.get(labels)
+                if histogram is None:
+                    histogram = RequestMetrics._durations[labels] = [0] * (len(METRICS_BUCKETS) + 2)
+                for index, bound in enumerate(METRICS_BUCKETS):
+                    if seconds <= bound:
+                        histogram[index] += 1
+                        break
+                histogram[-2] += seconds
+                histogram[-1] += 1
+            RequestMetrics._dirty = True
+
+    @staticmethod
+    def _snapshot():
+        with RequestMetrics._lock:
+            return {
+                'requests': [list(key) + [value] for key, value in RequestMetrics._requests.items()],
+                'durations': [list(key) + [list(value)] for key, value in RequestMetrics._durations.items()],
+                'in_progress': [list(key) + [value] for key, value in RequestMetrics._in_progress.items()],
+            }
+
+    @staticmethod
+    def _ensure_flusher():
+        """Start this process's flush thread (per pid, so forked workers get their own)."""
+        if not METRICS_DIR or RequestMetrics._pid == os.getpid():
+            return
+        with RequestMetrics._lock:
+            if RequestMetrics._pid == os.getpid():
+                return
+            # Counts inherited from a preloading master belong to the master, not this worker
+            RequestMetrics._requests.clear()
+            RequestMetrics._durations.clear()
+            RequestMetrics._in_progress.clear()
+            RequestMetrics._pid = os.getpid()
+        threading.Thread(target=RequestMetrics._flush_forever, name='metrics-flush', daemon=True).start()
+        atexit.register(RequestMetrics.flush)
+
+    @staticmethod
+    def _flush_forever():
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                RequestMetrics.flush()
+            except OSError:
+                pass  # e.g. the directory was removed on shutdown; try again next time
+
+    @staticmethod
+    def flush():
+        """Write this process's totals to METRICS_DIR/<pid>.json if anything changed."""
+        if not METRICS_DIR or not RequestMetrics._dirty:
+            return
+        RequestMetrics._dirty = False
+        snapshot = RequestMetrics._snapshot()
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=METRICS_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, os.path.join(METRICS_DIR, f'{os.getpid()}.json'))
+
+    @staticmethod
+    def _is_alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    @staticmethod
+    def _collect():
+        """This process's live totals plus every other worker's last flushed totals."""
+        snapshots = [RequestMetrics._snapshot()]
+        if METRICS_DIR and os.path.isdir(METRICS_DIR):
+            for name in os.listdir(METRICS_DIR):
+                pid, extension = os.path.splitext(name)
+                if extension != '.json' or not pid.isdigit() or int(pid) == os.getpid():
+                    continue
+                try:
+                    with open(os.path.join(METRICS_DIR, name)) as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError):
+                    continue  # removed meanwhile
+                if not RequestMetrics._is_alive(int(pid)):
+                    snapshot['in_progress'] = []
+                snapshots.append(snapshot)
+
+        requests, durations, in_progress = {}, {}, {}
+        for snapshot in snapshots:
+            for *key, value in snapshot['requests']:
+                requests[tuple(key)] = requests.get(tuple(key), 0) + value
+            for *key, value in snapshot['durations']:
+                merged = durations.setdefault(tuple(key), [0] * len(value))
+                for index, count in enumerate(value):
+                    merged[index] += count
+            for *key, value in snapshot['in_progress']:
+                in_progress[tuple(key)] = in_progress.get(tuple(key), 0) + value
+        return requests, durations, in_progress
+
+    @staticmethod
+    def _format_labels(blueprint, endpoint, method, **extra):
+        labels = dict(blueprint=blueprint, endpoint=endpoint, method=method, **extra)
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+                   for value in labels.values())
+        return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+    @staticmethod
+    def render():
+        """All workers' metrics in the Prometheus text exposition format (version 0.0.4)."""
+        requests, durations, in_progress = RequestMetrics._collect()
+        lines = ['# HELP http_requests_total HTTP requests handled, by route and status.',
+                 '# TYPE http_requests_total counter']
+        for (blueprint, endpoint, method, status), value in sorted(requests.items()):
+            lines.append(f'http_requests_total{RequestMetrics._format_labels(blueprint, endpoint, method, status=status)} {value}')
+
+        lines += ['# HELP http_request_duration_seconds Time to produce the response (streamed bodies excluded).',
+                  '# TYPE http_request_duration_seconds histogram']
+        for (blueprint, endpoint, method), histogram in sorted(durations.items()):
+            cumulative = 0
+            for bound, count in zip(METRICS_BUCKETS, histogram):
+                cumulative += count
+                labels = RequestMetrics._format_labels(blueprint, endpoint, method, le=f'{bound:g}')
+                lines.append(f'http_request_duration_seconds_bucket{labels} {cumulative}')
+            labels = RequestMetrics._format_labels(blueprint, endpoint, method)
+            inf_labels = RequestMetrics._format_labels(blueprint, endpoint, method, le='+Inf')
+            lines.append(f'http_request_duration_seconds_bucket{inf_labels} {histogram[-1]}')
+            lines.append(f'http_request_duration_seconds_sum{labels} {histogram[-2]:.6f}')
+            lines.append(f'http_request_duration_seconds_count{labels} {histogram[-1]}')
+
+        lines += ['# HELP http_requests_in_progress HTTP requests currently being handled.',
+                  '# TYPE http_requests_in_progress gauge']
+        for (blueprint, endpoint, method), value in sorted(in_progress.items()):
+            lines.append(f'http_requests_in_progress{RequestMetrics._format_labels(blueprint, endpoint, method)} {value}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,174 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+from constants import (PASSWORD_HASH_METHOD, PASSWORD_HASH_POOL, PASSWORD_HASH_WORKERS,
+                       PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_TIMEOUT)
+
+logger = logging.getLogger(__name__)
+
+
+class HashingBusyError(Exception):
+    """Raised when the hashing pool is saturated or did not answer in time."""
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """
+    Runs the deliberately slow password hash/verify calls off the request thread.
+
+    PASSWORD_HASH_POOL selects where they run:
+      process - a ProcessPoolExecutor, so a login burst uses every core instead
+                of holding the GIL-bound gunicorn worker (default)
+      thread  - a ThreadPoolExecutor (hashlib releases the GIL for scrypt/pbkdf2)
+      inline  - directly on the request thread
+    At most PASSWORD_HASH_MAX_PENDING operations may be queued or running per
+    worker (including ones whose caller already timed out); beyond that callers
+    wait up to PASSWORD_HASH_TIMEOUT seconds and then get HashingBusyError, so a
+    burst cannot pile up unbounded work. A process pool that broke because one
+    of its processes died is replaced.
+    """
+
+    _lock = threading.Lock()
+    _executor = None
+    _pid = None
+    _slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+    _method_prefix = None
+
+    @staticmethod
+    def _get_executor():
+        if PASSWORD_HASH_POOL == 'inline':
+            return None
+        with PasswordHasher._lock:
+            # Executors are per process: never reuse one inherited across a fork
+            if PasswordHasher._executor is None or PasswordHasher._pid != os.getpid():
+                if PASSWORD_HASH_POOL == 'thread':
+                    PasswordHasher._executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                                                                  thread_name_prefix='password-hash')
+                else:
+                    # forkserver children start from a clean process, not a copy of a threaded worker
+                    context = multiprocessing.get_context('forkserver')
+                    PasswordHasher._executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                                                                   mp_context=context)
+                PasswordHasher._pid = os.getpid()
+            return PasswordHasher._executor
+
+    @staticmethod
+    def _discard_executor(executor):
+        with PasswordHasher._lock:
+            if PasswordHasher._executor is executor:
+                PasswordHasher._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _release_slot(future):
+        PasswordHasher._slots.release()
+
+    @staticmethod
+    def _call(executor, function, args):
+        if not PasswordHasher._slots.acquire(timeout=PASSWORD_HASH_TIMEOUT):
+            raise HashingBusyError('Password hashing queue is full')
+        try:
+            future = executor.submit(function, *args)
+        except BaseException:
+            PasswordHasher._slots.release()
+            raise
+        # The slot is freed when the work ends, not when the caller stops waiting for it
+        future.add_done_callback(PasswordHasher._release_slot)
+        try:
+            return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+        except FutureTimeoutError:
+            raise HashingBusyError('Password hashing timed out')
+
+    @staticmethod
+    def _run(function, *args):
+        for attempt in range(2):
+            executor = PasswordHasher._get_executor()
+            if executor is None:
+                return function(*args)
+            try:
+                return PasswordHasher._call(executor, function, args)
+            except BrokenProcessPool:
+                # A pool process died (e.g. OOM-killed) and the pool refuses all work from
+                # now on; hashing is pure, so retry once on a fresh pool
+                PasswordHasher._discard_executor(executor)
+                if attempt:
+                    raise
+
+    @staticmethod
+    def hash(password):
+        """Hash a password with the configured PASSWORD_HASH_METHOD."""
+        return PasswordHasher._run(_hash, password, PASSWORD_HASH_METHOD)
+
+    @staticmethod
+    def verify(password_hash, password):
+        return PasswordHasher._run(_verify, password_hash, password)
+
+    @staticmethod
+    def hash_in_background(password, callback):
+        """
+        Hash a password with the configured method without waiting for it;
+        callback(password_hash) runs on a pool thread once it is ready. Returns
+        False (nothing queued) when the pool is saturated, so optional work
+        such as a rehash on login never delays or fails the request.
+        """
+        executor = PasswordHasher._get_executor()
+        if executor is None:
+            callback(_hash(password, PASSWORD_HASH_METHOD))
+            return True
+        if not PasswordHasher._slots.acquire(blocking=False):
+            return False
+        try:
+            future = executor.submit(_hash, password, PASSWORD_HASH_METHOD)
+        except BrokenProcessPool:
+            PasswordHasher._slots.release()
+            PasswordHasher._discard_executor(executor)
+            return False
+        except BaseException:
+            PasswordHasher._slots.release()
+            raise
+        future.add_done_callback(PasswordHasher._release_slot)
+        future.add_done_callback(lambda done: PasswordHasher._finish_background(done, callback))
+        return True
+
+    @staticmethod
+    def _finish_background(future, callback):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.warning('Background password hash failed: %r', future.exception())
+            return
+        try:
+            callback(future.result())
+        except Exception:
+            logger.exception('Background password hash callback failed')
+
+    @staticmethod
+    def needs_rehash(password_hash):
+        """
+        True when a stored hash was made with different parameters than the
+        configured method (e.g. after raising the cost), so it should be
+        replaced the next time the user logs in with the correct password.
+        """
+        if PasswordHasher._method_prefix is None:
+            # Werkzeug fills in default parameters, so read them off a real hash once (in the pool)
+            sample = PasswordHasher._run(_hash, '', PASSWORD_HASH_METHOD)
+            PasswordHasher._method_prefix = sample.split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != PasswordHasher._method_prefix
+
+    @staticmethod
+    def shutdown():
+        with PasswordHasher._lock:
+            if PasswordHasher._executor is not None and PasswordHasher._pid == os.getpid():
+                PasswordHasher._executor.shutdown(wait=False, cancel_futures=True)
+            PasswordHasher._executor = None
@@ -0,0 +1,428 @@
+import atexit
+import cProfile
+import json
+import marshal
+import os
+import pstats
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from constants import METRICS_DIR, PROFILER_SAMPLE_INTERVAL, PROFILER_POLL_INTERVAL
+
+PROFILER_MODES = ('sample', 'cprofile')
+PROFILER_FORMATS = {'sample': 'collapsed', 'cprofile': 'pstats'}
+TOP_FUNCTIONS = 10
+
+
+class _LoadedStats:
+    """What pstats.Stats() needs to load an already collected stats dict."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _frame_name(code):
+    return f'{os.path.basename(code.co_filename)}:{code.co_qualname}'
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class RequestProfiler:
+    """
+    On-demand profiling of live requests, without restarting the workers.
+
+    start() writes a session to a directory shared by every worker (under
+    METRICS_DIR, which gunicorn.conf.py sets per server). Each worker notices it
+    within PROFILER_POLL_INTERVAL seconds and profiles requests until the
+    session's time window ends or its request budget is used up; workers claim
+    requests from the budget with exclusive-create files, so "the next N
+    requests" holds across processes. Results are aggregated per route
+    (method and endpoint) in memory; a background thread writes them to
+    <session>/<pid>.profile every PROFILER_POLL_INTERVAL seconds, so profiled
+    requests never wait on that file. results() merges the files of all
+    workers.
+
+    Modes:
+        sample    a thread samples the stacks of the requests being profiled
+                  every PROFILER_SAMPLE_INTERVAL seconds; cheap enough for
+                  production, downloads as collapsed stacks (flamegraph.pl,
+                  speedscope, inferno)
+        cprofile  deterministic cProfile of each request; exact call counts but
+                  slows the profiled requests down, downloads as a pstats file
+    """
+
+    _lock = threading.Lock()
+    _directory = None
+    _pid = None
+    _session = None           # the session this process knows about
+    _session_checked_at = 0.0
+    _session_mtime = None
+    _next_claim = 0
+    _active = {}              # thread ident -> (route, cProfile.Profile or None, started)
+    _routes = {}              # route -> {'requests', 'seconds', 'samples', 'stacks', 'stats'}
+    _sampler = None
+    _flusher = None
+    _dirty = False            # _routes changed since the last _flush()
+
+    # --- Session management (called by the admin endpoints) ---
+
+    @staticmethod
+    def directory():
+        if RequestProfiler._directory is None:
+            if METRICS_DIR:
+                RequestProfiler._directory = os.path.join(METRICS_DIR, 'profiler')
+            else:
+                # Without a shared METRICS_DIR only this process is profiled
+                RequestProfiler._directory = tempfile.mkdtemp(prefix='vacation-booking-profiler-')
+        os.makedirs(RequestProfiler._directory, exist_ok=True)
+        return RequestProfiler._directory
+
+    @staticmethod
+    def load_session():
+        try:
+            with open(os.path.join(RequestProfiler.directory(), 'session.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_session(session):
+        directory = RequestProfiler.directory()
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(session, f)
+        os.replace(temp_path, os.path.join(directory, 'session.json'))
+
+    @staticmethod
+    def is_running(session):
+        if session is None or session.get('stopped') or time.time() >= session['until']:
+            return False
+        return session['requests'] is None or RequestProfiler.claimed(session) < session['requests']
+
+    @staticmethod
+    def claimed(session):
+        try:
+            return sum(1 for name in os.listdir(os.path.join(RequestProfiler.directory(), session['id']))
+                       if name.startswith('claim-'))
+        except OSError:
+            return 0
+
+    @staticmethod
+    def start(mode, seconds, requests=None):
+        """Begin a new session (dropping the previous one's results). Returns (session, error)."""
+        current = RequestProfiler.load_session()
+        if RequestProfiler.is_running(current):
+            return None, 'A profiling session is already running.'
+        directory = RequestProfiler.directory()
+        for name in os.listdir(directory):
+            if os.path.isdir(os.path.join(directory, name)):
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        session = {
+            'id': uuid.uuid4().hex,
+            'mode': mode,
+            'requests': requests,
+            'seconds': seconds,
+            'started_at': time.time(),
+            'until': time.time() + seconds,
+        }
+        os.makedirs(os.path.join(directory, session['id']))
+        RequestProfiler._write_session(session)
+        return session, None
+
+    @staticmethod
+    def stop():
+        """End the current session early; its results stay available. Returns the session or None."""
+        session = RequestProfiler.load_session()
+        if session is None:
+            return None
+        if RequestProfiler.is_running(session):
+            session['stopped'] = True
+            session['until'] = time.time()
+            RequestProfiler._write_session(session)
+        return session
+
+    # --- Per-request hooks (called for every request) ---
+
+    @staticmethod
+    def _current_session():
+        """The shared session, re-read at most every PROFILER_POLL_INTERVAL seconds."""
+        now = time.monotonic()
+        if RequestProfiler._pid != os.getpid():
+            # Forked worker: start with nothing inherited from the master
+            RequestProfiler._pid = os.getpid()
+            RequestProfiler._session = None
+            RequestProfiler._session_mtime = None
+            RequestProfiler._active = {}
+            RequestProfiler._routes = {}
+            RequestProfiler._sampler = None
+            RequestProfiler._flusher = None
+            RequestProfiler._dirty = False
+            # Results gathered since the last periodic flush
+            atexit.register(RequestProfiler._flush)
+        elif now - RequestProfiler._session_checked_at < PROFILER_POLL_INTERVAL:
+            return RequestProfiler._session
+        RequestProfiler._session_checked_at = now
+        path = os.path.join(RequestProfiler.directory(), 'session.json')
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != RequestProfiler._session_mtime:
+            session = RequestProfiler.load_session()
+            with RequestProfiler._lock:
+                if (RequestProfiler._session or {}).get('id') != (session or {}).get('id'):
+                    RequestProfiler._routes = {}
+                    RequestProfiler._next_claim = 0
+                RequestProfiler._session = session
+                RequestProfiler._session_mtime = mtime
+        return RequestProfiler._session
+
+    @staticmethod
+    def _claim(session):
+        """Take one request from the session's budget; False once it is used up."""
+        if session['requests'] is None:
+            return True
+        claims = os.path.join(RequestProfiler.directory(), session['id'])
+        with RequestProfiler._lock:
+            while RequestProfiler._next_claim < session['requests']:
+                index = RequestProfiler._next_claim
+                RequestProfiler._next_claim += 1
+                try:
+                    os.close(os.open(os.path.join(claims, f'claim-{index}'), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                    return True
+                except FileExistsError:
+                    continue
+                except OSError:
+                    return False
+        return False
+
+    @staticmethod
+    def begin(route):
+        """Start profiling the current request if a session wants it."""
+        session = RequestProfiler._current_session()
+        if session is None or session.get('stopped') or time.time() >= session['until']:
+            return
+        if not RequestProfiler._claim(session):
+            return
+        profile = None
+        if session['mode'] == 'cprofile':
+            profile = cProfile.Profile()
+        else:
+            RequestProfiler._ensure_sampler(session)
+        RequestProfiler._ensure_flusher(session)
+        with RequestProfiler._lock:
+            RequestProfiler._active[threading.get_ident()] = (route, profile, time.perf_counter())
+        if profile is not None:
+            profile.enable()
+
+    @staticmethod
+    def end():
+        """Finish profiling the current request (no-op if it was not profiled)."""
+        with RequestProfiler._lock:
+            entry = RequestProfiler._active.pop(threading.get_ident(), None)
+        if entry is None:
+            return
+        route, profile, started = entry
+        if profile is not None:
+            profile.disable()
+        with RequestProfiler._lock:
+            result = RequestProfiler._route_result(route)
+            result['requests'] += 1
+            result['seconds'] += time.perf_counter() - started
+            if profile is not None:
+                if result['stats'] is None:
+                    result['stats'] = pstats.Stats(profile)
+                else:
+                    result['stats'].add(profile)
+            RequestProfiler._dirty = True
+
+    @staticmethod
+    def _route_result(route):
+        result = RequestProfiler._routes.get(route)
+        if result is None:
+            result = RequestProfiler._routes[route] = dict(requests=0, seconds=0.0, samples=0, stacks={}, stats=None)
+        return result
+
+    @staticmethod
+    def _ensure_sampler(session):
+        with RequestProfiler._lock:
+            sampler = RequestProfiler._sampler
+            if sampler is not None and sampler.is_alive():
+                return
+            RequestProfiler._sampler = threading.Thread(target=RequestProfiler._sample_until_done, args=(session,),
+                                                        name='profiler-sampler', daemon=True)
+            RequestProfiler._sampler.start()
+
+    @staticmethod
+    def _sample_until_done(session):
+        me = threading.get_ident()
+        while True:
+            time.sleep(PROFILER_SAMPLE_INTERVAL)
+            with RequestProfiler._lock:
+                if not RequestProfiler._active:
+                    current = RequestProfiler._session
+                    if current is None or current['id'] != session['id'] or time.time() >= current['until']:
+                        RequestProfiler._sampler = None
+                        return
+                    continue
+            frames = sys._current_frames()
+            with RequestProfiler._lock:
+                for ident, (route, _, _) in RequestProfiler._active.items():
+                    frame = frames.get(ident)
+                    if frame is None or ident == me:
+                        continue
+                    stack = _collapse(frame)
+                    result = RequestProfiler._route_result(route)
+                    result['samples'] += 1
+                    result['stacks'][stack] = result['stacks'].get(stack, 0) + 1
+                    RequestProfiler._dirty = True
+            del frames
+
+    @staticmethod
+    def _ensure_flusher(session):
+        with RequestProfiler._lock:
+            flusher = RequestProfiler._flusher
+            if flusher is not None and flusher.is_alive():
+                return
+            RequestProfiler._flusher = threading.Thread(target=RequestProfiler._flush_until_done, args=(session,),
+                                                        name='profiler-flush', daemon=True)
+            RequestProfiler._flusher.start()
+
+    @staticmethod
+    def _flush_until_done(session):
+        while True:
+            time.sleep(PROFILER_POLL_INTERVAL)
+            RequestProfiler._flush()
+            with RequestProfiler._lock:
+                current = RequestProfiler._session
+                if (not RequestProfiler._active and not RequestProfiler._dirty and
+                        (current is None or current['id'] != session['id'] or time.time() >= current['until'])):
+                    RequestProfiler._flusher = None
+                    return
+
+    @staticmethod
+    def _flush():
+        """Write this process's results to <session>/<pid>.profile if they changed."""
+        session = RequestProfiler._session
+        if session is None or not RequestProfiler._dirty:
+            return
+        with RequestProfiler._lock:
+            RequestProfiler._dirty = False
+            snapshot = {
+                route: {
+                    'requests': result['requests'],
+                    'seconds': result['seconds'],
+                    'samples': result['samples'],
+                    'stacks': dict(result['stacks']),
+                    'stats': result['stats'].stats if result['stats'] is not None else None,
+                }
+                for route, result in RequestProfiler._routes.items()
+            }
+            data = marshal.dumps(snapshot)
+        directory = os.path.join(RequestProfiler.directory(), session['id'])
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, os.path.join(directory, f'{os.getpid()}.profile'))
+        except OSError:
+            pass  # the session was replaced meanwhile
+
+    # --- Results ---
+
+    @staticmethod
+    def results(session):
+        """
+        Every worker's results for `session`, merged: {route: {...}} (stats as
+        pstats.Stats). Other workers' results may be up to PROFILER_POLL_INTERVAL
+        seconds old.
+        """
+        RequestProfiler._flush()
+        directory = os.path.join(RequestProfiler.directory(), session['id'])
+        merged = {}
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return merged
+        for name in names:
+            if not name.endswith('.profile'):
+                continue
+            try:
+                with open(os.path.join(directory, name), 'rb') as f:
+                    routes = marshal.load(f)
+            except (OSError, EOFError, ValueError, TypeError):
+                continue
+            for route, result in routes.items():
+                target = merged.setdefault(route, dict(requests=0, seconds=0.0, samples=0, stacks={}, stats=None))
+                target['requests'] += result['requests']
+                target['seconds'] += result['seconds']
+                target['samples'] += result['samples']
+                for stack, count in result['stacks'].items():
+                    target['stacks'][stack] = target['stacks'].get(stack, 0) + count
+                if result['stats']:
+                    if target['stats'] is None:
+                        target['stats'] = pstats.Stats(_LoadedStats(result['stats']))
+                    else:
+                        target['stats'].add(_LoadedStats(result['stats']))
+        return merged
+
+    @staticmethod
+    def summary(session):
+        """Per-route totals and hottest functions, for GET /profiler."""
+        routes = {}
+        for route, result in sorted(RequestProfiler.results(session).items()):
+            summary = {
+                'requests': result['requests'],
+                'mean_ms': round(result['seconds'] / result['requests'] * 1000, 3) if result['requests'] else None,
+            }
+            if session['mode'] == 'sample':
+                self_samples = {}
+                for stack, count in result['stacks'].items():
+                    leaf = stack.rsplit(';', 1)[-1]
+                    self_samples[leaf] = self_samples.get(leaf, 0) + count
+                summary['samples'] = result['samples']
+                summary['top'] = [{'function': function, 'samples': count} for function, count in
+                                  sorted(self_samples.items(), key=lambda item: -item[1])[:TOP_FUNCTIONS]]
+            elif result['stats'] is not None:
+                hottest = sorted(result['stats'].stats.items(), key=lambda item: -item[1][2])[:TOP_FUNCTIONS]
+                summary['top'] = [{'function': f'{os.path.basename(file)}:{line}({name})', 'calls': stat[1],
+                                   'self_ms': round(stat[2] * 1000, 3), 'cumulative_ms': round(stat[3] * 1000, 3)}
+                                  for (file, line, name), stat in hottest]
+            routes[route] = summary
+        return routes
+
+    @staticmethod
+    def collapsed(session, route=None):
+        """Collapsed stacks ('route;frame;...;frame count' lines) for flamegraph tools."""
+        lines = []
+        for name, result in sorted(RequestProfiler.results(session).items()):
+            if route is not None and name != route:
+                continue
+            for stack, count in sorted(result['stacks'].items()):
+                lines.append(f"{name.replace(' ', '_')};{stack} {count}")
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    @staticmethod
+    def pstats_bytes(session, route=None):
+        """A pstats file (load with pstats.Stats or snakeviz) of one route or all routes together."""
+        merged = None
+        for name, result in RequestProfiler.results(session).items():
+            if result['stats'] is None or (route is not None and name != route):
+                continue
+            if merged is None:
+                merged = pstats.Stats(_LoadedStats(dict(result['stats'].stats)))
+            else:
+                merged.add(result['stats'])
+        return marshal.dumps(merged.stats if merged is not None else {})
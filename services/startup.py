@@ -0,0 +1,83 @@
+import logging
+import time
+from models.country import Country
+from models.migration import Migration
+from models.token_version import TokenVersion
+from models.vacation import Vacation
+from constants import SCHEMA_CHECK, DEFAULT_PAGE_SIZE, WARMUP_CATALOG_PAGES
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaOutdatedError(RuntimeError):
+    """Raised at boot when the database is missing migrations this code needs."""
+
+
+class Startup:
+    """
+    Worker boot steps run by create_app(): a schema version check instead of
+    DDL on import (tables are created and migrated at deploy time by
+    `python manage.py init` / `migrate`), then a warmup that fills the
+    in-process caches so the first requests do not pay for cold caches.
+    """
+
+    @staticmethod
+    def check_schema(mode=SCHEMA_CHECK):
+        """
+        Compare the applied schema version with the newest migration file
+        (one query and a directory listing). Pending migrations raise
+        SchemaOutdatedError (mode 'error') or are logged (mode 'warn').
+        """
+        if mode == 'off':
+            return None
+        current = Migration.get_current_version()
+        latest = Migration.get_latest_version()
+        if current < latest:
+            message = (f'Database schema is at version {current} but migrations up to {latest} exist; '
+                       f'run `python manage.py migrate` (or `init` for a new database).')
+            if mode == 'error':
+                raise SchemaOutdatedError(message)
+            logger.warning(message)
+        elif current > latest:
+            logger.warning('Database schema version %d is newer than the newest migration (%d) of this code.',
+                           current, latest)
+        return current
+
+    @staticmethod
+    def warmup(catalog_pages=WARMUP_CATALOG_PAGES):
+        """
+        Prime the caches a fresh worker would otherwise fill on its first
+        requests: token versions, the country list, the first catalog pages
+        (cached under the same keys GET /vacations uses) and the image
+        metadata of the pictures on them. Returns seconds spent per step.
+        """
+        timings = {}
+
+        started = time.perf_counter()
+        TokenVersion.load()
+        timings['token_versions'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        Country.get_all()
+        timings['countries'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        pictures = set()
+        after = None
+        for _ in range(catalog_pages):
+            # One extra row, exactly like the controller, so the cache keys match
+            page = Vacation.get_filtered(limit=DEFAULT_PAGE_SIZE + 1, after=after)
+            pictures.update(vacation['picture_file_name'] for vacation in page[:DEFAULT_PAGE_SIZE])
+            if len(page) <= DEFAULT_PAGE_SIZE:
+                break
+            last = page[DEFAULT_PAGE_SIZE - 1]
+            after = (last['vacation_start'], last['vacation_id'])
+        timings['catalog'] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        Vacation.prime_picture_variants(pictures)
+        timings['image_metadata'] = time.perf_counter() - started
+
+        logger.info('Warmup done in %.1f ms', sum(timings.values()) * 1000,
+                    extra={'warmup_ms': {step: round(seconds * 1000, 3) for step, seconds in timings.items()}})
+        return timings
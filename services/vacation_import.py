@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import os
+from datetime import date
+from models.country import Country
+from models.vacation import Vacation
+from services.vacation_validation import VacationValidator, REQUIRED_FIELDS
+from constants import IMPORT_BATCH_SIZE, IMPORT_MAX_ERRORS
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+CONTENT_TYPE_FORMATS = {
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl',
+    'application/x-jsonlines': 'jsonl',
+}
+EXTENSION_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+LOOKUP_CHUNK_SIZE = 500  # picture names per IN (...) query, well under SQLite's variable limit
+
+
+class ImportFormatError(Exception):
+    """Raised when an import stream cannot be read at all (unknown format, bad CSV header)."""
+
+
+class VacationImporter:
+    """
+    Bulk vacation import from CSV (with a header row) or JSON Lines.
+
+    The input is parsed as a stream, one row at a time, and every row is
+    checked with the same rules as POST /vacations plus an existence check of
+    its country. Valid rows are inserted IMPORT_BATCH_SIZE at a time, one
+    transaction and one executemany per batch, so memory use does not grow
+    with the file and a bad row never rolls back the rest of the import.
+    Batches are committed as they fill up: an import that stops halfway
+    keeps the batches inserted before.
+    """
+
+    @staticmethod
+    def detect_format(requested=None, content_type=None, filename=None):
+        """Import format from an explicit choice, the content type, or the file extension."""
+        if requested:
+            if requested not in IMPORT_FORMATS:
+                raise ImportFormatError(f"format must be one of: {', '.join(IMPORT_FORMATS)}")
+            return requested
+        mimetype = (content_type or '').split(';')[0].strip().lower()
+        if mimetype in CONTENT_TYPE_FORMATS:
+            return CONTENT_TYPE_FORMATS[mimetype]
+        extension = os.path.splitext(filename or '')[1].lower()
+        if extension in EXTENSION_FORMATS:
+            return EXTENSION_FORMATS[extension]
+        raise ImportFormatError('Could not tell the import format; pass format=csv or format=jsonl.')
+
+    @staticmethod
+    def iter_rows(stream, import_format):
+        """Yield (line number, row dict or None, error or None) from a binary stream."""
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        if import_format == 'csv':
+            reader = csv.DictReader(text)
+            missing = [field for field in REQUIRED_FIELDS if field not in (reader.fieldnames or ())]
+            if missing:
+                raise ImportFormatError(f"CSV header is missing column(s): {', '.join(missing)}")
+            for row in reader:
+                yield reader.line_num, row, None
+            return
+
+        for line_number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f'Invalid JSON: {e}'
+                continue
+            if not isinstance(row, dict):
+                yield line_number, None, 'Each line must be a JSON object.'
+                continue
+            yield line_number, row, None
+
+    @staticmethod
+    def run(stream, import_format, batch_size=IMPORT_BATCH_SIZE):
+        """
+        Import every valid row of a binary stream.
+        Returns a report: rows read, inserted and failed, the number of
+        batches, and the first IMPORT_MAX_ERRORS row errors as
+        {'line', 'error'}. A stream that stops being readable midway adds an
+        'error' to the report. Raises ImportFormatError before anything is
+        inserted if the stream has the wrong shape.
+        """
+        if batch_size < 1:
+            raise ValueError('batch_size must be a positive integer.')
+        rows = VacationImporter.iter_rows(stream, import_format)
+
+        country_ids = {country['country_id'] for country in Country.get_all()}
+        today = date.today()
+        report = dict(format=import_format, batch_size=batch_size, rows=0, inserted=0, failed=0,
+                      batches=0, errors=[])
+
+        def row_error(line, error):
+            report['failed'] += 1
+            if len(report['errors']) < IMPORT_MAX_ERRORS:
+                report['errors'].append({'line': line, 'error': error})
+
+        # Imported rows share the variant metadata of vacations already using
+        # their picture; looked up once per picture name per import
+        known_variants = {}
+
+        def flush(batch, lines):
+            new_names = list({values['picture_file_name'] for values in batch} - known_variants.keys())
+            for start in range(0, len(new_names), LOOKUP_CHUNK_SIZE):
+                chunk = new_names[start:start + LOOKUP_CHUNK_SIZE]
+                found = Vacation.get_picture_variants_many(chunk)
+                known_variants.update((name, found.get(name)) for name in chunk)
+            for values in batch:
+                values['picture_variants'] = known_variants[values['picture_file_name']]
+            result = Vacation.insert_many(batch)
+            report['batches'] += 1
+            if 'error' in result:
+                for line in lines:
+                    row_error(line, result['error'])
+            else:
+                report['inserted'] += result['inserted']
+
+        batch, lines = [], []
+        try:
+            for line, row, error in rows:
+                report['rows'] += 1
+                if error is None:
+                    values, error = VacationValidator.validate_new(row, today)
+                    if error is None and values['country_id'] not in country_ids:
+                        error = f"Country {values['country_id']} does not exist."
+                if error is not None:
+                    row_error(line, error)
+                    continue
+                batch.append(values)
+                lines.append(line)
+                if len(batch) >= batch_size:
+                    flush(batch, lines)
+                    batch, lines = [], []
+        except (UnicodeDecodeError, csv.Error) as e:
+            report['error'] = f'Stopped reading the import after {report["rows"]} row(s): {e}'
+        if batch:
+            flush(batch, lines)
+        return report
@@ -0,0 +1,94 @@
+from datetime import datetime, date
+from constants import MAX_PRICE, MIN_PRICE
+
+# Every write must provide these; a new vacation also needs a picture
+EDITABLE_FIELDS = ('country_id', 'vacation_description', 'vacation_start', 'vacation_end', 'price')
+REQUIRED_FIELDS = EDITABLE_FIELDS + ('picture_file_name',)
+
+
+def parse_date(value):
+    """Parse a 'YYYY-MM-DD' date; raises ValueError or TypeError like strptime."""
+    if isinstance(value, str) and len(value) == 10 and value[4] == value[7] == '-':
+        return date.fromisoformat(value)  # same result as strptime, many times faster
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+class VacationValidator:
+    """
+    Validation rules for writing a vacation, shared by POST /vacations (JSON
+    and file upload), PUT /vacations/<id> (JSON and file upload) and the bulk
+    importer so all of them accept and reject exactly the same values.
+    """
+
+    @staticmethod
+    def validate_new(data, today=None, fields=REQUIRED_FIELDS):
+        """
+        Check a new vacation's fields.
+        Returns (values, None) with the cleaned column values, or (None, error message).
+        `today` may be passed by callers validating many rows at once. File
+        uploads pass fields=EDITABLE_FIELDS, the picture being the uploaded file.
+        """
+        return VacationValidator._validate(data, fields, today or date.today(),
+                                           "Missing or empty required field: '{}'")
+
+    @staticmethod
+    def validate_update(data, fields=EDITABLE_FIELDS):
+        """
+        Check the fields of an update, which replaces all of them (the picture
+        is optional). Unlike a new vacation, its start date may be in the past,
+        since it may already have started.
+        Returns (values, None) or (None, error message) like validate_new.
+        """
+        return VacationValidator._validate(data, fields, None,
+                                           "Missing or empty required field for update: '{}'. "
+                                           "All fields except 'picture_file_name' must be provided.")
+
+    @staticmethod
+    def _validate(data, fields, earliest_start, missing_message):
+        # --- 1. Check for missing required fields ---
+        for field in fields:
+            # Check if field is missing or if its value is None or an empty string
+            if field not in data or data[field] is None or (isinstance(data[field], str) and not data[field].strip()):
+                return None, missing_message.format(field)
+
+        try:
+            country_id = int(data['country_id'])
+        except (ValueError, TypeError):
+            return None, 'country_id must be a valid integer.'
+
+        # --- 2. Price validation ---
+        try:
+            price_val = float(data['price'])
+            if not (MIN_PRICE <= price_val <= MAX_PRICE):
+                return None, f'Price must be a positive number and not exceed {MAX_PRICE}.'
+        except (ValueError, TypeError):
+            return None, 'Price must be a valid number.'
+
+        # --- 3. Date format validation and conversion ---
+        vacation_start_str = data['vacation_start']
+        vacation_end_str = data['vacation_end']
+        try:
+            start_date_obj = parse_date(vacation_start_str)
+            end_date_obj = parse_date(vacation_end_str)
+        except (ValueError, TypeError):
+            return None, 'Vacation dates must be in YYYY-MM-DD format.'
+
+        # --- 4. Check if end date is before start date ---
+        if end_date_obj < start_date_obj:
+            return None, 'Vacation end date cannot be before the start date.'
+
+        # --- 5. Check if start date is in the past (new vacations only) ---
+        if earliest_start is not None and start_date_obj < earliest_start:
+            return None, 'Vacation start date cannot be in the past.'
+
+        # The model's SQL expects the original string dates
+        values = dict(
+            country_id=country_id,
+            vacation_description=data['vacation_description'],
+            vacation_start=vacation_start_str,
+            vacation_end=vacation_end_str,
+            price=price_val
+        )
+        if data.get('picture_file_name'):
+            values['picture_file_name'] = data['picture_file_name']
+        return values, None
@@ -0,0 +1,14 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# constants.py reads DATABASE_PATH when it is imported, so point it at a
+# scratch database before any test module imports a model
+_directory = tempfile.mkdtemp(prefix='vacation-booking-tests-')
+os.environ['DATABASE_PATH'] = os.path.join(_directory, 'test.db')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_directory, ignore_errors=True)
@@ -0,0 +1,95 @@
+"""
+The indexes added by migrations 0001, 0002 and 0003 are used by the queries
+they were added for: checked with EXPLAIN QUERY PLAN against a database
+built by `manage.py migrate`, using the SQL the models actually run.
+"""
+import pytest
+from manage import create_base_tables
+from models.database import get_connection
+from models.migration import Migration
+from models.vacation import Vacation
+
+
+@pytest.fixture(scope='module', autouse=True)
+def migrated_database():
+    create_base_tables()
+    Migration.apply_all()
+    assert Migration.get_current_version() == Migration.get_latest_version()
+
+
+def query_plan(sql, parameters=()):
+    """The statement's EXPLAIN QUERY PLAN details, one per line."""
+    with get_connection() as connection:
+        rows = connection.execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+    return '\n'.join(row[3] for row in rows)
+
+
+def statements_run_by(function, *args, **kwargs):
+    """The SQL (parameters filled in) that function() sends to the database."""
+    statements = []
+    with get_connection() as connection:
+        connection.set_trace_callback(statements.append)
+        try:
+            function(*args, **kwargs)
+        finally:
+            connection.set_trace_callback(None)
+    return statements
+
+
+def catalog_plan(**filters):
+    statements = statements_run_by(Vacation.get_filtered, **filters)
+    catalog_queries = [sql for sql in statements if sql.lstrip().startswith('SELECT') and 'FROM vacations' in sql]
+    assert len(catalog_queries) == 1, statements
+    return query_plan(catalog_queries[0])
+
+
+def test_like_count_of_a_vacation_uses_likes_vacation_index():
+    statements = statements_run_by(Vacation.reconcile_likes_count)
+    reconcile = [sql for sql in statements if 'FROM likes' in sql]
+    assert reconcile, statements
+    for sql in reconcile:
+        plan = query_plan(sql)
+        assert 'USING COVERING INDEX idx_likes_vacation_id (vacation_id=?)' in plan, plan
+        assert 'SCAN likes' not in plan, plan
+
+
+def test_cascade_from_vacations_uses_likes_vacation_index():
+    # ON DELETE CASCADE looks up the child rows with this query
+    plan = query_plan('SELECT 1 FROM likes WHERE vacation_id = ?', (1,))
+    assert 'idx_likes_vacation_id (vacation_id=?)' in plan, plan
+
+
+def test_catalog_page_uses_vacation_start_index():
+    plan = catalog_plan(limit=21)
+    assert 'SCAN vacations USING INDEX idx_vacations_vacation_start' in plan, plan
+    assert 'TEMP B-TREE' not in plan, plan
+
+
+def test_catalog_next_page_seeks_vacation_start_index():
+    plan = catalog_plan(limit=21, after=('2030-01-01', 10))
+    assert 'SEARCH vacations USING INDEX idx_vacations_vacation_start (vacation_start>?)' in plan, plan
+    assert 'TEMP B-TREE' not in plan, plan
+
+
+def test_catalog_start_date_filter_uses_vacation_start_index():
+    plan = catalog_plan(limit=21, start_date='2030-06-01')
+    assert 'SEARCH vacations USING INDEX idx_vacations_vacation_start (vacation_start>?)' in plan, plan
+    assert 'TEMP B-TREE' not in plan, plan
+
+
+def test_catalog_country_filter_uses_country_start_index():
+    plan = catalog_plan(limit=21, country_id=3)
+    assert 'SEARCH vacations USING INDEX idx_vacations_country_start (country_id=?)' in plan, plan
+    assert 'TEMP B-TREE' not in plan, plan
+
+
+def test_catalog_country_next_page_uses_country_start_index():
+    plan = catalog_plan(limit=21, country_id=3, after=('2030-01-01', 10))
+    assert 'idx_vacations_country_start (country_id=? AND vacation_start>?)' in plan, plan
+    assert 'TEMP B-TREE' not in plan, plan
+
+
+def test_foreign_key_check_from_countries_uses_country_start_index():
+    # Deleting or re-keying a country looks up its vacations with this query
+    plan = query_plan('SELECT 1 FROM vacations WHERE country_id = ?', (1,))
+    assert 'idx_vacations_country_start (country_id=?)' in plan, plan